@@ -0,0 +1,183 @@
+from datetime import date, timedelta
+
+from django.db.models import Count, Max, Q
+from django.db.models.functions import Coalesce, ExtractHour, ExtractIsoWeekDay
+from django.utils import timezone
+
+from .models import AchievementProgress, DailyPoints, LeaderboardEntry, Task, UserAchievement, UserProfile
+from . import leaderboard
+# Each rule unlocks once `metric` reaches `threshold` ("rank" counts downwards and is lost again past it)
+ACHIEVEMENTS: list[dict] = [
+    {'id': 1, 'title': 'Rising Star', 'description': 'Reach 500 points', 'icon': '⭐', 'points': 50, 'metric': 'total_points', 'threshold': 500},
+    {'id': 2, 'title': 'Champion', 'description': 'Reach 2000 points', 'icon': '🏆', 'points': 200, 'metric': 'total_points', 'threshold': 2000},
+    {'id': 3, 'title': 'Speed Demon', 'description': 'Gain 100 points in one day', 'icon': '⚡', 'points': 100, 'metric': 'best_task_points', 'threshold': 100},
+    {'id': 4, 'title': 'Consistency King', 'description': 'Maintain 7-day streak', 'icon': '🔥', 'points': 150, 'metric': 'max_streak', 'threshold': 7},
+    {'id': 5, 'title': 'Elite Member', 'description': 'Rank in top 10', 'icon': '💎', 'points': 300, 'metric': 'rank', 'threshold': 10},
+    {'id': 6, 'title': 'Legendary', 'description': 'Reach 3000 points', 'icon': '👑', 'points': 500, 'metric': 'total_points', 'threshold': 3000},
+    {'id': 7, 'title': 'Task Master', 'description': 'Complete 100 tasks', 'icon': '✅', 'points': 250, 'metric': 'tasks_done', 'threshold': 100},
+    {'id': 8, 'title': 'Early Bird', 'description': 'Complete 10 tasks before 9 AM', 'icon': '🌅', 'points': 75, 'metric': 'early_tasks', 'threshold': 10},
+    {'id': 9, 'title': 'Night Owl', 'description': 'Complete 10 tasks after 10 PM', 'icon': '🦉', 'points': 75, 'metric': 'night_tasks', 'threshold': 10},
+    {'id': 10, 'title': 'Weekend Warrior', 'description': 'Complete 20 tasks on weekends', 'icon': '🏋️', 'points': 120, 'metric': 'weekend_tasks', 'threshold': 20},
+]
+
+PROGRESS_FIELDS: tuple = (
+    'tasks_done', 'early_tasks', 'night_tasks', 'weekend_tasks',
+    'current_streak', 'max_streak', 'last_active_day', 'best_task_points',
+)
+PUBLIC_FIELDS: tuple = ('id', 'title', 'description', 'icon', 'points')
+CATALOG: list[dict] = [{field: ach[field] for field in PUBLIC_FIELDS} for ach in ACHIEVEMENTS]
+CATALOG_BY_ID: dict[int, dict] = {ach['id']: ach for ach in CATALOG}
+
+
+def _meets(rule: dict, metrics: dict) -> bool:
+    value = metrics[rule['metric']]
+    if rule['metric'] == 'rank':
+        return value is not None and value <= rule['threshold']
+    return value >= rule['threshold']
+
+
+def _metrics(user, progress: AchievementProgress, locked: list[dict], total_points: int | None = None) -> dict:
+    """
+    Collect metric values, only paying for the points and rank lookups when a rule on them is
+    still locked. Callers that already hold the profile balance pass it as total_points.
+    A user without a leaderboard row is not ranked.
+    """
+    metrics: dict = {
+        'tasks_done': progress.tasks_done,
+        'early_tasks': progress.early_tasks,
+        'night_tasks': progress.night_tasks,
+        'weekend_tasks': progress.weekend_tasks,
+        'max_streak': progress.max_streak,
+        'best_task_points': progress.best_task_points,
+    }
+    metric_names: set[str] = {rule['metric'] for rule in locked}
+    if 'total_points' in metric_names:
+        metrics['total_points'] = total_points if total_points is not None else UserProfile.objects.filter(user=user).values_list('total_points_earned', flat=True).first() or 0
+    if 'rank' in metric_names:
+        entry = LeaderboardEntry.objects.filter(user=user).first()
+        metrics['rank'] = leaderboard.rank_of(entry) if entry is not None else None
+    return metrics
+
+
+def _revoke_outranked(rules: list[dict]) -> None:
+    """Take rank achievements from whoever a newly ranked user pushed past the threshold"""
+    for rule in rules:
+        ranked = LeaderboardEntry.objects.order_by('-points', 'user_id').values('user_id')[:rule['threshold']]
+        UserAchievement.objects.filter(achievement_id=rule['id']).exclude(user_id__in=ranked).delete()
+
+
+def _unlock(user, progress: AchievementProgress, unlocked_ids: set[int], total_points: int | None = None) -> list[int]:
+    locked: list[dict] = [rule for rule in ACHIEVEMENTS if rule['id'] not in unlocked_ids]
+    if not locked:
+        return []
+    metrics: dict = _metrics(user, progress, locked, total_points)
+    new_ids: list[int] = [rule['id'] for rule in locked if _meets(rule, metrics)]
+    UserAchievement.objects.bulk_create(
+        [UserAchievement(user=user, achievement_id=achievement_id) for achievement_id in new_ids],
+        ignore_conflicts=True,
+    )
+    # Only a user entering the top ranks can push another out of them
+    _revoke_outranked([rule for rule in locked if rule['id'] in new_ids and rule['metric'] == 'rank'])
+    return new_ids
+
+
+def _streaks(days: list[date]) -> tuple[int, int]:
+    """Return (streak ending at the last day, longest streak) for sorted distinct days"""
+    current: int = 0
+    longest: int = 0
+    previous: date | None = None
+    for day in days:
+        current = current + 1 if previous and day - previous == timedelta(days=1) else 1
+        longest = max(longest, current)
+        previous = day
+    return current, longest
+
+
+def record_completions(user, completions: list, total_points: int | None = None) -> list[int]:
+    """
+    Advance the user's counters with freshly completed tasks and unlock what they reach.
+    total_points is the user's total_points_earned after the award, when the caller has it.
+    """
+    done_tasks: list[Task] = [task for task, _ in completions if task.status == 'done']
+    if not done_tasks:
+        return []
+
+    progress = AchievementProgress.objects.select_for_update().filter(user=user).first()
+    if progress is None:
+        # No counters yet: derive them from history, which already includes these tasks
+        return evaluate_user(user, total_points=total_points)
+
+    before: dict = {field: getattr(progress, field) for field in PROGRESS_FIELDS}
+    touched_days: set[date] = set()
+    for task in done_tasks:
+        progress.tasks_done += 1
+        if not task.end_date:
+            continue
+        end_date = timezone.localtime(task.end_date)
+        progress.early_tasks += end_date.hour < 9
+        progress.night_tasks += end_date.hour >= 22
+        progress.weekend_tasks += end_date.weekday() >= 5
+        touched_days.add(end_date.date())
+    progress.best_task_points = max(progress.best_task_points, *(task.points for task in done_tasks))
+
+    if touched_days:
+        last_day = progress.last_active_day
+        if last_day is not None and min(touched_days) < last_day:
+            # Completed out of order: a past gap may have closed, recount from the buckets
+            days = list(DailyPoints.objects.filter(user=user).order_by('day').values_list('day', flat=True))
+            progress.current_streak, progress.max_streak = _streaks(days)
+            progress.last_active_day = days[-1]
+        else:
+            for day in sorted(touched_days):
+                if last_day is not None and day == last_day + timedelta(days=1):
+                    progress.current_streak += 1
+                elif last_day is None or day != last_day:
+                    progress.current_streak = 1
+                last_day = day
+            progress.last_active_day = last_day
+            progress.max_streak = max(progress.max_streak, progress.current_streak)
+
+    # The row stays locked until the completion commits; only write the counters that moved
+    progress.save(update_fields=[field for field in PROGRESS_FIELDS if getattr(progress, field) != before[field]])
+    unlocked_ids = set(UserAchievement.objects.filter(user=user).values_list('achievement_id', flat=True))
+    return _unlock(user, progress, unlocked_ids, total_points)
+
+
+def evaluate_user(user, revoke: bool = False, total_points: int | None = None) -> list[int]:
+    """Recompute the user's counters from Task history and sync unlocked achievements"""
+    counts = Task.objects.filter(user=user, status='done').annotate(
+        end_hour=ExtractHour('end_date'),
+        end_weekday=ExtractIsoWeekDay('end_date'),
+    ).aggregate(
+        tasks_done=Count('id'),
+        early_tasks=Count('id', filter=Q(end_hour__lt=9)),
+        night_tasks=Count('id', filter=Q(end_hour__gte=22)),
+        weekend_tasks=Count('id', filter=Q(end_weekday__gte=6)),
+        best_task_points=Coalesce(Max('points'), 0),
+    )
+    days = list(DailyPoints.objects.filter(user=user).order_by('day').values_list('day', flat=True))
+    current_streak, max_streak = _streaks(days)
+
+    progress, _ = AchievementProgress.objects.update_or_create(user=user, defaults={
+        **counts,
+        'current_streak': current_streak,
+        'max_streak': max_streak,
+        'last_active_day': days[-1] if days else None,
+    })
+
+    unlocked_ids = set(UserAchievement.objects.filter(user=user).values_list('achievement_id', flat=True))
+    if revoke and unlocked_ids:
+        metrics: dict = _metrics(user, progress, ACHIEVEMENTS, total_points)
+        lost: set[int] = {rule['id'] for rule in ACHIEVEMENTS if rule['id'] in unlocked_ids and not _meets(rule, metrics)}
+        UserAchievement.objects.filter(user=user, achievement_id__in=lost).delete()
+        unlocked_ids -= lost
+    return _unlock(user, progress, unlocked_ids, total_points)
+
+
+def unlocked_for(user) -> list[dict]:
+    """Catalog entries the user has unlocked, in catalog order"""
+    unlocked_ids = set(UserAchievement.objects.filter(user=user).values_list('achievement_id', flat=True))
+    if not unlocked_ids and not AchievementProgress.objects.filter(user=user).exists():
+        # First read for a user whose history predates the engine
+        unlocked_ids = set(evaluate_user(user))
+    return [CATALOG_BY_ID[achievement_id] for achievement_id in CATALOG_BY_ID if achievement_id in unlocked_ids]
@@ -0,0 +1,162 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import UserProfile
+
+# Claims a token needs to authenticate without reading the user row
+IDENTITY_CLAIMS: tuple = ("username", "profile_id", "date_joined")
+# Users kept per process, and for how long
+USER_CACHE_SIZE: int = 1024
+USER_CACHE_TTL: float = 60.0
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Login tokens carrying the identity fields that ClaimsJWTAuthentication trusts"""
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        profile, _ = UserProfile.objects.get_or_create(user=user)
+        token["username"] = user.username
+        token["profile_id"] = profile.pk
+        token["date_joined"] = user.date_joined.isoformat()
+        # Refresh tokens copy these into every access token they mint
+        return token
+
+
+class _UserCache:
+    """Thread-safe LRU of authenticated users with a time-to-live"""
+
+    def __init__(self, size: int, ttl: float) -> None:
+        self.size = size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._users: OrderedDict[int, tuple[float, User]] = OrderedDict()
+
+    def get(self, user_id: int) -> User | None:
+        with self._lock:
+            cached = self._users.get(user_id)
+            if cached is None:
+                return None
+            expires, user = cached
+            if expires < time.monotonic():
+                del self._users[user_id]
+                return None
+            self._users.move_to_end(user_id)
+            return user
+
+    def put(self, user: User) -> None:
+        with self._lock:
+            self._users[user.pk] = (time.monotonic() + self.ttl, user)
+            self._users.move_to_end(user.pk)
+            while len(self._users) > self.size:
+                self._users.popitem(last=False)
+
+    def discard(self, user_id: int) -> None:
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._users.clear()
+
+
+users = _UserCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+
+
+def _revoked_key(user_id: int) -> str:
+    return f"auth:revoked:{user_id}"
+
+
+def revoke(user: User) -> None:
+    """
+    Refuse the account's outstanding access tokens in every process sharing the cache; for deactivated
+    and deleted users. Without a shared cache AUTH_CLAIMS_ONLY is off and the user row is read instead.
+    The marker outlives the longest access token and names the account's join time, so a reused id is unaffected.
+    """
+    users.discard(user.pk)
+    timeout: int = int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds())
+    cache.set(_revoked_key(user.pk), user.date_joined.isoformat(), timeout)
+
+
+def restore(user: User) -> None:
+    cache.delete(_revoked_key(user.pk))
+
+
+def _revoked(user: User) -> bool:
+    return cache.get(_revoked_key(user.pk)) == user.date_joined.isoformat()
+
+
+def _user_from_claims(user_id: int, validated_token) -> User:
+    user = User(
+        pk=user_id,
+        username=validated_token["username"],
+        date_joined=datetime.fromisoformat(validated_token["date_joined"]),
+        is_active=True,
+    )
+    # Mark the instance as loaded so saves and FK assignments treat it as an existing row
+    user._state.adding = False
+    user._state.db = DEFAULT_DB_ALIAS
+    return user
+
+
+def _matches(user: User, validated_token) -> bool:
+    return (user.username == validated_token["username"]
+            and user.date_joined == datetime.fromisoformat(validated_token["date_joined"]))
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that builds the user from signed token claims instead of querying it.
+    Tokens issued before the claims existed, or any token while CHECK_REVOKE_TOKEN is on,
+    take the database path. Either way the user is kept in a short-lived per-process LRU,
+    and accounts deactivated or deleted since are refused through the shared revoke() marker.
+    Without AUTH_CLAIMS_ONLY, which needs that cache to be shared, every request reads the user row.
+    """
+
+    def get_user(self, validated_token):
+        if not getattr(settings, "AUTH_CLAIMS_ONLY", False):
+            # A revocation would only reach this worker's cache
+            return super().get_user(validated_token)
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is not None:
+            user_id = User._meta.pk.to_python(user_id)  # Tokens store the id as a string
+        trusted: bool = not api_settings.CHECK_REVOKE_TOKEN and all(claim in validated_token for claim in IDENTITY_CLAIMS)
+        user: User | None = users.get(user_id) if user_id is not None else None
+        if user is not None and trusted and not _matches(user, validated_token):
+            user = None  # The id now belongs to another account
+        if user is None:
+            user = _user_from_claims(user_id, validated_token) if trusted else super().get_user(validated_token)
+            users.put(user)
+        if _revoked(user):
+            users.discard(user.pk)
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        # Each request gets its own instance; views may cache relations or set attributes on it
+        return copy.copy(user)
+
+
+def profile_for(request) -> UserProfile:
+    """The requesting user's profile, loaded at most once per request and cached on request.user"""
+    profile: UserProfile | None = getattr(request, "_profile", None)
+    if profile is None:
+        profile_id = request.auth.get("profile_id") if request.auth is not None else None
+        if profile_id is not None:
+            profile = UserProfile.objects.filter(pk=profile_id, user_id=request.user.pk).first()
+        if profile is None:
+            profile, _ = UserProfile.objects.get_or_create(user=request.user)
+        User.profile.related.set_cached_value(request.user, profile)
+        UserProfile.user.field.set_cached_value(profile, request.user)
+        request._profile = profile
+    return profile
@@ -0,0 +1,217 @@
+import random
+import statistics
+import time
+import tracemalloc
+from contextlib import ExitStack
+from datetime import datetime, time as dt_time, timedelta
+from typing import Callable
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import CyclicTask, LeaderboardEntry, SubTask, Task, UserProfile, WorkSession
+from . import achievements, daily_points, leaderboard
+
+SCALES: dict[str, int] = {"1k": 1_000, "10k": 10_000, "100k": 100_000}
+TASKS_PER_USER: int = 100
+# Rows built in memory before each bulk insert while seeding
+SEED_BATCH: int = 5000
+USERNAME_PREFIX: str = "bench"
+SPLIT_SUBTASKS: int = 10
+
+# Seeded mix: a third of the tasks are done, every other one has a work session,
+# every fourth is split into subtasks and every tenth repeats
+DONE_EVERY: int = 3
+SESSION_EVERY: int = 2
+SUBTASKS_EVERY: int = 4
+CYCLE_EVERY: int = 10
+
+
+def scale_of(value: str) -> int:
+    """Task count for a named scale (1k, 10k, 100k) or a plain integer"""
+    if value in SCALES:
+        return SCALES[value]
+    if value.isdigit() and int(value) > 0:
+        return int(value)
+    raise ValueError(f"scale must be one of {', '.join(SCALES)} or a positive integer")
+
+
+def _task(user_id: int, index: int, now: datetime, rng: random.Random) -> Task:
+    start: datetime = now + timedelta(days=rng.randint(-120, 60), hours=rng.randint(0, 23))
+    task = Task(
+        user_id=user_id,
+        title=f"Task {index}",
+        description="Seeded for benchmarking",
+        start_date=start,
+        end_date=start + timedelta(days=rng.randint(0, 5), hours=rng.randint(1, 8)),
+        priority=rng.randint(1, 10),
+        category=rng.choice(("private", "work")),
+        status="pending",
+        updated_at=now,
+    )
+    if index % DONE_EVERY == 0:
+        task.status = "done"
+        task.points = task.compute_points()
+    return task
+
+
+def _seed_related(tasks: list[Task]) -> None:
+    sessions: list[WorkSession] = []
+    subtasks: list[SubTask] = []
+    cycles: list[CyclicTask] = []
+    for index, task in enumerate(tasks):
+        if index % SESSION_EVERY == 0:
+            sessions.append(WorkSession(task=task, start_time=dt_time(9), end_time=dt_time(11)))
+        if index % SUBTASKS_EVERY == 0:
+            subtasks.extend(
+                SubTask(parent_task=task, title=f"Step {step}", start_date=task.start_date,
+                        end_date=task.end_date, priority=step + 1)
+                for step in range(2)
+            )
+        if index % CYCLE_EVERY == 0:
+            cycle = CyclicTask(task=task, frequency="weekly", occurrences_count=12)
+            cycle.series_end = cycle.compute_series_end()
+            cycles.append(cycle)
+    WorkSession.objects.bulk_create(sessions)
+    SubTask.objects.bulk_create(subtasks)
+    CyclicTask.objects.bulk_create(cycles)
+
+
+def seed(task_count: int, tasks_per_user: int = TASKS_PER_USER, seed_value: int = 0) -> User:
+    """
+    Bulk-insert task_count tasks spread over task_count // tasks_per_user users, with sessions,
+    subtasks and cycles, then derive the points buckets, leaderboard and achievements the way the
+    backfill commands do. Returns the first seeded user, whom the benchmark requests run as.
+    """
+    rng = random.Random(seed_value)
+    now: datetime = timezone.now()
+    user_count: int = max(task_count // tasks_per_user, 1)
+    password: str = make_password(None)  # Hashing once keeps seeding fast; seeded users cannot log in
+
+    with transaction.atomic():
+        users: list[User] = User.objects.bulk_create(
+            [User(username=f"{USERNAME_PREFIX}{index}", password=password) for index in range(user_count)],
+            batch_size=SEED_BATCH,
+        )
+        user_ids: list[int] = [user.pk for user in users]
+        earned: dict[int, int] = dict.fromkeys(user_ids, 0)
+
+        batch: list[Task] = []
+        for index in range(task_count):
+            task = _task(user_ids[index % user_count], index, now, rng)
+            earned[task.user_id] += task.points
+            batch.append(task)
+            if len(batch) >= SEED_BATCH:
+                _seed_related(Task.objects.bulk_create(batch))
+                batch = []
+        if batch:
+            _seed_related(Task.objects.bulk_create(batch))
+
+        # bulk_create skips the post_save receiver that creates these
+        current_month, _ = leaderboard.window_starts()
+        UserProfile.objects.bulk_create(
+            [UserProfile(user_id=user_id, current_points=points, total_points_earned=points)
+             for user_id, points in earned.items()],
+            batch_size=SEED_BATCH,
+        )
+        LeaderboardEntry.objects.bulk_create(
+            [LeaderboardEntry(user_id=user_id, period=current_month.date()) for user_id in user_ids],
+            batch_size=SEED_BATCH,
+        )
+
+    daily_points.backfill()
+    leaderboard.rebuild()
+    with transaction.atomic():
+        achievements.evaluate_user(users[0])
+    return users[0]
+
+
+def measure(call: Callable[[int], object], repeat: int, cold: bool = False,
+            databases: tuple = (DEFAULT_DB_ALIAS,)) -> dict:
+    """
+    Run call(iteration) once to warm caches, then repeat times, and report latency in
+    milliseconds, the query count over the given database aliases and the peak Python memory
+    allocated during a run. With cold=True the cache is cleared before every run, measuring
+    the uncached path.
+    """
+    call(-1)
+    latencies: list[float] = []
+    queries: list[int] = []
+    peaks: list[int] = []
+    for iteration in range(repeat):
+        if cold:
+            cache.clear()
+        tracemalloc.start()
+        with ExitStack() as stack:
+            captured = [stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in databases]
+            started: float = time.perf_counter()
+            response = call(iteration)
+            latencies.append((time.perf_counter() - started) * 1000)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        queries.append(sum(len(context.captured_queries) for context in captured))
+        if response.status_code >= 400:
+            raise RuntimeError(f"Benchmark request failed with {response.status_code}: {response.content[:200]!r}")
+    ordered: list[float] = sorted(latencies)
+    return {
+        "runs": repeat,
+        "latency_ms": {
+            "min": round(ordered[0], 3),
+            "median": round(statistics.median(ordered), 3),
+            "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+            "max": round(ordered[-1], 3),
+        },
+        "queries": max(queries),
+        "peak_memory_kib": round(max(peaks) / 1024, 1),
+    }
+
+
+def _split_payload(now: datetime) -> dict:
+    return {
+        "title": "Benchmark split",
+        "priority": 5,
+        "subtasks": [
+            {
+                "title": f"Part {index}",
+                "start_date": (now + timedelta(days=index)).isoformat(),
+                "end_date": (now + timedelta(days=index, hours=2)).isoformat(),
+                "priority": 3,
+            }
+            for index in range(SPLIT_SUBTASKS)
+        ],
+    }
+
+
+def run(user: User, repeat: int = 5, cold: bool = False, databases: tuple = (DEFAULT_DB_ALIAS,)) -> dict[str, dict]:
+    """
+    Measure each benchmarked endpoint as user, who must own at least repeat + 1 pending tasks,
+    counting queries on the given aliases (include the replica to count routed reads)
+    """
+    client = APIClient()
+    client.force_authenticate(user=user)
+    now: datetime = timezone.now()
+    pending: list[int] = list(
+        Task.objects.filter(user=user, status="pending").order_by("id").values_list("id", flat=True)[:repeat + 1]
+    )
+    if len(pending) < repeat + 1:
+        raise ValueError(f"The benchmark user needs {repeat + 1} pending tasks, found {len(pending)}")
+
+    cyclic: dict = {
+        "title": "Benchmark cycle", "priority": 4, "frequency": "weekly", "occurrences_count": 12,
+        "start_date": now.isoformat(), "end_date": (now + timedelta(hours=1)).isoformat(),
+    }
+    endpoints: dict[str, Callable[[int], object]] = {
+        "tasks": lambda _: client.get("/api/tasks/"),
+        "mark_done": lambda iteration: client.post(f"/api/tasks/{pending[iteration + 1]}/mark_done/"),
+        "rankings": lambda _: client.get("/api/profile/rankings/"),
+        "user_achievements": lambda _: client.get("/api/profile/user_achievements/"),
+        "user_stats": lambda _: client.get(f"/api/profile/{user.pk}/user_stats/"),
+        "create_split": lambda _: client.post("/api/tasks/create_split/", _split_payload(now), format="json"),
+        "create_cyclic": lambda _: client.post("/api/tasks/create_cyclic/", cyclic, format="json"),
+    }
+    return {name: measure(call, repeat, cold, databases) for name, call in endpoints.items()}
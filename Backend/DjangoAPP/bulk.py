@@ -0,0 +1,200 @@
+from datetime import datetime
+
+from django.db import connections, router, transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .models import CyclicTask, PointsTransaction, SubTask, Task, TaskTombstone, UserProfile, WorkSession
+from .serializers import TaskSerializer
+from . import completion, events, leaderboard, recurrence, response_cache
+
+MAX_OPERATIONS: int = 1000
+# Ids bound per DELETE statement, below SQLite's parameter limit
+DELETE_BATCH_SIZE: int = 500
+# Kinds run in this order, so an item can be updated and completed in the same batch
+OPERATIONS: tuple = ("create", "update", "complete", "delete")
+
+
+class InvalidBatch(ValueError):
+    pass
+
+
+def _result(index: int, op: str | None, result: str, task_id: int | None = None, **extra) -> dict:
+    return {"index": index, "op": op, "id": task_id, "result": result, **extra}
+
+
+def _validate(validator: TaskSerializer, data) -> dict:
+    validated: dict = validator.run_validation(data if data is not None else {})
+    validated.pop("user", None)  # Tasks always belong to the requesting user
+    return validated
+
+
+def _refresh_series_end(moved: list[Task]) -> None:
+    """Bulk counterpart of the refresh_series_end receiver, which bulk_update does not trigger"""
+    by_id: dict[int, Task] = {task.pk: task for task in moved}
+    changed: list[CyclicTask] = []
+    for cycle in CyclicTask.objects.filter(task_id__in=list(by_id)):
+        cycle.task = by_id[cycle.task_id]
+        series_end = cycle.compute_series_end()
+        if series_end != cycle.series_end:
+            cycle.series_end = series_end
+            changed.append(cycle)
+    CyclicTask.objects.bulk_update(changed, ["series_end"])
+
+
+def _delete_where(model, field: str, ids: list[int]) -> None:
+    """DELETE the model's rows whose `field` is in ids, without the collector's per-row fetch and signals"""
+    connection = connections[router.db_for_write(model)]
+    table: str = connection.ops.quote_name(model._meta.db_table)
+    column: str = connection.ops.quote_name(model._meta.get_field(field).column)
+    with connection.cursor() as cursor:
+        for start in range(0, len(ids), DELETE_BATCH_SIZE):
+            batch: list[int] = ids[start:start + DELETE_BATCH_SIZE]
+            cursor.execute(f"DELETE FROM {table} WHERE {column} IN ({', '.join(['%s'] * len(batch))})", batch)
+
+
+def _delete(user, tasks: list[Task]) -> None:
+    """
+    Bulk counterpart of Task.delete(): one DELETE per table and one tombstone INSERT instead of
+    the per-row cascade and receivers. apply() bumps the version and publishes once instead.
+    Every model with a foreign key to Task is handled here, children before their parent.
+    """
+    by_id: dict[int, Task] = {task.pk: task for task in tasks}
+    task_ids: list[int] = list(by_id)
+    for cycle in CyclicTask.objects.filter(task_id__in=task_ids):
+        cycle.task = by_id[cycle.task_id]
+        recurrence.invalidate(cycle)
+    PointsTransaction.objects.filter(task_id__in=task_ids).update(task=None)
+    leaderboard.rescore(user.pk, [(task.loaded_score, None) for task in tasks])
+    for model, field in ((SubTask, "parent_task"), (WorkSession, "task"), (CyclicTask, "task"), (Task, "id")):
+        _delete_where(model, field, task_ids)
+    TaskTombstone.objects.bulk_create([TaskTombstone(user=user, task_id=task_id) for task_id in task_ids], batch_size=500)
+
+
+def apply(user, operations, now: datetime | None = None) -> dict:
+    """
+    Run a batch of {"op": "create"|"update"|"complete"|"delete", "id": ..., "data": {...}} items in one
+    transaction with one bulk statement per kind. Invalid items are reported in their result and
+    skipped; the rest are applied. Completions award their points in a single profile increment.
+    """
+    if not isinstance(operations, list) or not operations:
+        raise InvalidBatch("operations must be a non-empty list")
+    if len(operations) > MAX_OPERATIONS:
+        raise InvalidBatch(f"A batch is limited to {MAX_OPERATIONS} operations")
+
+    now = now or timezone.now()
+    results: list[dict | None] = [None] * len(operations)
+    planned: dict[str, list[tuple[int, dict]]] = {op: [] for op in OPERATIONS}
+    seen: set[tuple[str, int]] = set()
+    for index, operation in enumerate(operations):
+        op = operation.get("op") if isinstance(operation, dict) else None
+        if op not in OPERATIONS:
+            results[index] = _result(index, op, "error", errors={"op": f"Must be one of: {', '.join(OPERATIONS)}"})
+            continue
+        if op != "create":
+            task_id = operation.get("id")
+            if not isinstance(task_id, int) or isinstance(task_id, bool):
+                results[index] = _result(index, op, "error", errors={"id": "A task id is required"})
+                continue
+            if (op, task_id) in seen:
+                results[index] = _result(index, op, "error", task_id, errors={"id": "Duplicate operation for this task"})
+                continue
+            seen.add((op, task_id))
+        planned[op].append((index, operation))
+
+    task_ids: set[int] = {task_id for _, task_id in seen}
+    tasks: dict[int, Task] = Task.objects.filter(user=user).in_bulk(list(task_ids)) if task_ids else {}
+
+    def lookup(index: int, operation: dict) -> Task | None:
+        task = tasks.get(operation["id"])
+        if task is None:
+            results[index] = _result(index, operation["op"], "error", operation["id"], errors={"id": "Not found"})
+        return task
+
+    # One validator per kind; building a serializer per item is most of the per-request cost
+    created: list[tuple[int, Task]] = []
+    validator = TaskSerializer()
+    for index, operation in planned["create"]:
+        try:
+            created.append((index, Task(user=user, **_validate(validator, operation.get("data")))))
+        except ValidationError as exc:
+            results[index] = _result(index, "create", "error", errors=exc.detail)
+
+    updated: list[tuple[int, Task]] = []
+    updated_fields: set[str] = {"updated_at"}
+    moved: list[Task] = []
+    validator = TaskSerializer(partial=True)
+    for index, operation in planned["update"]:
+        task = lookup(index, operation)
+        if task is None:
+            continue
+        try:
+            data: dict = _validate(validator, operation.get("data"))
+        except ValidationError as exc:
+            results[index] = _result(index, "update", "error", task.pk, errors=exc.detail)
+            continue
+        for field, value in data.items():
+            setattr(task, field, value)
+        task.updated_at = now
+        updated_fields.update(data)
+        updated.append((index, task))
+        if "start_date" in data or "end_date" in data:
+            moved.append(task)
+
+    to_complete: list[tuple[int, Task]] = [
+        (index, task) for index, operation in planned["complete"]
+        if (task := lookup(index, operation)) is not None
+    ]
+    to_delete: list[tuple[int, Task]] = [
+        (index, task) for index, operation in planned["delete"]
+        if (task := lookup(index, operation)) is not None
+    ]
+
+    with transaction.atomic():
+        if created:
+            Task.objects.bulk_create([task for _, task in created], batch_size=500)
+            # bulk_create skips the rescore_saved_task receiver; done tasks count like single creates
+            leaderboard.rescore(user.pk, [(None, task.score()) for _, task in created])
+            for _, task in created:
+                task.loaded_score = task.score()
+        if updated:
+            Task.objects.bulk_update([task for _, task in updated], sorted(updated_fields), batch_size=500)
+            _refresh_series_end(moved)
+            leaderboard.rescore(user.pk, [(task.loaded_score, task.score()) for _, task in updated])
+            for _, task in updated:
+                task.loaded_score = task.score()
+        completions: list[tuple[Task, int]] = []
+        if to_complete:
+            completions = completion.complete_many(user, [task for _, task in to_complete], now)
+        if to_delete:
+            _delete(user, [task for _, task in to_delete])
+        if created or updated or to_delete:
+            UserProfile.objects.filter(user=user).update(task_version=F("task_version") + 1)
+            response_cache.bump(user.pk)
+            events.publish(user.pk, {
+                "type": "tasks.changed",
+                "created": [task.pk for _, task in created],
+                "updated": [task.pk for _, task in updated],
+                "deleted": [task.pk for _, task in to_delete],
+            })
+
+    awarded: dict[int, int] = {task.pk: points_awarded for task, points_awarded in completions}
+    for index, task in created:
+        results[index] = _result(index, "create", "created", task.pk)
+    for index, task in updated:
+        results[index] = _result(index, "update", "updated", task.pk)
+    for index, task in to_complete:
+        if task.pk in awarded:
+            results[index] = _result(index, "complete", "completed", task.pk, points_awarded=awarded[task.pk])
+        else:
+            results[index] = _result(index, "complete", "unchanged", task.pk, points_awarded=0)
+    for index, task in to_delete:
+        results[index] = _result(index, "delete", "deleted", task.pk)
+
+    profile, _ = UserProfile.objects.get_or_create(user=user)
+    return {
+        "results": results,
+        "points_awarded": sum(awarded.values()),
+        "user_total_points": profile.current_points,
+    }
@@ -0,0 +1,91 @@
+from datetime import datetime
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import SubTask, Task
+from .overdue import effective_status
+from . import recurrence
+
+STATUS_GROUPS: dict[str, list[str]] = {
+    "active": ["pending", "in progress", "overdue"],
+    "done": ["done", "abandoned"],
+}
+
+
+def _task_item(task: Task, now: datetime) -> dict:
+    return {
+        "kind": "task",
+        "id": task.id,
+        "task_id": task.id,
+        "title": task.title,
+        "start": task.start_date,
+        "end": task.end_date,
+        "status": effective_status(task, now),
+        "category": task.category,
+        "priority": task.priority,
+        "points": task.points,
+        "location": task.location,
+        "reminder_date": task.reminder_date,
+        "is_cyclic": hasattr(task, "cycle"),
+    }
+
+
+def build(user, start: datetime, end: datetime, status_group: str | None = None) -> list[dict]:
+    """Tasks, cyclic occurrences and subtasks overlapping [start, end], ordered by end date"""
+    now: datetime = timezone.now()
+    tasks = Task.objects.filter(user=user).select_related("cycle")
+    if status_group:
+        tasks = tasks.filter(status__in=STATUS_GROUPS[status_group])
+
+    items: list[dict] = []
+    overlapping = tasks.filter(
+        Q(start_date__lte=end) | Q(start_date__isnull=True, end_date__lte=end),
+        end_date__gte=start,
+    )
+    for task in overlapping:
+        items.append(_task_item(task, now))
+
+    # Series that start after the window or end before it cannot reach it
+    series = tasks.filter(
+        Q(cycle__series_end__gte=start) | Q(cycle__series_end__isnull=True),
+        cycle__isnull=False,
+        end_date__lte=end,
+    )
+    for task in series:
+        cycle = task.cycle
+        duration = task.end_date - task.start_date if task.start_date else None
+        for index, occurrence in recurrence.occurrences(cycle, start, end):
+            item: dict = _task_item(task, now)
+            item.update({
+                "kind": "occurrence",
+                "id": f"{task.id}_cyclic_{index}",
+                "start": occurrence - duration if duration is not None else None,
+                "end": occurrence,
+                "frequency": cycle.frequency,
+            })
+            items.append(item)
+
+    subtasks = SubTask.objects.filter(
+        parent_task__user=user, start_date__lte=end, end_date__gte=start
+    ).select_related("parent_task")
+    if status_group:
+        subtasks = subtasks.filter(parent_task__status__in=STATUS_GROUPS[status_group])
+    for subtask in subtasks:
+        items.append({
+            "kind": "subtask",
+            "id": f"subtask_{subtask.id}",
+            "task_id": subtask.parent_task_id,
+            "title": subtask.title,
+            "start": subtask.start_date,
+            "end": subtask.end_date,
+            "status": subtask.status,
+            "category": subtask.parent_task.category,
+            "priority": subtask.priority,
+            "points": 0,
+            "location": subtask.parent_task.location,
+            "reminder_date": subtask.parent_task.reminder_date,
+        })
+
+    items.sort(key=lambda item: item["end"])
+    return items
@@ -0,0 +1,67 @@
+from datetime import datetime
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Task
+from .signals import tasks_completed
+from . import points
+
+FINISHED_STATUSES: tuple = ("done", "abandoned")
+
+
+def points_for(task: Task, now: datetime) -> int:
+    """Points a completion is worth: the task's value, halved when it is finished late"""
+    value: int = task.compute_points()
+    if task.end_date and task.end_date < now:
+        return value // 2
+    return value
+
+
+def complete(user, task: Task, now: datetime | None = None) -> tuple[int, dict[str, int]] | None:
+    """
+    Mark the user's task done exactly once. The status transition is a single conditional UPDATE,
+    so of two racing requests only one changes the row and awards points; the other gets None.
+    Returns the points awarded and the profile balances after the award.
+    """
+    now = now or timezone.now()
+    task_points: int = task.compute_points()
+    awarded: int = points_for(task, now)
+    with transaction.atomic():
+        changed: int = Task.objects.filter(pk=task.pk).exclude(status__in=FINISHED_STATUSES).update(
+            status="done", points=task_points, updated_at=now
+        )
+        if not changed:
+            return None
+        task.status, task.points, task.updated_at = "done", task_points, now
+        task.loaded_score = task.score()  # The windows receive it from tasks_completed
+        balances: dict[str, int] = points.award(user, [(task, awarded)])
+        tasks_completed.send(sender=Task, user=user, completions=[(task, awarded)], balances=balances)
+    return awarded, balances
+
+
+def complete_many(user, tasks: list[Task], now: datetime | None = None) -> list[tuple[Task, int]]:
+    """
+    Bulk counterpart of complete(): lock the rows that are still open, flip them with one
+    bulk_update and award their points in aggregate. Returns the (task, points_awarded) pairs.
+    """
+    now = now or timezone.now()
+    by_id: dict[int, Task] = {task.pk: task for task in tasks}
+    with transaction.atomic():
+        open_ids: set[int] = set(
+            Task.objects.select_for_update().filter(pk__in=list(by_id))
+            .exclude(status__in=FINISHED_STATUSES).values_list("pk", flat=True)
+        )
+        completions: list[tuple[Task, int]] = []
+        for task_id, task in by_id.items():
+            if task_id not in open_ids:
+                continue
+            awarded: int = points_for(task, now)
+            task.status, task.points, task.updated_at = "done", task.compute_points(), now
+            task.loaded_score = task.score()
+            completions.append((task, awarded))
+        if completions:
+            Task.objects.bulk_update([task for task, _ in completions], ["status", "points", "updated_at"], batch_size=500)
+            balances: dict[str, int] = points.award(user, completions)
+            tasks_completed.send(sender=Task, user=user, completions=completions, balances=balances)
+    return completions
@@ -0,0 +1,130 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import DailyPoints, Task
+
+
+def day_of(task: Task) -> date | None:
+    """Bucket key of a completed task, or None when it has no end date"""
+    if not task.end_date:
+        return None
+    return timezone.localtime(task.end_date).date()
+
+
+def record_completions(user, completions: list) -> None:
+    """Add freshly completed tasks to their per-day buckets"""
+    per_day: dict[date, list[int]] = defaultdict(lambda: [0, 0])
+    for task, _ in completions:
+        day = day_of(task)
+        if task.status != "done" or day is None:
+            continue
+        per_day[day][0] += task.points
+        per_day[day][1] += 1
+
+    for day, (points, tasks_done) in per_day.items():
+        _increment(user.pk, day, points, tasks_done)
+
+
+def adjust(user_id: int, changes: list[tuple[datetime, int, int]]) -> None:
+    """Apply signed (end_date, points, tasks_done) changes of edited or deleted done tasks to their buckets"""
+    per_day: dict[date, list[int]] = defaultdict(lambda: [0, 0])
+    for end_date, points, tasks_done in changes:
+        day = timezone.localtime(end_date).date()
+        per_day[day][0] += points
+        per_day[day][1] += tasks_done
+
+    for day, (points, tasks_done) in per_day.items():
+        if tasks_done > 0:
+            _increment(user_id, day, points, tasks_done)
+        elif points or tasks_done:
+            # Nothing to take back from a missing bucket, and the user may be mid-deletion
+            DailyPoints.objects.filter(user_id=user_id, day=day).update(
+                points=F("points") + points, tasks_done=F("tasks_done") + tasks_done
+            )
+
+
+def _increment(user_id: int, day: date, points: int, tasks_done: int) -> None:
+    bucket = DailyPoints.objects.filter(user_id=user_id, day=day)
+    changes: dict = {"points": F("points") + points, "tasks_done": F("tasks_done") + tasks_done}
+    if bucket.update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            DailyPoints.objects.create(user_id=user_id, day=day, points=points, tasks_done=tasks_done)
+    except IntegrityError:
+        # A concurrent completion created the bucket first
+        bucket.update(**changes)
+
+
+def window_sums(user, windows: dict[str, date]) -> dict[str, int]:
+    """
+    Sum bucket points from each named start date onwards, in one query.
+    Task counts are returned alongside under "<name>_tasks".
+    """
+    aggregates: dict = {}
+    for name, start in windows.items():
+        aggregates[name] = Coalesce(Sum("points", filter=Q(day__gte=start)), 0)
+        aggregates[f"{name}_tasks"] = Coalesce(Sum("tasks_done", filter=Q(day__gte=start)), 0)
+    return DailyPoints.objects.filter(user=user).aggregate(**aggregates)
+
+
+def series(user, start: date, end: date, granularity: str = "day") -> list[dict]:
+    """Zero-filled points time series between two dates, per day or per 7-day block ending at `end`"""
+    buckets: dict[date, tuple[int, int]] = {
+        day: (points, tasks_done)
+        for day, points, tasks_done in DailyPoints.objects.filter(
+            user=user, day__gte=start, day__lte=end
+        ).values_list("day", "points", "tasks_done")
+    }
+
+    step: int = 7 if granularity == "week" else 1
+    rows: list[dict] = []
+    block_end: date = end
+    while block_end >= start:
+        block_start: date = max(block_end - timedelta(days=step - 1), start)
+        points: int = 0
+        tasks_done: int = 0
+        day: date = block_start
+        while day <= block_end:
+            day_points, day_tasks = buckets.get(day, (0, 0))
+            points += day_points
+            tasks_done += day_tasks
+            day += timedelta(days=1)
+        rows.append({
+            "start": block_start.isoformat(),
+            "end": block_end.isoformat(),
+            "points": points,
+            "tasks_done": tasks_done,
+        })
+        block_end = block_start - timedelta(days=1)
+
+    rows.reverse()
+    return rows
+
+
+def backfill(user_ids=None) -> int:
+    """Rebuild buckets from done Task history, replacing existing rows"""
+    tasks = Task.objects.filter(status="done", end_date__isnull=False, user__isnull=False)
+    buckets = DailyPoints.objects.all()
+    if user_ids is not None:
+        tasks = tasks.filter(user_id__in=list(user_ids))
+        buckets = buckets.filter(user_id__in=list(user_ids))
+
+    rows = (
+        tasks.annotate(day=TruncDate("end_date"))
+        .values("user_id", "day")
+        .annotate(points=Coalesce(Sum("points"), 0), tasks_done=Count("id"))
+        .order_by()
+    )
+    with transaction.atomic():
+        buckets.delete()
+        created = DailyPoints.objects.bulk_create(
+            (DailyPoints(user_id=row["user_id"], day=row["day"], points=row["points"], tasks_done=row["tasks_done"]) for row in rows),
+            batch_size=1000,
+        )
+    return len(created)
@@ -0,0 +1,138 @@
+import asyncio
+import json
+import logging
+import threading
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# A client this many events behind gets a single resync in place of its backlog
+QUEUE_SIZE: int = 100
+RESYNC_EVENT: dict = {"type": "resync"}
+
+
+class LocalSubscription:
+    def __init__(self, broker: "LocalBroker", user_id: int) -> None:
+        self.broker = broker
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def deliver(self, event: dict) -> None:
+        if self.queue.full():
+            # Dropping events silently would leave the client wrong; tell it to refetch through /sync
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = RESYNC_EVENT
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: float) -> dict | None:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """In-process fan-out; only reaches streams served by the same worker process"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._subscriptions: dict[int, set[LocalSubscription]] = {}
+
+    def subscribe(self, user_id: int) -> LocalSubscription:
+        subscription = LocalSubscription(self, user_id)
+        with self._lock:
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: LocalSubscription) -> None:
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(subscription.user_id, None)
+
+    def publish(self, user_id: int, event: dict) -> None:
+        """Safe to call from sync views running in worker threads"""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # The stream's event loop has already shut down
+                self.unsubscribe(subscription)
+
+
+class RedisSubscription:
+    def __init__(self, client, channel: str) -> None:
+        self.client = client
+        self.pubsub = client.pubsub(ignore_subscribe_messages=True)
+        self.channel = channel
+        self.subscribed: bool = False
+
+    async def get(self, timeout: float) -> dict | None:
+        if not self.subscribed:
+            await self.pubsub.subscribe(self.channel)
+            self.subscribed = True
+        message = await self.pubsub.get_message(timeout=timeout)
+        if message is None:
+            # get_message returns immediately when nothing is buffered
+            await asyncio.sleep(min(timeout, 1.0))
+            return None
+        return json.loads(message["data"])
+
+    def close(self) -> None:
+        asyncio.ensure_future(self._close())
+
+    async def _close(self) -> None:
+        await self.pubsub.aclose()
+        await self.client.aclose()
+
+
+class RedisBroker:
+    """Cross-process fan-out over Redis pub/sub"""
+
+    def __init__(self, url: str) -> None:
+        import redis
+        self.url = url
+        self._client = redis.Redis.from_url(url)
+        self._errors = redis.RedisError
+
+    def subscribe(self, user_id: int) -> RedisSubscription:
+        import redis.asyncio
+        return RedisSubscription(redis.asyncio.Redis.from_url(self.url), self._channel(user_id))
+
+    def publish(self, user_id: int, event: dict) -> None:
+        # Runs after the write has committed; an unreachable Redis must not fail the request
+        try:
+            self._client.publish(self._channel(user_id), json.dumps(event))
+        except self._errors:
+            logger.warning("Dropped %s event for user %s; Redis is unavailable", event.get("type"), user_id, exc_info=True)
+
+    def _channel(self, user_id: int) -> str:
+        return f"task-events:{user_id}"
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        redis_url: str | None = getattr(settings, "EVENTS_REDIS_URL", None)
+        _broker = RedisBroker(redis_url) if redis_url else LocalBroker()
+    return _broker
+
+
+def publish(user_id: int | None, event: dict) -> None:
+    """Send an event to the user's open streams once the current transaction commits"""
+    if user_id is None:
+        return
+    transaction.on_commit(lambda: get_broker().publish(user_id, event))
@@ -0,0 +1,101 @@
+import csv
+import json
+from datetime import datetime
+from typing import Iterator
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .calendar_feed import STATUS_GROUPS
+from .models import Task
+from .overdue import effective_status
+
+# Tasks fetched per query; sessions and subtasks are prefetched once per chunk
+CHUNK_SIZE: int = 500
+FORMATS: dict[str, str] = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+CSV_COLUMNS: list[str] = [
+    "id", "title", "description", "status", "category", "priority", "points",
+    "start_date", "end_date", "reminder_date", "location", "frequency", "occurrences_count",
+    "total_hours", "sessions", "subtasks",
+]
+
+
+class _Echo:
+    """File-like object whose write() hands the line back, so csv.writer can feed a generator"""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def queryset(user, start: datetime | None = None, end: datetime | None = None, status_group: str | None = None):
+    """The user's tasks by end date, optionally inside [start, end] and one status group"""
+    tasks = Task.objects.filter(user=user)
+    if start is not None:
+        tasks = tasks.filter(end_date__gte=start)
+    if end is not None:
+        tasks = tasks.filter(end_date__lte=end)
+    if status_group:
+        tasks = tasks.filter(status__in=STATUS_GROUPS[status_group])
+    return tasks.select_related("cycle").prefetch_related("sessions", "subtasks").order_by("end_date", "id")
+
+
+def _record(task: Task, now: datetime) -> dict:
+    cycle = getattr(task, "cycle", None)
+    sessions = task.sessions.all()
+    return {
+        "id": task.id,
+        "title": task.title,
+        "description": task.description,
+        "status": effective_status(task, now),
+        "category": task.category,
+        "priority": task.priority,
+        "points": task.points,
+        "start_date": task.start_date,
+        "end_date": task.end_date,
+        "reminder_date": task.reminder_date,
+        "location": task.location,
+        "frequency": cycle.frequency if cycle else None,
+        "occurrences_count": cycle.occurrences_count if cycle else None,
+        "total_hours": task.total_hours,
+        "sessions": [
+            {"id": session.id, "start_time": session.start_time, "end_time": session.end_time}
+            for session in sessions
+        ],
+        "subtasks": [
+            {
+                "id": subtask.id, "title": subtask.title, "start_date": subtask.start_date,
+                "end_date": subtask.end_date, "priority": subtask.priority, "status": subtask.status,
+            }
+            for subtask in task.subtasks.all()
+        ],
+    }
+
+
+def records(tasks) -> Iterator[dict]:
+    now: datetime = timezone.now()
+    for task in tasks.iterator(chunk_size=CHUNK_SIZE):
+        yield _record(task, now)
+
+
+def ndjson_lines(tasks) -> Iterator[str]:
+    for record in records(tasks):
+        yield json.dumps(record, cls=DjangoJSONEncoder) + "\n"
+
+
+def csv_lines(tasks) -> Iterator[str]:
+    """One row per task; sessions and subtasks are JSON-encoded into their own columns"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for record in records(tasks):
+        for column in ("sessions", "subtasks"):
+            record[column] = json.dumps(record[column], cls=DjangoJSONEncoder)
+        for column in ("start_date", "end_date", "reminder_date"):
+            record[column] = record[column].isoformat() if record[column] else ""
+        yield writer.writerow([record[column] if record[column] is not None else "" for column in CSV_COLUMNS])
+
+
+def lines(tasks, export_format: str) -> Iterator[str]:
+    return csv_lines(tasks) if export_format == "csv" else ndjson_lines(tasks)
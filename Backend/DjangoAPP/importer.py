@@ -0,0 +1,282 @@
+import csv
+import re
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Iterable, Iterator
+from zoneinfo import ZoneInfo
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .models import CyclicTask, Task, UserProfile
+from .serializers import TaskSerializer
+from . import events, recurrence, response_cache
+
+# Rows validated and inserted per transaction; memory is bounded by one chunk
+CHUNK_SIZE: int = 1000
+# Only the first errors are kept so a broken 100k-row file cannot grow the report without bound
+MAX_REPORTED_ERRORS: int = 100
+# Series imported without COUNT or UNTIL get the model default; UNTIL is capped at this many repetitions
+# and a larger COUNT or occurrences_count is reported as a row error
+MAX_IMPORTED_OCCURRENCES: int = 500
+FORMATS: tuple = ("csv", "ics")
+
+# The export's status and points columns are not read: imported tasks start pending and are
+# worth what their priority and dates make them, so a file cannot carry in completed or inflated tasks
+TASK_COLUMNS: tuple = (
+    "title", "description", "category", "priority",
+    "start_date", "end_date", "reminder_date", "location",
+)
+DURATION_PATTERN = re.compile(
+    r"^([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$"
+)
+
+
+class InvalidImport(ValueError):
+    pass
+
+
+def format_for(filename: str | None, requested: str | None = None) -> str:
+    """The import format from an explicit choice or the file extension"""
+    if requested:
+        if requested not in FORMATS:
+            raise InvalidImport(f"as must be one of: {', '.join(FORMATS)}")
+        return requested
+    extension: str = (filename or "").rsplit(".", 1)[-1].lower()
+    if extension in ("ics", "ical", "ifb"):
+        return "ics"
+    if extension == "csv":
+        return "csv"
+    raise InvalidImport("Cannot tell the format from the file name; pass as=csv or as=ics")
+
+
+def csv_rows(lines: Iterable[str]) -> Iterator[tuple[int, dict]]:
+    """(line number, row) pairs from a CSV with a header row, e.g. one written by the export"""
+    reader = csv.DictReader(lines)
+    for row in reader:
+        data: dict = {column: row[column] for column in TASK_COLUMNS if row.get(column) not in (None, "")}
+        if row.get("frequency"):
+            data["frequency"] = row["frequency"]
+            data["occurrences_count"] = row.get("occurrences_count") or None
+        yield reader.line_num, data
+
+
+def _unfold(lines: Iterable[str]) -> Iterator[tuple[int, str]]:
+    """Join RFC 5545 folded lines (continuations start with a space or tab)"""
+    pending: str | None = None
+    pending_number: int = 0
+    for number, raw in enumerate(lines, start=1):
+        line: str = raw.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and pending is not None:
+            pending += line[1:]
+            continue
+        if pending is not None:
+            yield pending_number, pending
+        pending, pending_number = line, number
+    if pending is not None:
+        yield pending_number, pending
+
+
+def _property(line: str) -> tuple[str, dict[str, str], str]:
+    head, _, value = line.partition(":")
+    name, *params = head.split(";")
+    parsed: dict[str, str] = {}
+    for param in params:
+        key, _, param_value = param.partition("=")
+        parsed[key.upper()] = param_value.strip('"')
+    return name.upper(), parsed, value
+
+
+def _text(value: str) -> str:
+    return (value.replace("\\n", "\n").replace("\\N", "\n")
+            .replace("\\,", ",").replace("\\;", ";").replace("\\\\", "\\"))
+
+
+def _ics_datetime(value: str, params: dict[str, str]) -> datetime:
+    if params.get("VALUE") == "DATE" or len(value) == 8:
+        return timezone.make_aware(datetime.strptime(value, "%Y%m%d"))
+    if value.endswith("Z"):
+        return datetime.strptime(value[:-1], "%Y%m%dT%H%M%S").replace(tzinfo=dt_timezone.utc)
+    naive: datetime = datetime.strptime(value, "%Y%m%dT%H%M%S")
+    if "TZID" in params:
+        try:
+            return naive.replace(tzinfo=ZoneInfo(params["TZID"]))
+        except (KeyError, ValueError):
+            raise ValueError(f"Unknown time zone {params['TZID']}")
+    return timezone.make_aware(naive)
+
+
+def _duration(value: str) -> timedelta:
+    match = DURATION_PATTERN.match(value.strip().upper())
+    if not match or not any(match.groups()[1:]):
+        raise ValueError(f"Invalid duration {value}")
+    sign, weeks, days, hours, minutes, seconds = match.groups()
+    delta = timedelta(weeks=int(weeks or 0), days=int(days or 0), hours=int(hours or 0),
+                      minutes=int(minutes or 0), seconds=int(seconds or 0))
+    return -delta if sign == "-" else delta
+
+
+def _event_row(properties: dict[str, tuple[dict, str]], trigger: str | None) -> dict:
+    """Map one VEVENT's properties onto task fields"""
+    data: dict = {}
+    if "SUMMARY" in properties:
+        data["title"] = _text(properties["SUMMARY"][1])
+    if "DESCRIPTION" in properties:
+        data["description"] = _text(properties["DESCRIPTION"][1])
+    if "LOCATION" in properties:
+        data["location"] = _text(properties["LOCATION"][1])
+    if "DTSTART" not in properties:
+        raise ValueError("DTSTART is required")
+
+    start_params, start_value = properties["DTSTART"]
+    start: datetime = _ics_datetime(start_value, start_params)
+    if "DTEND" in properties:
+        end_params, end_value = properties["DTEND"]
+        end: datetime = _ics_datetime(end_value, end_params)
+        if end_params.get("VALUE") == "DATE" or len(end_value) == 8:
+            end -= timedelta(seconds=1)  # All-day DTEND is exclusive
+    elif "DURATION" in properties:
+        end = start + _duration(properties["DURATION"][1])
+    else:
+        end = start
+    data["start_date"], data["end_date"] = start, max(start, end)
+    if trigger:
+        data["reminder_date"] = start + _duration(trigger)
+
+    if "RRULE" in properties:
+        rrule: str = properties["RRULE"][1]
+        rule = recurrence.parse(rrule)
+        parts: dict[str, str] = dict(part.split("=", 1) for part in rrule.upper().split(";") if "=" in part)
+        if rule.count is not None:
+            repetitions = rule.count - 1  # COUNT includes the first event, occurrences_count does not
+        elif "UNTIL" in parts:
+            until: datetime = _ics_datetime(parts["UNTIL"], {})
+            repetitions = sum(1 for _ in rule._replace(count=MAX_IMPORTED_OCCURRENCES).between(end, end, until))
+        else:
+            repetitions = None
+        if repetitions is None or repetitions > 0:
+            data["frequency"] = recurrence.describe(rule)
+            data["occurrences_count"] = repetitions
+    return data
+
+
+def ics_rows(lines: Iterable[str]) -> Iterator[tuple[int, dict | ValueError]]:
+    """
+    (line number of BEGIN:VEVENT, task fields) pairs from an iCalendar stream, one event at a time.
+    Events that cannot be mapped yield the ValueError in place of the fields.
+    """
+    properties: dict | None = None
+    event_line: int = 0
+    nested: list[str] = []
+    trigger: str | None = None
+    for number, line in _unfold(lines):
+        if not line:
+            continue
+        name, params, value = _property(line)
+        if name == "BEGIN" and value.upper() == "VEVENT":
+            properties, event_line, nested, trigger = {}, number, [], None
+        elif properties is None:
+            continue
+        elif name == "BEGIN":
+            nested.append(value.upper())
+        elif name == "END" and nested:
+            nested.pop()
+        elif name == "END" and value.upper() == "VEVENT":
+            try:
+                yield event_line, _event_row(properties, trigger)
+            except ValueError as exc:
+                yield event_line, exc
+            properties = None
+        elif nested:
+            # Only the first alarm's relative trigger becomes the task reminder
+            if nested[-1] == "VALARM" and name == "TRIGGER" and trigger is None and params.get("VALUE") != "DATE-TIME":
+                trigger = value
+        else:
+            properties.setdefault(name, (params, value))
+
+
+class _Chunk:
+    def __init__(self) -> None:
+        self.tasks: list[Task] = []
+        self.cycles: list[CyclicTask] = []
+
+
+def _flush(chunk: _Chunk) -> None:
+    with transaction.atomic():
+        Task.objects.bulk_create(chunk.tasks)
+        CyclicTask.objects.bulk_create(chunk.cycles)
+
+
+def _cycle(task: Task, frequency: str, count) -> CyclicTask:
+    """The row's series, validated while the row can still be rejected on its own"""
+    if len(frequency) > CyclicTask._meta.get_field("frequency").max_length:
+        raise ValidationError({"frequency": ["Too long"]})
+    cycle = CyclicTask(task=task, frequency=frequency)
+    if count is not None:
+        if not str(count).isdigit() or not 1 <= int(count) <= MAX_IMPORTED_OCCURRENCES:
+            raise ValidationError({"occurrences_count": [f"Must be between 1 and {MAX_IMPORTED_OCCURRENCES}"]})
+        cycle.occurrences_count = int(count)
+    try:
+        # bulk_create skips CyclicTask.save(), which derives series_end
+        cycle.series_end = cycle.compute_series_end()
+    except (OverflowError, ValueError) as exc:
+        raise ValidationError({"frequency": [str(exc)]})
+    return cycle
+
+
+def run(user, rows: Iterable[tuple[int, dict | ValueError]]) -> dict:
+    """
+    Validate rows with TaskSerializer and insert them CHUNK_SIZE at a time, each chunk in its own
+    transaction. Invalid rows are skipped and reported by line number.
+    """
+    validator = TaskSerializer()
+    chunk = _Chunk()
+    created: int = 0
+    cyclic: int = 0
+    failed: int = 0
+    errors: list[dict] = []
+
+    def reject(line: int, detail) -> None:
+        nonlocal failed
+        failed += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({"line": line, "errors": detail})
+
+    for line, data in rows:
+        if isinstance(data, ValueError):
+            reject(line, {"non_field_errors": [str(data)]})
+            continue
+        frequency: str | None = data.pop("frequency", None)
+        count = data.pop("occurrences_count", None)
+        try:
+            validated: dict = validator.run_validation(data)
+            for field in ("user", "status", "points"):
+                validated.pop(field, None)
+            task = Task(user=user, status="pending", **validated)
+            task.points = task.compute_points()
+            cycle: CyclicTask | None = _cycle(task, frequency, count) if frequency is not None else None
+        except ValidationError as exc:
+            reject(line, exc.detail)
+            continue
+
+        chunk.tasks.append(task)
+        if cycle is not None:
+            chunk.cycles.append(cycle)
+        if len(chunk.tasks) >= CHUNK_SIZE:
+            _flush(chunk)
+            created, cyclic = created + len(chunk.tasks), cyclic + len(chunk.cycles)
+            chunk = _Chunk()
+
+    if chunk.tasks:
+        _flush(chunk)
+        created, cyclic = created + len(chunk.tasks), cyclic + len(chunk.cycles)
+    if created:
+        UserProfile.objects.filter(user=user).update(task_version=F("task_version") + 1)
+        response_cache.bump(user.pk)
+        events.publish(user.pk, {"type": "tasks.imported", "created": created})
+    return {"created": created, "cyclic": cyclic, "failed": failed, "errors": errors}
+
+
+def rows_for(lines: Iterable[str], import_format: str) -> Iterator[tuple[int, dict | ValueError]]:
+    return csv_rows(lines) if import_format == "csv" else ics_rows(lines)
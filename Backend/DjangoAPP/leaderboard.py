@@ -0,0 +1,200 @@
+import bisect
+from datetime import datetime, timedelta
+
+from django.core.cache import cache
+from django.db.models import F, Q, Sum, Window
+from django.db.models.functions import Coalesce, Mod, RowNumber
+from django.utils import timezone
+
+from .models import DailyPoints, LeaderboardEntry, UserProfile
+from . import daily_points, response_cache
+
+
+# Rank lookups count live rows only back to the nearest cached boundary, about this many at most
+RANK_BUCKET_SIZE: int = 1000
+RANK_BUCKETS_TIMEOUT: int = 300
+RANK_BUCKETS_KEY: str = "leaderboard:rank_buckets"
+
+
+def window_starts(now: datetime | None = None) -> tuple[datetime, datetime]:
+    """Return the start of the current month and of the 'last 3 months' window"""
+    now = now or timezone.now()
+    current_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    three_months_ago = (current_month - timedelta(days=90)).replace(day=1)
+    return current_month, three_months_ago
+
+
+def rebuild(user_ids=None) -> int:
+    """Recompute leaderboard rows from UserProfile totals and the per-day points buckets"""
+    current_month, three_months_ago = window_starts()
+
+    profiles = UserProfile.objects.all()
+    if user_ids is not None:
+        profiles = profiles.filter(user_id__in=list(user_ids))
+    totals: dict[int, int] = dict(profiles.values_list("user_id", "total_points_earned"))
+    if not totals:
+        return 0
+
+    windows = (
+        DailyPoints.objects.filter(user_id__in=totals.keys(), day__gte=three_months_ago.date())
+        .values("user_id")
+        .annotate(
+            current=Coalesce(Sum("points", filter=Q(day__gte=current_month.date())), 0),
+            last3=Coalesce(Sum("points"), 0),
+        )
+        .order_by()
+    )
+    window_points = {row["user_id"]: (row["current"], row["last3"]) for row in windows}
+
+    entries = [
+        LeaderboardEntry(
+            user_id=user_id,
+            points=points,
+            current_month=window_points.get(user_id, (0, 0))[0],
+            last3_months=window_points.get(user_id, (0, 0))[1],
+            period=current_month.date(),
+        )
+        for user_id, points in totals.items()
+    ]
+    LeaderboardEntry.objects.bulk_create(
+        entries,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=["user"],
+        update_fields=["points", "current_month", "last3_months", "period"],
+    )
+    cache.delete(RANK_BUCKETS_KEY)
+    response_cache.bump(rankings=True)
+    return len(entries)
+
+
+def refresh_stale() -> int:
+    """Rebuild rows whose window columns belong to a previous month"""
+    current_month, _ = window_starts()
+    fresh_key: str = f"leaderboard:fresh:{current_month.date().isoformat()}"
+    if cache.get(fresh_key):
+        return 0
+    stale = LeaderboardEntry.objects.exclude(period=current_month.date()).values_list("user_id", flat=True)
+    rebuilt: int = rebuild(list(stale))
+    cache.set(fresh_key, True, timeout=None)
+    return rebuilt
+
+
+def record_completions(user, completions: list) -> None:
+    """Apply awarded points and window sums of freshly completed tasks"""
+    current_month, three_months_ago = window_starts()
+
+    awarded: int = 0
+    current_points: int = 0
+    last3_points: int = 0
+    for task, points_awarded in completions:
+        awarded += points_awarded
+        if task.status != "done" or not task.end_date:
+            continue
+        if task.end_date >= three_months_ago:
+            last3_points += task.points
+        if task.end_date >= current_month:
+            current_points += task.points
+
+    updated: int = LeaderboardEntry.objects.filter(user=user, period=current_month.date()).update(
+        points=F("points") + awarded,
+        current_month=F("current_month") + current_points,
+        last3_months=F("last3_months") + last3_points,
+    )
+    if not updated:
+        rebuild([user.pk])
+
+
+def rescore(user_id: int, changes: list[tuple[tuple | None, tuple | None]]) -> None:
+    """
+    Move the points of edited, re-dated or deleted done tasks in the day buckets and window columns.
+    Each change is a task's score() before and after; `points` follows total_points_earned and stays.
+    """
+    deltas: list[tuple[datetime, int, int]] = []
+    for before, after in changes:
+        if before == after:
+            continue
+        if before is not None:
+            deltas.append((before[0], -before[1], -1))
+        if after is not None:
+            deltas.append((after[0], after[1], 1))
+    if not deltas:
+        return
+    daily_points.adjust(user_id, deltas)
+
+    current_month, three_months_ago = window_starts()
+    current_points: int = sum(points for end_date, points, _ in deltas if end_date >= current_month)
+    last3_points: int = sum(points for end_date, points, _ in deltas if end_date >= three_months_ago)
+    if current_points or last3_points:
+        # A row from a previous month is rebuilt from the adjusted buckets by refresh_stale()
+        LeaderboardEntry.objects.filter(user_id=user_id, period=current_month.date()).update(
+            current_month=F("current_month") + current_points,
+            last3_months=F("last3_months") + last3_points,
+        )
+        response_cache.bump(rankings=True)
+
+
+def ranked_entries(offset: int = 0, limit: int | None = None):
+    """Leaderboard rows in rank order, optionally sliced for pagination"""
+    refresh_stale()
+    entries = LeaderboardEntry.objects.select_related("user").order_by("-points", "user_id")
+    if limit is None:
+        return entries[offset:]
+    return entries[offset:offset + limit]
+
+
+def _ahead_of(points: int, user_id: int) -> Q:
+    return Q(points__gt=points) | Q(points=points, user_id__lt=user_id)
+
+
+def _behind(points: int, user_id: int) -> Q:
+    return Q(points__lt=points) | Q(points=points, user_id__gt=user_id)
+
+
+def rank_buckets() -> list[tuple[int, int, int]]:
+    """(points, user_id, position) of every RANK_BUCKET_SIZE-th entry in rank order, from a cached snapshot"""
+    buckets = cache.get(RANK_BUCKETS_KEY)
+    if buckets is None:
+        positioned = LeaderboardEntry.objects.annotate(
+            position=Window(RowNumber(), order_by=[F("points").desc(), F("user_id").asc()])
+        )
+        buckets = list(
+            positioned.annotate(slot=Mod(F("position") - 1, RANK_BUCKET_SIZE)).filter(slot=0)
+            .order_by("position").values_list("points", "user_id", "position")
+        )
+        cache.set(RANK_BUCKETS_KEY, buckets, RANK_BUCKETS_TIMEOUT)
+    return buckets
+
+
+def rank_of(entry: LeaderboardEntry) -> int:
+    """
+    1-based position of an entry in the (-points, user_id) ordering. Only the rows between the entry and
+    the nearest bucket boundary above it are counted live; the boundary's position comes from the snapshot,
+    so deep ranks can lag by whatever moved past that boundary in the last RANK_BUCKETS_TIMEOUT seconds.
+    Entries in the first bucket (the top RANK_BUCKET_SIZE) are always counted exactly.
+    """
+    ahead = LeaderboardEntry.objects.filter(_ahead_of(entry.points, entry.user_id))
+    buckets: list[tuple[int, int, int]] = rank_buckets()
+    index: int = bisect.bisect_right(buckets, (-entry.points, entry.user_id), key=lambda row: (-row[0], row[1])) - 1
+    if index <= 0:
+        return ahead.count() + 1
+    points, user_id, position = buckets[index]
+    return position + ahead.exclude(_ahead_of(points, user_id)).count()
+
+
+def neighbors(entry: LeaderboardEntry, count: int) -> tuple[list[LeaderboardEntry], list[LeaderboardEntry]]:
+    """Up to `count` entries directly above and below, each list in rank order"""
+    entries = LeaderboardEntry.objects.select_related("user")
+    above = list(entries.filter(_ahead_of(entry.points, entry.user_id)).order_by("points", "-user_id")[:count])
+    below = list(entries.filter(_behind(entry.points, entry.user_id)).order_by("-points", "user_id")[:count])
+    return above[::-1], below
+
+
+def entry_for(user) -> LeaderboardEntry:
+    """Return the user's leaderboard row, building it on first access"""
+    current_month, _ = window_starts()
+    entry = LeaderboardEntry.objects.filter(user=user, period=current_month.date()).first()
+    if entry is None:
+        rebuild([user.pk])
+        entry, _ = LeaderboardEntry.objects.get_or_create(user=user, defaults={"period": current_month.date()})
+    return entry
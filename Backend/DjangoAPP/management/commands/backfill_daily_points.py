@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from DjangoAPP import daily_points, leaderboard
+
+
+class Command(BaseCommand):
+    help: str = "Rebuild the per-day points buckets from done Task history"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--user", type=int, action="append", dest="user_ids", help="Only backfill the given user id(s)")
+        parser.add_argument("--skip-leaderboard", action="store_true", help="Do not rebuild the leaderboard windows afterwards")
+
+    def handle(self, *args, **options) -> None:
+        created: int = daily_points.backfill(options["user_ids"])
+        self.stdout.write(self.style.SUCCESS(f"Created {created} daily points buckets"))
+        if not options["skip_leaderboard"]:
+            rebuilt: int = leaderboard.rebuild(options["user_ids"])
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuilt} leaderboard entries"))
@@ -0,0 +1,73 @@
+import json
+import time
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from DjangoAPP import benchmark
+
+
+class Command(BaseCommand):
+    help: str = (
+        "Seed synthetic data into a throwaway test database and report latency, query count and peak "
+        "memory of the main API endpoints as JSON"
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--scale", action="append", dest="scales",
+                            help=f"Task count: {', '.join(benchmark.SCALES)} or an integer; repeatable (default 1k)")
+        parser.add_argument("--repeat", type=int, default=5, help="Measured runs per endpoint after one warm-up run")
+        parser.add_argument("--tasks-per-user", type=int, default=benchmark.TASKS_PER_USER,
+                            help="Seeded tasks per user; the user count is the scale divided by this")
+        parser.add_argument("--cold", action="store_true", help="Clear the cache before every measured run")
+        parser.add_argument("--output", help="Write the report to this file instead of stdout")
+
+    def handle(self, *args, **options) -> None:
+        try:
+            scales: dict[str, int] = {name: benchmark.scale_of(name) for name in options["scales"] or ["1k"]}
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        if options["repeat"] < 1 or options["tasks_per_user"] <= options["repeat"] * benchmark.DONE_EVERY:
+            raise CommandError("--repeat must be positive and --tasks-per-user large enough to leave pending tasks")
+
+        report: dict = {
+            "generated_at": timezone.now().isoformat(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "repeat": options["repeat"],
+            "cold": options["cold"],
+            "scales": {},
+        }
+        # DEBUG stays off so the query log does not inflate memory; counts come from CaptureQueriesContext
+        setup_test_environment(debug=False)
+        try:
+            for name, task_count in scales.items():
+                runner = DiscoverRunner(verbosity=0, interactive=False)
+                databases = runner.setup_databases()
+                try:
+                    started: float = time.perf_counter()
+                    user = benchmark.seed(task_count, options["tasks_per_user"])
+                    seeded: float = time.perf_counter() - started
+                    report["scales"][name] = {
+                        "tasks": task_count,
+                        "users": max(task_count // options["tasks_per_user"], 1),
+                        "seed_seconds": round(seeded, 2),
+                        "endpoints": benchmark.run(user, options["repeat"], options["cold"], tuple(connections)),
+                    }
+                finally:
+                    runner.teardown_databases(databases)
+                self.stderr.write(f"Benchmarked {name}")
+        finally:
+            teardown_test_environment()
+
+        output: str = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as handle:
+                handle.write(output + "\n")
+            self.stdout.write(self.style.SUCCESS(f"Wrote benchmark report to {options['output']}"))
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,18 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from DjangoAPP import response_cache
+
+
+class Command(BaseCommand):
+    help: str = "Print the response cache hit and miss counters as JSON"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--reset", action="store_true", help="Zero the counters after printing them")
+
+    def handle(self, *args, **options) -> None:
+        self.stdout.write(json.dumps(response_cache.stats()))
+        if options["reset"]:
+            response_cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset"))
@@ -0,0 +1,28 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from DjangoAPP import importer
+
+
+class Command(BaseCommand):
+    help: str = "Import tasks for a user from a CSV or iCalendar (ICS) file, streaming it in chunks"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("path", help="CSV or ICS file to import")
+        parser.add_argument("--user", required=True, help="Username that will own the tasks")
+        parser.add_argument("--as", dest="import_format", choices=importer.FORMATS, help="Format, if the extension does not tell")
+
+    def handle(self, *args, **options) -> None:
+        try:
+            user = User.objects.get(username=options["user"])
+            import_format = importer.format_for(options["path"], options["import_format"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['user']}")
+        except importer.InvalidImport as exc:
+            raise CommandError(str(exc))
+
+        with open(options["path"], encoding="utf-8-sig", errors="replace", newline="") as lines:
+            summary: dict = importer.run(user, importer.rows_for(lines, import_format))
+        self.stdout.write(json.dumps(summary))
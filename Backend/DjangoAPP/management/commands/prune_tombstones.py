@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from DjangoAPP import sync
+
+
+class Command(BaseCommand):
+    help: str = "Delete task tombstones older than the delta-sync retention window"
+
+    def handle(self, *args, **options) -> None:
+        removed: int = sync.prune()
+        self.stdout.write(f"Removed {removed} tombstones")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from DjangoAPP import leaderboard
+
+
+class Command(BaseCommand):
+    help: str = "Rebuild the materialized leaderboard from UserProfile totals and Task history"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--user", type=int, action="append", dest="user_ids", help="Only rebuild the given user id(s)")
+
+    def handle(self, *args, **options) -> None:
+        rebuilt: int = leaderboard.rebuild(options["user_ids"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuilt} leaderboard entries"))
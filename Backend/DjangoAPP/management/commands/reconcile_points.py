@@ -0,0 +1,20 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from DjangoAPP import points
+
+
+class Command(BaseCommand):
+    help: str = "Compare UserProfile point balances with the points ledger and optionally repair drift"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--user", type=int, action="append", dest="user_ids", help="Only check the given user id(s)")
+        parser.add_argument("--fix", action="store_true", help="Overwrite drifted balances with the ledger sums")
+
+    def handle(self, *args, **options) -> None:
+        drifted: list[dict] = points.reconcile(options["user_ids"], fix=options["fix"])
+        for row in drifted:
+            self.stdout.write(json.dumps(row))
+        summary: str = f"{len(drifted)} drifted profiles" + (" repaired" if options["fix"] else "")
+        self.stdout.write(self.style.SUCCESS(summary) if not drifted or options["fix"] else self.style.WARNING(summary))
@@ -0,0 +1,27 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from DjangoAPP import achievements, response_cache
+
+
+class Command(BaseCommand):
+    help: str = "Recompute achievement counters from Task history and re-apply every achievement rule"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--user", type=int, action="append", dest="user_ids", help="Only re-evaluate the given user id(s)")
+        parser.add_argument("--revoke", action="store_true", help="Remove achievements whose rule is no longer met")
+
+    def handle(self, *args, **options) -> None:
+        users = User.objects.order_by("id")
+        if options["user_ids"]:
+            users = users.filter(id__in=options["user_ids"])
+
+        evaluated: int = 0
+        unlocked: int = 0
+        for user in users.iterator(chunk_size=500):
+            with transaction.atomic():
+                unlocked += len(achievements.evaluate_user(user, revoke=options["revoke"]))
+                response_cache.bump(user.pk)
+            evaluated += 1
+        self.stdout.write(self.style.SUCCESS(f"Re-evaluated {evaluated} users, unlocked {unlocked} achievements"))
@@ -0,0 +1,23 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from DjangoAPP import overdue
+
+
+class Command(BaseCommand):
+    help: str = "Mark expired pending / in progress tasks as overdue, in batches across all users"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows updated per statement")
+        parser.add_argument("--loop", action="store_true", help="Keep sweeping every --interval seconds")
+        parser.add_argument("--interval", type=float, default=60.0, help="Seconds between sweeps with --loop")
+
+    def handle(self, *args, **options) -> None:
+        while True:
+            result: dict = overdue.sweep(batch_size=options["batch_size"])
+            self.stdout.write(json.dumps(result))
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,144 @@
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+
+from . import response_cache
+
+PREFIX: str = "taskero"
+SECONDS_BUCKETS: tuple = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS: tuple = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+BYTES_BUCKETS: tuple = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class RequestStats:
+    """What one request spent, filled in by record_sql() and the serializers"""
+    __slots__ = ("queries", "sql_time", "serializer_time", "serializing")
+
+    def __init__(self) -> None:
+        self.queries: int = 0
+        self.sql_time: float = 0.0
+        self.serializer_time: float = 0.0
+        self.serializing: bool = False
+
+
+_current: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def current() -> RequestStats | None:
+    return _current.get()
+
+
+def record_sql(execute, sql, params, many, context):
+    """
+    Database execute wrapper timing each statement into the current request's stats. The stats
+    travel in a context variable, so statements run by sync views in an executor thread under
+    ASGI are counted too.
+    """
+    stats: RequestStats | None = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started: float = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.sql_time += time.perf_counter() - started
+        stats.queries += 1
+
+
+def install(connection, **kwargs) -> None:
+    """Add record_sql to a connection's execute wrappers; also a connection_created receiver"""
+    if record_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_sql)
+
+
+def start() -> tuple[RequestStats, object]:
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+
+def stop(token) -> None:
+    _current.reset(token)
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: tuple) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        # labels -> per-bucket counts (non-cumulative, the last one is +Inf), sum
+        self.series: dict[tuple, tuple[list[int], list[float]]] = {}
+
+    def observe(self, labels: tuple, value: float) -> None:
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+        counts, total = series
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def render(self, label_names: tuple) -> list[str]:
+        lines: list[str] = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(self.series.items()):
+            base: str = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(label_names, labels))
+            cumulative: int = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{base},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{base}}} {total[0]:.6f}")
+            lines.append(f"{self.name}_count{{{base}}} {cumulative}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Registry:
+    """Per-process request histograms labelled by view and action"""
+    LABELS: tuple = ("view", "action")
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.duration = Histogram(f"{PREFIX}_request_duration_seconds", "Total time spent handling the request", SECONDS_BUCKETS)
+        self.queries = Histogram(f"{PREFIX}_request_sql_queries", "SQL statements executed per request", QUERY_BUCKETS)
+        self.sql = Histogram(f"{PREFIX}_request_sql_duration_seconds", "Time spent in SQL per request", SECONDS_BUCKETS)
+        self.serializer = Histogram(f"{PREFIX}_request_serializer_duration_seconds", "Time spent serializing per request", SECONDS_BUCKETS)
+        self.size = Histogram(f"{PREFIX}_response_size_bytes", "Response body size", BYTES_BUCKETS)
+
+    def observe(self, view: str, action: str, stats: RequestStats, duration: float, size: int | None) -> None:
+        labels: tuple = (view, action)
+        with self._lock:
+            self.duration.observe(labels, duration)
+            self.queries.observe(labels, stats.queries)
+            self.sql.observe(labels, stats.sql_time)
+            self.serializer.observe(labels, stats.serializer_time)
+            if size is not None:  # Streamed bodies have no size up front
+                self.size.observe(labels, size)
+
+    def render(self) -> str:
+        with self._lock:
+            lines: list[str] = []
+            for histogram in (self.duration, self.queries, self.sql, self.serializer, self.size):
+                lines.extend(histogram.render(self.LABELS))
+        cache_stats: dict = response_cache.stats()
+        for kind in ("hits", "misses"):
+            name: str = f"{PREFIX}_response_cache_{kind}_total"
+            lines.extend([f"# HELP {name} Response cache {kind}", f"# TYPE {name} counter", f"{name} {cache_stats[kind]}"])
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            for histogram in (self.duration, self.queries, self.sql, self.serializer, self.size):
+                histogram.series.clear()
+
+
+registry = Registry()
+
+
+def server_timing(stats: RequestStats, duration: float) -> str:
+    return (
+        f'db;dur={stats.sql_time * 1000:.1f};desc="{stats.queries} queries", '
+        f"serialize;dur={stats.serializer_time * 1000:.1f}, "
+        f"total;dur={duration * 1000:.1f}"
+    )
@@ -0,0 +1,106 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from . import metrics, nplusone
+
+
+class RequestMetricsMiddleware:
+    """
+    Record SQL count and time, serializer time, response size and latency per view and action,
+    add them to the response as a Server-Timing header and feed the /metrics histograms.
+    Removed from the chain entirely when REQUEST_METRICS_ENABLED is off.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response) -> None:
+        if not getattr(settings, "REQUEST_METRICS_ENABLED", False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.server_timing: bool = getattr(settings, "REQUEST_METRICS_SERVER_TIMING", False)
+        self.is_async: bool = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        # Connections are per thread; new ones get the SQL wrapper as they connect
+        connection_created.connect(metrics.install, dispatch_uid="request_metrics_sql")
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        for connection in connections.all(initialized_only=True):
+            metrics.install(connection)
+        started: float = time.perf_counter()
+        stats, token = metrics.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.stop(token)
+        return self._finish(request, response, stats, started)
+
+    async def __acall__(self, request):
+        started: float = time.perf_counter()
+        stats, token = metrics.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.stop(token)
+        return self._finish(request, response, stats, started)
+
+    def _finish(self, request, response, stats: metrics.RequestStats, started: float):
+        # Streamed responses (export, event stream) are measured up to their first byte
+        duration: float = time.perf_counter() - started
+        view, action = getattr(request, "_metrics_view", ("unresolved", request.method.lower()))
+        size: int | None = None if response.streaming else len(response.content)
+        metrics.registry.observe(view, action, stats, duration, size)
+        if self.server_timing:
+            response["Server-Timing"] = metrics.server_timing(stats, duration)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs) -> None:
+        # DRF viewsets expose their class and the method -> action mapping on the view function
+        view_class = getattr(view_func, "cls", None)
+        actions: dict = getattr(view_func, "actions", None) or {}
+        request._metrics_view = (
+            view_class.__name__ if view_class is not None else view_func.__name__,
+            actions.get(request.method.lower(), request.method.lower()),
+        )
+
+
+class NPlusOneMiddleware:
+    """
+    Development aid reporting SELECT templates that one request runs more than NPLUSONE_THRESHOLD
+    times, with the project frames that issued them. NPLUSONE_MODE "log" writes a warning,
+    "raise" fails the request with NPlusOneError; unset removes the middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response) -> None:
+        self.mode: str | None = getattr(settings, "NPLUSONE_MODE", None)
+        if self.mode not in ("log", "raise"):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.threshold: int = getattr(settings, "NPLUSONE_THRESHOLD", nplusone.DEFAULT_THRESHOLD)
+        self.is_async: bool = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        connection_created.connect(nplusone.install, dispatch_uid="nplusone_sql")
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with nplusone.detect(self.threshold, f"{request.method} {request.path}") as detector:
+            response = self.get_response(request)
+        nplusone.finish(detector, self.mode)
+        return response
+
+    async def __acall__(self, request):
+        with nplusone.detect(self.threshold, f"{request.method} {request.path}") as detector:
+            response = await self.get_response(request)
+        nplusone.finish(detector, self.mode)
+        return response
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def seed_entries(apps, schema_editor):
+    UserProfile = apps.get_model('DjangoAPP', 'UserProfile')
+    LeaderboardEntry = apps.get_model('DjangoAPP', 'LeaderboardEntry')
+    LeaderboardEntry.objects.bulk_create(
+        [
+            LeaderboardEntry(user_id=user_id, points=points)
+            for user_id, points in UserProfile.objects.values_list('user_id', 'total_points_earned')
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('DjangoAPP', '0012_task_category_task_location_task_reminder_date'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('points', models.IntegerField(default=0)),
+                ('current_month', models.IntegerField(default=0)),
+                ('last3_months', models.IntegerField(default=0)),
+                ('period', models.DateField(blank=True, null=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entry', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-points', 'user'], name='leaderboard_rank_idx')],
+            },
+        ),
+        migrations.RunPython(seed_entries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce, TruncDate
+
+
+def backfill_buckets(apps, schema_editor):
+    Task = apps.get_model('DjangoAPP', 'Task')
+    DailyPoints = apps.get_model('DjangoAPP', 'DailyPoints')
+    rows = (
+        Task.objects.filter(status='done', end_date__isnull=False, user__isnull=False)
+        .annotate(day=TruncDate('end_date'))
+        .values('user_id', 'day')
+        .annotate(points=Coalesce(Sum('points'), 0), tasks_done=Count('id'))
+        .order_by()
+    )
+    DailyPoints.objects.bulk_create(
+        [DailyPoints(user_id=row['user_id'], day=row['day'], points=row['points'], tasks_done=row['tasks_done']) for row in rows],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('DjangoAPP', '0013_leaderboardentry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyPoints',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('points', models.IntegerField(default=0)),
+                ('tasks_done', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_points', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'day'), name='daily_points_user_day_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_buckets, migrations.RunPython.noop),
+    ]
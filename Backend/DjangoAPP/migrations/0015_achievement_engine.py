@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('DjangoAPP', '0014_dailypoints'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AchievementProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tasks_done', models.IntegerField(default=0)),
+                ('early_tasks', models.IntegerField(default=0)),
+                ('night_tasks', models.IntegerField(default=0)),
+                ('weekend_tasks', models.IntegerField(default=0)),
+                ('current_streak', models.IntegerField(default=0)),
+                ('max_streak', models.IntegerField(default=0)),
+                ('last_active_day', models.DateField(blank=True, null=True)),
+                ('best_day_points', models.IntegerField(default=0)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='achievement_progress', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserAchievement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('achievement_id', models.IntegerField()),
+                ('unlocked_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='achievements', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'achievement_id'), name='user_achievement_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('DjangoAPP', '0015_achievement_engine'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'in progress'])), fields=['end_date', 'id'], name='task_active_end_date_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('DjangoAPP', '0016_task_active_end_date_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='subtask',
+            index=models.Index(fields=['parent_task', 'start_date', 'end_date'], name='subtask_window_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'start_date', 'end_date'], name='task_user_window_idx'),
+        ),
+    ]
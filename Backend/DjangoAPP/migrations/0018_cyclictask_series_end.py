@@ -0,0 +1,86 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:21
+
+import calendar
+import re
+from datetime import datetime, timedelta
+
+from django.db import migrations, models
+
+# Frequency parsing as DjangoAPP.recurrence had it when this migration was written; copied so
+# later changes to that module cannot change what the migration computes
+UNIT_ALIASES = {
+    "day": "day", "days": "day", "daily": "day",
+    "week": "week", "weeks": "week", "weekly": "week",
+    "month": "month", "months": "month", "monthly": "month",
+    "year": "year", "years": "year", "yearly": "year", "annually": "year",
+}
+NAMED_FREQUENCIES = {
+    "biweekly": ("week", 2),
+    "fortnightly": ("week", 2),
+    "quarterly": ("month", 3),
+}
+EVERY_PATTERN = re.compile(r"^every\s+(\d+)\s+([a-z]+)$")
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    month_index = value.month - 1 + months
+    year = value.year + month_index // 12
+    month = month_index % 12 + 1
+    return value.replace(year=year, month=month, day=min(value.day, calendar.monthrange(year, month)[1]))
+
+
+def parse(frequency: str, count: int | None) -> tuple[str, int, int | None]:
+    value = (frequency or "").strip().lower()
+    if value.startswith("rrule:"):
+        value = value[len("rrule:"):]
+    if "freq=" in value:
+        parts = dict(part.split("=", 1) for part in value.split(";") if "=" in part)
+        interval = int(parts["interval"]) if parts.get("interval", "").isdigit() else 1
+        if parts.get("count", "").isdigit():
+            count = int(parts["count"])
+        return UNIT_ALIASES.get(parts.get("freq", ""), "week"), max(interval, 1), count
+    if value in NAMED_FREQUENCIES:
+        return (*NAMED_FREQUENCIES[value], count)
+    if value in UNIT_ALIASES:
+        return UNIT_ALIASES[value], 1, count
+    match = EVERY_PATTERN.match(value)
+    if match and match.group(2) in UNIT_ALIASES:
+        return UNIT_ALIASES[match.group(2)], max(int(match.group(1)), 1), count
+    return "week", 1, count
+
+
+def series_end(frequency: str, count: int | None, base: datetime) -> datetime | None:
+    unit, interval, count = parse(frequency, count)
+    if count is None:
+        return None
+    if count <= 0:
+        return base
+    if unit == "day":
+        return base + timedelta(days=count * interval)
+    if unit == "week":
+        return base + timedelta(weeks=count * interval)
+    return add_months(base, count * interval * (12 if unit == "year" else 1))
+
+
+def fill_series_end(apps, schema_editor):
+    CyclicTask = apps.get_model('DjangoAPP', 'CyclicTask')
+    cycles = list(CyclicTask.objects.select_related('task').filter(task__end_date__isnull=False))
+    for cycle in cycles:
+        cycle.series_end = series_end(cycle.frequency, cycle.occurrences_count, cycle.task.end_date)
+    CyclicTask.objects.bulk_update(cycles, ['series_end'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('DjangoAPP', '0017_calendar_window_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cyclictask',
+            name='series_end',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(fill_series_end, migrations.RunPython.noop),
+    ]
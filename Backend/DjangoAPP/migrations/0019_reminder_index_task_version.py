@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('DjangoAPP', '0018_cyclictask_series_end'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='task_version',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(models.Q(('status__in', ['done', 'abandoned']), _negated=True), ('reminder_date__isnull', False)), fields=['user', 'reminder_date'], name='task_pending_reminder_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def open_balances(apps, schema_editor):
+    UserProfile = apps.get_model('DjangoAPP', 'UserProfile')
+    PointsTransaction = apps.get_model('DjangoAPP', 'PointsTransaction')
+    rows = []
+    for user_id, earned, spent in UserProfile.objects.values_list('user_id', 'total_points_earned', 'points_spent'):
+        if earned:
+            rows.append(PointsTransaction(user_id=user_id, kind='opening', amount=earned))
+        if spent:
+            rows.append(PointsTransaction(user_id=user_id, kind='opening', amount=-spent))
+    PointsTransaction.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('DjangoAPP', '0020_delta_sync'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PointsTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('award', 'Award'), ('spend', 'Spend'), ('opening', 'Opening balance')], max_length=20)),
+                ('amount', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('task', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='points_transactions', to='DjangoAPP.task')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='points_transactions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'created_at'], name='points_tx_user_created_idx')],
+            },
+        ),
+        migrations.RunPython(open_balances, migrations.RunPython.noop),
+    ]
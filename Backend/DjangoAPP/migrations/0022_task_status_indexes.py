@@ -0,0 +1,62 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:01
+
+import logging
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+logger = logging.getLogger(__name__)
+
+KNOWN_STATUSES = ['pending', 'in progress', 'done', 'overdue', 'abandoned', '']
+# Free text that is no known status in any spelling; closed without points rather than reopened
+UNKNOWN_STATUS = 'abandoned'
+
+
+def map_unknown_statuses(apps, schema_editor):
+    # Rows written before status had choices may hold free text the new constraint rejects
+    Task = apps.get_model('DjangoAPP', 'Task')
+    unknown = (
+        Task.objects.exclude(status__in=KNOWN_STATUSES)
+        .values('status').annotate(rows=Count('id')).order_by().values_list('status', 'rows')
+    )
+    for status, rows in list(unknown):
+        normalized = ' '.join(status.split()).lower()
+        target = normalized if normalized in KNOWN_STATUSES else UNKNOWN_STATUS
+        Task.objects.filter(status=status).update(status=target)
+        logger.warning("Task status %r on %d rows set to %r", status, rows, target)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('DjangoAPP', '0021_points_ledger'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(map_unknown_statuses, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='task',
+            name='status',
+            field=models.CharField(blank=True, choices=[('pending', 'Pending'), ('in progress', 'In Progress'), ('done', 'Done'), ('overdue', 'Overdue'), ('abandoned', 'Abandoned')], default='pending', max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='user',
+            field=models.ForeignKey(db_index=False, default=None, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'in progress', 'overdue'])), fields=['user', 'end_date'], name='task_user_active_end_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status__in', ['done', 'abandoned'])), fields=['user', 'end_date'], name='task_user_done_end_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='task',
+            constraint=models.CheckConstraint(condition=models.Q(('status__in', ['pending', 'in progress', 'done', 'overdue', 'abandoned', ''])), name='task_status_valid'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:30
+
+from django.db import migrations, models
+from django.db.models import Max
+
+SPEED_DEMON: int = 3
+ELITE_MEMBER: int = 5
+ELITE_RANK: int = 10
+
+
+def fill_best_task_points(apps, schema_editor):
+    # Speed Demon counts a single task of 100 points again, not a 100 point day
+    AchievementProgress = apps.get_model('DjangoAPP', 'AchievementProgress')
+    Task = apps.get_model('DjangoAPP', 'Task')
+    UserAchievement = apps.get_model('DjangoAPP', 'UserAchievement')
+    best: dict = dict(
+        Task.objects.filter(status='done', user__isnull=False)
+        .values('user_id').annotate(best=Max('points')).order_by().values_list('user_id', 'best')
+    )
+    rows = list(AchievementProgress.objects.all())
+    for progress in rows:
+        progress.best_task_points = best.get(progress.user_id) or 0
+    AchievementProgress.objects.bulk_update(rows, ['best_task_points'], batch_size=1000)
+    qualified = [user_id for user_id, points in best.items() if (points or 0) >= 100]
+    UserAchievement.objects.filter(achievement_id=SPEED_DEMON).exclude(user_id__in=qualified).delete()
+    # Elite Member is lost again outside the top 10, in leaderboard order
+    LeaderboardEntry = apps.get_model('DjangoAPP', 'LeaderboardEntry')
+    top = list(LeaderboardEntry.objects.order_by('-points', 'user_id').values_list('user_id', flat=True)[:ELITE_RANK])
+    UserAchievement.objects.filter(achievement_id=ELITE_MEMBER).exclude(user_id__in=top).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('DjangoAPP', '0022_task_status_indexes'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='achievementprogress',
+            old_name='best_day_points',
+            new_name='best_task_points',
+        ),
+        migrations.RunPython(fill_best_task_points, migrations.RunPython.noop),
+    ]
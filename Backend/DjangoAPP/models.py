@@ -16,26 +16,72 @@ CATEGORY_CHOICES: list[tuple] = [
     ("private", "Private"),
 ]
 
+POINTS_TRANSACTION_KINDS: list[tuple] = [
+    ("award", "Award"),
+    ("spend", "Spend"),
+    ("opening", "Opening balance"),
+]
+
 class Task(models.Model):
-    user: int = models.ForeignKey(User, null=True, default=None, on_delete=models.CASCADE, related_name="tasks")
+    # No standalone index: the composite indexes below all lead with user
+    user: int = models.ForeignKey(User, null=True, default=None, on_delete=models.CASCADE, related_name="tasks", db_index=False)
     title: str = models.CharField(max_length=200)
     description: str = models.TextField(blank=True)
     start_date: datetime = models.DateTimeField(null=True, blank=True)
     end_date: datetime = models.DateTimeField(null=True, blank=True)
     priority: int = models.IntegerField(default=0)
     points: int = models.IntegerField(default=0)
-    status: str = models.CharField(max_length=50, blank=True, default="pending")
+    status: str = models.CharField(max_length=50, blank=True, default="pending", choices=STATUS_CHOICES)
     category: str = models.CharField(max_length=20, choices=CATEGORY_CHOICES, default="private", blank=True)
     reminder_date: datetime = models.DateTimeField(null=True, blank=True)
     location: str = models.CharField(max_length=200, blank=True)
+    updated_at: datetime = models.DateTimeField(auto_now=True)  # Also touched when a session, cycle or subtask changes
+
+    class Meta:
+        indexes = [
+            # Serves the delta sync: a user's tasks changed since a token
+            models.Index(fields=["user", "updated_at"], name="task_user_updated_idx"),
+            # Serve the task list, export and stats, which always read one status group ordered by end date
+            models.Index(
+                fields=["user", "end_date"],
+                name="task_user_active_end_idx",
+                condition=models.Q(status__in=["pending", "in progress", "overdue"]),
+            ),
+            models.Index(
+                fields=["user", "end_date"],
+                name="task_user_done_end_idx",
+                condition=models.Q(status__in=["done", "abandoned"]),
+            ),
+            # Serves the overdue sweep: expired tasks that are still active
+            models.Index(
+                fields=["end_date", "id"],
+                name="task_active_end_date_idx",
+                condition=models.Q(status__in=["pending", "in progress"]),
+            ),
+            # Serves the calendar feed's window overlap lookup
+            models.Index(fields=["user", "start_date", "end_date"], name="task_user_window_idx"),
+            # Serves due_reminders: reminders of tasks that are not finished
+            models.Index(
+                fields=["user", "reminder_date"],
+                name="task_pending_reminder_idx",
+                condition=~models.Q(status__in=["done", "abandoned"]) & models.Q(reminder_date__isnull=False),
+            ),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(status__in=[value for value, _ in STATUS_CHOICES] + [""]),
+                name="task_status_valid",
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.title
     
     @property
     def total_hours(self) -> int:
-        if self.sessions.exists():
-            return sum(session.hours_spent for session in self.sessions.all())
+        sessions = self.sessions.all()
+        if sessions:
+            return sum(session.hours_spent for session in sessions)
         return 1
     
     @property
@@ -45,7 +91,7 @@ class Task(models.Model):
             return max(delta.days, 1)
         return 1
     
-    def calculate_points(self) -> int:
+    def compute_points(self) -> int:
         # points = (end_date.day - start_date.day) * priority * 10
         if self.start_date and self.end_date:
             day_diff = (self.end_date.date() - self.start_date.date()).days
@@ -54,14 +100,32 @@ class Task(models.Model):
             points: int = day_diff * self.priority * 10
         else:
             points: int = self.priority * 10
-        self.points = int(points)
+        return int(points)
+
+    def calculate_points(self) -> int:
+        self.points = self.compute_points()
         self.save()
         return self.points
 
+    def score(self) -> tuple[datetime, int] | None:
+        """End date and points the task adds to the points windows, or None unless it is done"""
+        if self.status != "done" or not self.end_date:
+            return None
+        return self.end_date, self.points
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        task = super().from_db(db, field_names, values)
+        # The stored score, so edits and deletes can take it back out of the windows
+        if not {"status", "end_date", "points"} & task.get_deferred_fields():
+            task.loaded_score = task.score()
+        return task
+
 class WorkSession(models.Model):
     task: int = models.ForeignKey(Task, on_delete=models.CASCADE, related_name="sessions")
     start_time: time = models.TimeField(null=True, blank=True)
     end_time: time = models.TimeField(null=True, blank=True)
+    updated_at: datetime = models.DateTimeField(auto_now=True)
 
     @property
     def hours_spent(self) -> float:
@@ -74,6 +138,18 @@ class CyclicTask(models.Model):
     task = models.OneToOneField(Task, on_delete=models.CASCADE, related_name="cycle")
     frequency: str = models.CharField(max_length=50)
     occurrences_count: int = models.IntegerField(default=12)
+    series_end: datetime = models.DateTimeField(null=True, blank=True, db_index=True)  # Last repetition, derived on save
+    updated_at: datetime = models.DateTimeField(auto_now=True)
+
+    def save(self, *args, **kwargs) -> None:
+        self.series_end = self.compute_series_end()
+        super().save(*args, **kwargs)
+
+    def compute_series_end(self) -> datetime | None:
+        from .recurrence import rule_for
+        if not self.task.end_date:
+            return None
+        return rule_for(self).last(self.task.end_date)
 
 class SubTask(models.Model):
     parent_task: int = models.ForeignKey(Task, on_delete=models.CASCADE, related_name="subtasks")
@@ -82,12 +158,102 @@ class SubTask(models.Model):
     end_date: date = models.DateTimeField()
     priority: int = models.IntegerField(default=1)
     status: str = models.CharField(max_length=50, default="pending")
+    updated_at: datetime = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["parent_task", "start_date", "end_date"], name="subtask_window_idx"),
+        ]
+
+class TaskTombstone(models.Model):
+    """Records a deleted task so delta syncs can tell clients to drop it"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="task_tombstones")
+    task_id: int = models.BigIntegerField()
+    deleted_at: datetime = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "deleted_at"], name="tombstone_user_deleted_idx"),
+        ]
 
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="profile")
     current_points: int = models.IntegerField(default=0)  # Available points (can be spent)
     total_points_earned: int = models.IntegerField(default=0)  # All points ever earned (only increases)
     points_spent: int = models.IntegerField(default=0)  # Total points spent in marketplace
+    task_version: int = models.BigIntegerField(default=0)  # Bumped on every task change, used for ETags
+
+    def __str__(self) -> str:
+        return f"{self.user.username} Profile"
+
+class PointsTransaction(models.Model):
+    """Append-only ledger; UserProfile point columns are running sums of these rows"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="points_transactions")
+    kind: str = models.CharField(max_length=20, choices=POINTS_TRANSACTION_KINDS)
+    amount: int = models.IntegerField()  # Positive when earned, negative when spent
+    task: int = models.ForeignKey(Task, null=True, blank=True, on_delete=models.SET_NULL, related_name="points_transactions")
+    created_at: datetime = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "created_at"], name="points_tx_user_created_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.user_id} {self.kind}: {self.amount}"
+
+class LeaderboardEntry(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="leaderboard_entry")
+    points: int = models.IntegerField(default=0)  # Mirrors UserProfile.total_points_earned
+    current_month: int = models.IntegerField(default=0)
+    last3_months: int = models.IntegerField(default=0)
+    period: date = models.DateField(null=True, blank=True)  # Month the window columns were computed for
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-points", "user"], name="leaderboard_rank_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.user_id}: {self.points}"
+
+
+class DailyPoints(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="daily_points")
+    day: date = models.DateField()  # Date of the completed tasks' end_date
+    points: int = models.IntegerField(default=0)
+    tasks_done: int = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "day"], name="daily_points_user_day_uniq"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.user_id} {self.day}: {self.points}"
+
+
+class AchievementProgress(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="achievement_progress")
+    tasks_done: int = models.IntegerField(default=0)
+    early_tasks: int = models.IntegerField(default=0)  # Ending before 9 AM
+    night_tasks: int = models.IntegerField(default=0)  # Ending at or after 10 PM
+    weekend_tasks: int = models.IntegerField(default=0)
+    current_streak: int = models.IntegerField(default=0)  # Consecutive days ending at last_active_day
+    max_streak: int = models.IntegerField(default=0)
+    last_active_day: date = models.DateField(null=True, blank=True)
+    best_task_points: int = models.IntegerField(default=0)  # Most points of a single done task
+
+
+class UserAchievement(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="achievements")
+    achievement_id: int = models.IntegerField()
+    unlocked_at: datetime = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "achievement_id"], name="user_achievement_uniq"),
+        ]
 
     def __str__(self) -> str:
-        return f"{self.user.username} Profile"
\ No newline at end of file
+        return f"{self.user_id}: {self.achievement_id}"
@@ -0,0 +1,131 @@
+import logging
+import re
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Iterator
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD: int = 3
+# Innermost project frames kept per report: enough to show the serializer and the view
+STACK_DEPTH: int = 6
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w\"])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN \((?:\s*(?:%s|\?|\.\.\.)\s*,?)+\)", re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+# The detector and the instrumentation around it are never the origin of a query
+_SKIPPED_FILES: set[str] = {str(Path(__file__).resolve()), str(Path(__file__).with_name("metrics.py").resolve())}
+# Frames above the middleware belong to whoever made the request (a test, the server)
+_MIDDLEWARE_FILE: str = str(Path(__file__).with_name("middleware.py").resolve())
+
+
+class NPlusOneError(AssertionError):
+    pass
+
+
+def normalize(sql: str) -> str:
+    """The statement with literals and IN lists collapsed, so repeats of one lookup share a template"""
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("IN (...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+def _project_frames() -> list[str]:
+    root: str = str(Path(settings.BASE_DIR).resolve())
+    frames: list[str] = []
+    for frame in traceback.extract_stack():
+        filename: str = str(Path(frame.filename).resolve())
+        if filename == _MIDDLEWARE_FILE:
+            frames.clear()
+        elif filename.startswith(root) and filename not in _SKIPPED_FILES and "site-packages" not in filename:
+            frames.append(f"{Path(filename).relative_to(root)}:{frame.lineno} in {frame.name}")
+    return frames[-STACK_DEPTH:]
+
+
+class Detector:
+    """Counts SELECT templates and remembers where each one first went past the threshold"""
+
+    def __init__(self, threshold: int = DEFAULT_THRESHOLD, label: str = "") -> None:
+        self.threshold = threshold
+        self.label = label
+        self.counts: Counter = Counter()
+        self.stacks: dict[str, list[str]] = {}
+
+    def record(self, sql: str) -> None:
+        if not sql.lstrip()[:6].upper() == "SELECT":
+            return  # Repeated writes are batches or savepoints, not lazy loading
+        template: str = normalize(sql)
+        self.counts[template] += 1
+        if self.counts[template] == self.threshold + 1:
+            # Only the repeat that crosses the threshold pays for walking the stack
+            self.stacks[template] = _project_frames()
+
+    def violations(self) -> list[dict]:
+        return [
+            {"template": template, "count": self.counts[template], "stack": stack}
+            for template, stack in self.stacks.items()
+        ]
+
+    def report(self) -> str:
+        lines: list[str] = [f"N+1 queries in {self.label}:" if self.label else "N+1 queries:"]
+        for violation in self.violations():
+            lines.append(f"  {violation['count']}x {violation['template']}")
+            lines.extend(f"    at {frame}" for frame in reversed(violation["stack"]))
+        return "\n".join(lines)
+
+
+_current: ContextVar[Detector | None] = ContextVar("nplusone_detector", default=None)
+# Set by the test runner to gather reports from every request of a run
+collected: list[Detector] | None = None
+
+
+def record_sql(execute, sql, params, many, context):
+    detector: Detector | None = _current.get()
+    if detector is not None:
+        detector.record(sql)
+    return execute(sql, params, many, context)
+
+
+def install(connection, **kwargs) -> None:
+    """Add record_sql to a connection's execute wrappers; also a connection_created receiver"""
+    if record_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_sql)
+
+
+@contextmanager
+def detect(threshold: int = DEFAULT_THRESHOLD, label: str = "") -> Iterator[Detector]:
+    """
+    Count the statements run inside the block, on any connection:
+
+        with nplusone.detect(threshold=3) as detector:
+            ...
+        assert not detector.violations()
+    """
+    for connection in connections.all(initialized_only=True):
+        install(connection)
+    detector = Detector(threshold, label)
+    token = _current.set(detector)
+    try:
+        yield detector
+    finally:
+        _current.reset(token)
+
+
+def finish(detector: Detector, mode: str) -> None:
+    """Act on a finished detector: log its report, or raise it when mode is "raise" """
+    if not detector.stacks:
+        return
+    if mode == "raise":
+        raise NPlusOneError(detector.report())
+    if collected is not None:
+        collected.append(detector)  # The test runner prints these once, grouped, after the run
+    else:
+        logger.warning(detector.report())
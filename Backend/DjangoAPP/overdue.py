@@ -0,0 +1,50 @@
+import logging
+import time
+from datetime import datetime
+
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES: tuple = ("pending", "in progress")
+
+
+def effective_status(task: Task, now: datetime | None = None) -> str:
+    """Status as the user should see it, treating expired active tasks as overdue without writing"""
+    if task.status in ACTIVE_STATUSES and task.end_date and task.end_date < (now or timezone.now()):
+        return "overdue"
+    return task.status
+
+
+def sweep(batch_size: int = 1000, now: datetime | None = None) -> dict:
+    """
+    Flip every expired active task to "overdue", across all users, in primary-key batches.
+    Each batch is its own short UPDATE so row locks are never held over the whole table.
+    """
+    cutoff: datetime = now or timezone.now()
+    started: float = time.monotonic()
+    expired = Task.objects.filter(status__in=ACTIVE_STATUSES, end_date__lt=cutoff)
+
+    batches: int = 0
+    rows_updated: int = 0
+    while True:
+        ids: list[int] = list(expired.order_by("end_date", "id").values_list("id", flat=True)[:batch_size])
+        if not ids:
+            break
+        rows_updated += Task.objects.filter(id__in=ids, status__in=ACTIVE_STATUSES).update(
+            status="overdue", updated_at=timezone.now()
+        )
+        batches += 1
+        if len(ids) < batch_size:
+            break
+
+    result: dict = {
+        "cutoff": cutoff.isoformat(),
+        "batches": batches,
+        "rows_updated": rows_updated,
+        "duration_ms": round((time.monotonic() - started) * 1000, 2),
+    }
+    logger.info("Overdue sweep updated %(rows_updated)s rows in %(batches)s batches (%(duration_ms)s ms)", result)
+    return result
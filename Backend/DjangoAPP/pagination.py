@@ -0,0 +1,80 @@
+import base64
+import json
+
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class TaskKeysetPagination(BasePagination):
+    """
+    Keyset pagination over (end_date, id), tasks without an end date last.
+    Every list is paged; without `page_size` a page holds the default 100 tasks.
+    """
+    cursor_query_param: str = "cursor"
+    page_size_query_param: str = "page_size"
+    page_size: int = 100
+    max_page_size: int = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        self.request = request
+        self.page_size = self._page_size(params)
+        queryset = queryset.order_by(F("end_date").asc(nulls_last=True), "id")
+
+        cursor = params.get(self.cursor_query_param)
+        if cursor:
+            end_date, last_id = self._decode(cursor)
+            if end_date is None:
+                queryset = queryset.filter(end_date__isnull=True, id__gt=last_id)
+            else:
+                queryset = queryset.filter(
+                    Q(end_date__gt=end_date) | Q(end_date=end_date, id__gt=last_id) | Q(end_date__isnull=True)
+                )
+
+        page: list = list(queryset[:self.page_size + 1])
+        self.has_next: bool = len(page) > self.page_size
+        page = page[:self.page_size]
+        self.last = page[-1] if page else None
+        return page
+
+    def get_paginated_response(self, data) -> Response:
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema: dict) -> dict:
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_next_link(self) -> str | None:
+        if not self.has_next or self.last is None:
+            return None
+        url: str = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.cursor_query_param)
+        return replace_query_param(url, self.cursor_query_param, self._encode(self.last))
+
+    def _page_size(self, params) -> int:
+        try:
+            size = int(params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def _encode(self, task) -> str:
+        position = {"e": task.end_date.isoformat() if task.end_date else None, "i": task.pk}
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def _decode(self, cursor: str) -> tuple:
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+            end_date = parse_datetime(position["e"]) if position["e"] is not None else None
+            return end_date, int(position["i"])
+        except (TypeError, ValueError, KeyError, json.JSONDecodeError, UnicodeDecodeError):
+            raise NotFound("Invalid cursor")
@@ -0,0 +1,108 @@
+import logging
+
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Coalesce
+
+from .models import PointsTransaction, UserProfile
+from . import response_cache
+
+logger = logging.getLogger(__name__)
+
+BALANCE_FIELDS: tuple = ("current_points", "total_points_earned", "points_spent")
+
+
+class InsufficientPoints(Exception):
+    pass
+
+
+def award(user, completions: list) -> dict[str, int]:
+    """
+    Credit (task, points_awarded) pairs: one ledger row per award and a single F() increment of
+    the profile, so concurrent completions cannot overwrite each other's balance. Awards come
+    from completed tasks, so the same UPDATE bumps task_version. Returns the balances after it.
+    """
+    total: int = sum(points for _, points in completions)
+    profiles = UserProfile.objects.filter(user=user)
+    with transaction.atomic(savepoint=False):
+        if total:
+            PointsTransaction.objects.bulk_create([
+                PointsTransaction(user=user, kind="award", amount=points, task=task)
+                for task, points in completions if points
+            ])
+        updated: int = profiles.update(
+            current_points=F("current_points") + total,
+            total_points_earned=F("total_points_earned") + total,
+            task_version=F("task_version") + 1,
+        )
+        if not updated:
+            UserProfile.objects.create(user=user, current_points=total, total_points_earned=total, task_version=1)
+        return profiles.values(*BALANCE_FIELDS).get()
+
+
+def spend(user, amount: int) -> UserProfile:
+    """
+    Deduct a marketplace purchase. The balance check and the deduction are one conditional
+    UPDATE, so parallel purchases can never take the balance below zero.
+    """
+    with transaction.atomic():
+        UserProfile.objects.get_or_create(user=user)
+        updated: int = UserProfile.objects.filter(
+            user=user, current_points__gte=F("points_spent") + amount
+        ).update(points_spent=F("points_spent") + amount)
+        if not updated:
+            raise InsufficientPoints()
+        if amount:
+            PointsTransaction.objects.create(user=user, kind="spend", amount=-amount)
+            response_cache.bump(user.pk)
+        return UserProfile.objects.get(user=user)
+
+
+def _ledger_totals(user_ids=None) -> dict[int, tuple[int, int]]:
+    """(earned, spent) per user summed from the ledger"""
+    rows = PointsTransaction.objects.all()
+    if user_ids is not None:
+        rows = rows.filter(user_id__in=list(user_ids))
+    rows = rows.values("user_id").annotate(
+        earned=Coalesce(Sum("amount", filter=Q(amount__gt=0)), 0),
+        spent=Coalesce(Sum("amount", filter=Q(amount__lt=0)), 0),
+    ).order_by()
+    return {row["user_id"]: (row["earned"], -row["spent"]) for row in rows}
+
+
+def _expected(earned: int, spent: int) -> dict[str, int]:
+    return {"current_points": earned, "total_points_earned": earned, "points_spent": spent}
+
+
+def reconcile(user_ids=None, fix: bool = False) -> list[dict]:
+    """
+    Compare profile balances with the ledger and return the users whose columns disagree.
+    With fix=True each drifted profile is locked, re-summed and overwritten from the ledger.
+    """
+    ledger: dict[int, tuple[int, int]] = _ledger_totals(user_ids)
+    profiles = UserProfile.objects.all()
+    if user_ids is not None:
+        profiles = profiles.filter(user_id__in=list(user_ids))
+
+    drifted: list[dict] = []
+    for user_id, current, earned, spent in profiles.values_list(
+        "user_id", "current_points", "total_points_earned", "points_spent"
+    ).iterator():
+        stored: dict[str, int] = {"current_points": current, "total_points_earned": earned, "points_spent": spent}
+        expected: dict[str, int] = _expected(*ledger.get(user_id, (0, 0)))
+        if stored != expected:
+            drifted.append({"user_id": user_id, "stored": stored, "ledger": expected})
+
+    if fix:
+        for row in drifted:
+            with transaction.atomic():
+                # Re-sum under the lock: awards may have landed since the bulk comparison
+                profile = UserProfile.objects.select_for_update().get(user_id=row["user_id"])
+                expected = _expected(*_ledger_totals([row["user_id"]]).get(row["user_id"], (0, 0)))
+                for field, value in expected.items():
+                    setattr(profile, field, value)
+                profile.save(update_fields=list(expected))
+
+    if drifted:
+        logger.warning("Points reconciliation found %s drifted profiles (fixed: %s)", len(drifted), fix)
+    return drifted
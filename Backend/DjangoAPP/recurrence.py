@@ -0,0 +1,156 @@
+import bisect
+import calendar
+import re
+from datetime import datetime, timedelta
+from typing import Iterator, NamedTuple
+
+from django.core.cache import cache
+
+# Series longer than this are never materialized, only generated per window
+MAX_CACHED_OCCURRENCES: int = 500
+CACHE_TIMEOUT: int = 60 * 60 * 24
+
+UNIT_ALIASES: dict[str, str] = {
+    "day": "day", "days": "day", "daily": "day",
+    "week": "week", "weeks": "week", "weekly": "week",
+    "month": "month", "months": "month", "monthly": "month",
+    "year": "year", "years": "year", "yearly": "year", "annually": "year",
+}
+NAMED_FREQUENCIES: dict[str, tuple[str, int]] = {
+    "biweekly": ("week", 2),
+    "fortnightly": ("week", 2),
+    "quarterly": ("month", 3),
+}
+EVERY_PATTERN = re.compile(r"^every\s+(\d+)\s+([a-z]+)$")
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    """Shift by whole months, clamping the day to the end of shorter months"""
+    month_index: int = value.month - 1 + months
+    year: int = value.year + month_index // 12
+    month: int = month_index % 12 + 1
+    day: int = min(value.day, calendar.monthrange(year, month)[1])
+    return value.replace(year=year, month=month, day=day)
+
+
+class RecurrenceRule(NamedTuple):
+    """Structured form of CyclicTask.frequency: repeat every `interval` `unit`s, `count` times (None = forever)"""
+    unit: str
+    interval: int
+    count: int | None
+
+    def nth(self, base: datetime, n: int) -> datetime:
+        """Date of the n-th repetition after `base` (n >= 1)"""
+        if self.unit == "day":
+            return base + timedelta(days=n * self.interval)
+        if self.unit == "week":
+            return base + timedelta(weeks=n * self.interval)
+        if self.unit == "month":
+            return add_months(base, n * self.interval)
+        return add_months(base, 12 * n * self.interval)
+
+    def last(self, base: datetime) -> datetime | None:
+        """Date of the final repetition, or None for an open-ended series"""
+        if self.count is None:
+            return None
+        return self.nth(base, self.count) if self.count > 0 else base
+
+    def _first_index_from(self, base: datetime, start: datetime) -> int:
+        """Smallest n >= 1 whose repetition is not before `start`, computed without walking the series"""
+        if start <= base:
+            return 1
+        if self.unit in ("day", "week"):
+            step = timedelta(days=self.interval * (7 if self.unit == "week" else 1))
+            n = max(1, -(-(start - base) // step))
+        else:
+            months_per_step: int = self.interval * (12 if self.unit == "year" else 1)
+            months_apart: int = (start.year - base.year) * 12 + start.month - base.month
+            n = max(1, months_apart // months_per_step - 1)
+            while self.nth(base, n) < start:
+                n += 1
+        return n
+
+    def between(self, base: datetime, start: datetime, end: datetime) -> Iterator[tuple[int, datetime]]:
+        """Lazily yield (index, date) of repetitions inside [start, end]; index is 0-based"""
+        n: int = self._first_index_from(base, start)
+        while self.count is None or n <= self.count:
+            occurrence: datetime = self.nth(base, n)
+            if occurrence > end:
+                return
+            yield n - 1, occurrence
+            n += 1
+
+
+def parse(frequency: str, count: int | None = None) -> RecurrenceRule:
+    """
+    Parse a frequency such as "weekly", "quarterly", "every 2 weeks" or an iCalendar
+    "FREQ=WEEKLY;INTERVAL=2;COUNT=10". Unknown values repeat weekly, like the frontend.
+    """
+    value: str = (frequency or "").strip().lower()
+    if value.startswith("rrule:"):
+        value = value[len("rrule:"):]
+
+    if "freq=" in value:
+        parts: dict[str, str] = dict(part.split("=", 1) for part in value.split(";") if "=" in part)
+        unit = UNIT_ALIASES.get(parts.get("freq", ""), "week")
+        interval = int(parts["interval"]) if parts.get("interval", "").isdigit() else 1
+        if parts.get("count", "").isdigit():
+            count = int(parts["count"])
+        return RecurrenceRule(unit, max(interval, 1), count)
+
+    if value in NAMED_FREQUENCIES:
+        unit, interval = NAMED_FREQUENCIES[value]
+        return RecurrenceRule(unit, interval, count)
+    if value in UNIT_ALIASES:
+        return RecurrenceRule(UNIT_ALIASES[value], 1, count)
+
+    match = EVERY_PATTERN.match(value)
+    if match and match.group(2) in UNIT_ALIASES:
+        return RecurrenceRule(UNIT_ALIASES[match.group(2)], max(int(match.group(1)), 1), count)
+    return RecurrenceRule("week", 1, count)
+
+
+def describe(rule: RecurrenceRule) -> str:
+    """Inverse of parse() for the frequency column, preferring the names the frontend understands"""
+    for name, (unit, interval) in NAMED_FREQUENCIES.items():
+        if (rule.unit, rule.interval) == (unit, interval):
+            return name
+    if rule.interval == 1:
+        return {"day": "daily", "week": "weekly", "month": "monthly", "year": "yearly"}[rule.unit]
+    return f"every {rule.interval} {rule.unit}s"
+
+
+def rule_for(cycle) -> RecurrenceRule:
+    return parse(cycle.frequency, cycle.occurrences_count)
+
+
+def _cache_key(cycle, base: datetime) -> str:
+    return f"recurrence:{cycle.pk}:{cycle.frequency}:{cycle.occurrences_count}:{base.isoformat()}"
+
+
+def invalidate(cycle) -> None:
+    """Drop the materialized series of a cycle whose task or rule was edited"""
+    if cycle.pk and cycle.task.end_date:
+        cache.delete(_cache_key(cycle, cycle.task.end_date))
+
+
+def occurrences(cycle, start: datetime, end: datetime) -> Iterator[tuple[int, datetime]]:
+    """
+    Repetitions of a CyclicTask inside [start, end]. Short bounded series are materialized once
+    and cached (the key changes with the rule and base date); others are generated lazily.
+    """
+    base: datetime | None = cycle.task.end_date
+    if base is None:
+        return iter(())
+    rule: RecurrenceRule = rule_for(cycle)
+    if rule.count is None or rule.count > MAX_CACHED_OCCURRENCES:
+        return rule.between(base, start, end)
+
+    key: str = _cache_key(cycle, base)
+    series: list[datetime] | None = cache.get(key)
+    if series is None:
+        series = [occurrence for _, occurrence in rule.between(base, base, rule.last(base))]
+        cache.set(key, series, CACHE_TIMEOUT)
+    first: int = bisect.bisect_left(series, start)
+    last: int = bisect.bisect_right(series, end)
+    return ((index, series[index]) for index in range(first, last))
@@ -0,0 +1,166 @@
+import logging
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+logger = logging.getLogger(__name__)
+
+REPLICA: str = "replica"
+# Seconds between lag checks; each process checks at most this often
+LAG_CHECK_INTERVAL: float = 5.0
+# pg_last_xact_replay_timestamp() only advances with replayed commits; when everything received
+# has been replayed the replica is current however old that timestamp is
+POSTGRES_LAG_SQL: str = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+class _Routing:
+    """Replica routing state of one request"""
+    __slots__ = ("use_replica", "wrote", "served")
+
+    def __init__(self, use_replica: bool) -> None:
+        self.use_replica = use_replica
+        self.wrote = False
+        self.served = False
+
+
+_routing: ContextVar[_Routing | None] = ContextVar("replica_routing", default=None)
+_lag: dict[str, float] = {"value": 0.0, "checked": float("-inf")}
+
+
+def configured() -> bool:
+    return REPLICA in settings.DATABASES
+
+
+def max_lag() -> float:
+    return getattr(settings, "REPLICA_MAX_LAG", 5.0)
+
+
+def _pin_key(user_id: int) -> str:
+    return f"replica:pinned:{user_id}"
+
+
+def pin(user) -> None:
+    """Keep the user's reads on the primary until a replica within max_lag() has their writes"""
+    if configured() and user is not None and user.is_authenticated:
+        cache.set(_pin_key(user.pk), True, max_lag())
+
+
+def pinned(user) -> bool:
+    return user is not None and user.is_authenticated and bool(cache.get(_pin_key(user.pk)))
+
+
+def _in_transaction() -> bool:
+    # Reads in a transaction must see its writes and take its locks
+    return connections[DEFAULT_DB_ALIAS].in_atomic_block
+
+
+def lag() -> float:
+    """Replication delay in seconds, re-measured at most every LAG_CHECK_INTERVAL; inf when unreachable"""
+    now: float = time.monotonic()
+    if now - _lag["checked"] < LAG_CHECK_INTERVAL:
+        return _lag["value"]
+    connection = connections[REPLICA]
+    value: float = 0.0
+    if connection.vendor == "postgresql":
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(POSTGRES_LAG_SQL)
+                value = float(cursor.fetchone()[0] or 0)
+        except DatabaseError:
+            logger.warning("Replica lag check failed; reading from the primary", exc_info=True)
+            value = float("inf")
+    _lag["value"], _lag["checked"] = value, now
+    return value
+
+
+def begin(user) -> object:
+    """
+    Send this request's reads to the replica, unless the user wrote within the last
+    max_lag() seconds. Returns a token for end().
+    """
+    return _routing.set(_Routing(configured() and not pinned(user)))
+
+
+def end(token) -> None:
+    _routing.reset(token)
+
+
+def served() -> bool:
+    """Whether the current request has read anything from the replica"""
+    routing: _Routing | None = _routing.get()
+    return routing is not None and routing.served
+
+
+def read_alias(user) -> str:
+    """Alias for reads evaluated after the view returns, such as a streamed export"""
+    if configured() and not pinned(user) and not _in_transaction() and lag() <= max_lag():
+        return REPLICA
+    return DEFAULT_DB_ALIAS
+
+
+class ReplicaReadsMixin:
+    """
+    Viewset mixin routing the reads of the actions named in replica_actions to the replica.
+    A successful unsafe request pins the user to the primary, so they read their own writes.
+    """
+    replica_actions: tuple = ()
+
+    def initial(self, request, *args, **kwargs) -> None:
+        super().initial(request, *args, **kwargs)
+        if self.action in self.replica_actions:
+            self._replica_token = begin(request.user)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, "_replica_token", None)
+        if token is not None:
+            end(token)
+            self._replica_token = None
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            pin(request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ReplicaRouter:
+    """
+    Reads inside a request that began replica routing go to the replica, except once the request
+    has written, while the primary has an open transaction, or while the replica lags more than
+    REPLICA_MAX_LAG. Everything else, and every write, uses the primary.
+    """
+
+    def db_for_read(self, model, **hints) -> str | None:
+        routing: _Routing | None = _routing.get()
+        if routing is None or not routing.use_replica or routing.wrote:
+            return None
+        if _in_transaction():
+            return None
+        if lag() > max_lag():
+            routing.use_replica = False
+            return None
+        routing.served = True
+        return REPLICA
+
+    def db_for_write(self, model, **hints) -> str:
+        routing: _Routing | None = _routing.get()
+        if routing is not None:
+            routing.wrote = True
+        # Explicit, or instances read from the replica would be saved back to it
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool | None:
+        aliases: set[str] = {DEFAULT_DB_ALIAS, REPLICA}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints) -> bool | None:
+        # The replica receives its schema through replication
+        return False if db == REPLICA else None
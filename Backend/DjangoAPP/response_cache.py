@@ -0,0 +1,108 @@
+from typing import Callable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import replica
+
+# Entries are keyed by version, so stale ones are never read again and only need to age out.
+# RESPONSE_CACHE_TIMEOUT shortens this when versions are not shared between workers.
+CACHE_TIMEOUT: int = 60 * 60 * 24
+RANKINGS_VERSION_KEY: str = "response:version:rankings"
+HITS_KEY: str = "response:hits"
+MISSES_KEY: str = "response:misses"
+
+
+def _version_key(user_id: int) -> str:
+    return f"response:version:user:{user_id}"
+
+
+def _recent_key(version_key: str) -> str:
+    return f"{version_key}:recent"
+
+
+def _version(key: str) -> int:
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, timeout=None)
+        version = cache.get(key, 1)
+    return version
+
+
+def _increment(key: str) -> None:
+    # add() is a no-op when the key exists, so the first increment cannot race a concurrent one
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:  # Evicted between add() and incr()
+        cache.set(key, 1, timeout=None)
+
+
+def _bump_now(user_ids: tuple, rankings: bool) -> None:
+    keys: list[str] = [_version_key(user_id) for user_id in user_ids]
+    if rankings:
+        keys.append(RANKINGS_VERSION_KEY)
+    for key in keys:
+        _increment(key)
+    if keys and replica.configured():
+        # Until the replica has replayed the write behind a new version, entries built from it may predate it
+        cache.set_many({_recent_key(key): True for key in keys}, replica.max_lag())
+
+
+def bump(*user_ids: int, rankings: bool = False) -> None:
+    """
+    Invalidate the cached responses of the given users, and of the rankings when they moved.
+    Inside a transaction the versions are bumped again after commit, so a concurrent request
+    that cached pre-commit data under the first new version is not served afterwards.
+    """
+    user_ids = tuple(user_id for user_id in user_ids if user_id)
+    _bump_now(user_ids, rankings)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump_now(user_ids, rankings))
+
+
+def _owner(user) -> str:
+    # Ids can be reused after a rollback or a sequence reset; the join time tells the accounts apart
+    return f"{user.pk}.{int(user.date_joined.timestamp() * 1_000_000)}"
+
+
+def cached(name: str, build: Callable[[], object], user=None, rankings: bool = False, params: tuple = ()) -> tuple[object, bool]:
+    """
+    Serialized response data for `name`, built once per version of its inputs: the user's
+    version when `user` is given and the global rankings version when `rankings` is set.
+    Returns (data, hit).
+    """
+    parts: list[str] = [f"response:{name}"]
+    version_keys: list[str] = []
+    if user is not None:
+        version_keys.append(_version_key(user.pk))
+        parts.append(f"{_owner(user)}.v{_version(version_keys[-1])}")
+    if rankings:
+        version_keys.append(RANKINGS_VERSION_KEY)
+        parts.append(f"r{_version(RANKINGS_VERSION_KEY)}")
+    parts.extend(str(param) for param in params)
+    key: str = ":".join(parts)
+
+    data = cache.get(key)
+    if data is not None:
+        _increment(HITS_KEY)
+        return data, True
+    _increment(MISSES_KEY)
+    data = build()
+    timeout: float = getattr(settings, "RESPONSE_CACHE_TIMEOUT", CACHE_TIMEOUT)
+    if replica.served() and cache.get_many([_recent_key(version_key) for version_key in version_keys]):
+        timeout = min(timeout, replica.max_lag())  # Possibly built before the replica caught up; rebuilt once it has
+    cache.set(key, data, timeout)
+    return data, False
+
+
+def stats() -> dict[str, int | float]:
+    """Hit and miss counts shared by every process using the same cache"""
+    hits: int = cache.get(HITS_KEY, 0)
+    misses: int = cache.get(MISSES_KEY, 0)
+    return {"hits": hits, "misses": misses, "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else 0.0}
+
+
+def reset_stats() -> None:
+    cache.delete_many([HITS_KEY, MISSES_KEY])
@@ -1,23 +1,70 @@
+import time
+
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.db import transaction
 from .models import Task, WorkSession, CyclicTask, SubTask, UserProfile
+from .overdue import effective_status
+from . import metrics
+
+class TimedRepresentationMixin:
+    """Adds the time spent in to_representation to the request metrics; nested calls count once"""
+
+    def to_representation(self, instance):
+        stats = metrics.current()
+        if stats is None or stats.serializing:
+            return super().to_representation(instance)
+        stats.serializing = True
+        started: float = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            stats.serializer_time += time.perf_counter() - started
+            stats.serializing = False
+
+class DynamicFieldsMixin:
+    """
+    Trims the representation: `fields` keeps only the named fields, `expand` adds nested relations.
+    Relations listed in `expandable_fields` are only left out when one of the two is given.
+    """
+    expandable_fields: tuple = ()
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        selected = self.select_fields(self.fields.keys(), fields, expand)
+        if selected is not None:
+            for name in set(self.fields) - selected:
+                self.fields.pop(name)
 
-class WorkSessionSerializer(serializers.ModelSerializer):
+    @classmethod
+    def select_fields(cls, available, fields=None, expand=None) -> set[str] | None:
+        """Names that will be rendered, or None when every field is"""
+        if fields is None and expand is None:
+            return None
+        available = set(available)
+        selected = set(fields) if fields is not None else available - set(cls.expandable_fields)
+        selected |= set(expand or ())
+        unknown = selected - available
+        if unknown:
+            raise serializers.ValidationError({"fields": f"Unknown fields: {', '.join(sorted(unknown))}"})
+        return selected
+
+class WorkSessionSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     hours_spent: float = serializers.FloatField(read_only=True)
 
     class Meta:
         model = WorkSession
-        fields: set[str] = {'id', 'start_time', 'end_time', 'hours_spent'}
-class CyclicTaskSerializer(serializers.ModelSerializer):
+        fields: list[str] = ['id', 'start_time', 'end_time', 'hours_spent']
+class CyclicTaskSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     class Meta:
         model = CyclicTask
         fields = ['id', 'frequency', 'occurrences_count']
 
-class SubTaskSerializer(serializers.ModelSerializer):
+class SubTaskSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     class Meta:
         model = SubTask
         fields = ['id', 'title', 'start_date', 'end_date', 'priority', 'status']
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(TimedRepresentationMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     sessions: WorkSessionSerializer = WorkSessionSerializer(many=True, read_only=True)
     total_hours: float = serializers.FloatField(read_only=True) 
     day_span: int = serializers.IntegerField(read_only=True)
@@ -25,6 +72,7 @@ class TaskSerializer(serializers.ModelSerializer):
     subtasks: SubTaskSerializer = SubTaskSerializer(many=True, read_only=True)
     is_cyclic: bool = serializers.SerializerMethodField()
     is_split: bool = serializers.SerializerMethodField()
+    expandable_fields: tuple = ('sessions', 'cycle', 'subtasks')
     
     class Meta:
         model = Task
@@ -34,8 +82,57 @@ class TaskSerializer(serializers.ModelSerializer):
         return hasattr(obj, 'cycle')
     
     def get_is_split(self, obj) -> bool:
+        # List and retrieve prefetch the subtasks; elsewhere (create, update) only test for one
+        if 'subtasks' in getattr(obj, '_prefetched_objects_cache', {}):
+            return len(obj.subtasks.all()) > 0
         return obj.subtasks.exists()
-class UserSerializer(serializers.ModelSerializer):
+
+    def to_representation(self, instance) -> dict:
+        data: dict = super().to_representation(instance)
+        if 'status' in data:
+            data['status'] = effective_status(instance)
+        return data
+
+MAX_SPLIT_SUBTASKS: int = 500
+
+class SplitSubTaskSerializer(serializers.ModelSerializer):
+    """One entry of a create_split plan"""
+    title: str = serializers.CharField(max_length=50, required=False, default='Untitled')
+    priority: int = serializers.IntegerField(min_value=1, max_value=10, required=False, default=1)  # AddTask slider range
+
+    class Meta:
+        model = SubTask
+        fields: list[str] = ['title', 'start_date', 'end_date', 'priority']
+
+    def validate(self, attrs: dict) -> dict:
+        if attrs['end_date'] < attrs['start_date']:
+            raise serializers.ValidationError({'end_date': 'Must not be before start_date'})
+        return attrs
+
+class SplitTaskSerializer(TaskSerializer):
+    """Parent task plus its subtasks; the parent spans from the earliest subtask start to the latest end"""
+    subtasks: SplitSubTaskSerializer = SplitSubTaskSerializer(many=True, required=False, max_length=MAX_SPLIT_SUBTASKS)
+
+    def validate(self, attrs: dict) -> dict:
+        subtasks: list[dict] = attrs.get('subtasks') or []
+        if subtasks:
+            attrs['start_date'] = min(subtask['start_date'] for subtask in subtasks)
+            attrs['end_date'] = max(subtask['end_date'] for subtask in subtasks)
+        return attrs
+
+    def create(self, validated_data: dict) -> Task:
+        subtasks_data: list[dict] = validated_data.pop('subtasks', [])
+        with transaction.atomic():
+            task: Task = Task.objects.create(**validated_data)
+            subtasks: list[SubTask] = SubTask.objects.bulk_create(
+                [SubTask(parent_task=task, status='pending', **data) for data in subtasks_data]
+            )
+        # Seed the relation caches so serializing the new task needs no further queries
+        task._prefetched_objects_cache = {'subtasks': subtasks, 'sessions': []}
+        Task.cycle.related.set_cached_value(task, None)
+        return task
+
+class UserSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email']
@@ -55,7 +152,7 @@ class RegisterSerializer(serializers.ModelSerializer):
         )
         return user
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     username: str = serializers.CharField(source='user.username', read_only=True)
     
     class Meta:
@@ -1,9 +1,137 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.contrib.auth.models import User
-from django.dispatch import receiver
-from .models import UserProfile
+from django.db.models import F
+from django.dispatch import receiver, Signal
+from django.utils import timezone
+from .models import UserProfile, LeaderboardEntry, Task, CyclicTask, SubTask, WorkSession, TaskTombstone
+from .serializers import TaskSerializer
+from . import achievements, authentication, daily_points, events, leaderboard, recurrence, response_cache
+
+# Sent with `user`, `completions`, a list of (task, points_awarded) tuples, and `balances`, the
+# profile's points columns after the award (which has also bumped task_version)
+tasks_completed = Signal()
+
+# Flat task fields pushed to event streams; nested relations would cost queries per save
+EVENT_TASK_FIELDS: list[str] = [
+    "id", "title", "description", "start_date", "end_date", "priority", "points",
+    "status", "category", "reminder_date", "location",
+]
 
 @receiver(post_save, sender=User)
 def create_profile(sender, instance: UserProfile, created: bool, **kwargs) -> None:
     if created:
-        UserProfile.objects.create(user=instance)
\ No newline at end of file
+        UserProfile.objects.create(user=instance)
+        current_month, _ = leaderboard.window_starts()
+        LeaderboardEntry.objects.create(user=instance, period=current_month.date())
+
+@receiver(post_save, sender=User)
+def revoke_inactive_tokens(sender, instance: User, created: bool, **kwargs) -> None:
+    if not instance.is_active:
+        authentication.revoke(instance)
+    elif not created:
+        authentication.restore(instance)
+
+@receiver(post_delete, sender=User)
+def revoke_deleted_tokens(sender, instance: User, **kwargs) -> None:
+    authentication.revoke(instance)
+
+@receiver(tasks_completed)
+def update_daily_points(sender, user: User, completions: list, **kwargs) -> None:
+    daily_points.record_completions(user, completions)
+
+@receiver(tasks_completed)
+def update_leaderboard(sender, user: User, completions: list, **kwargs) -> None:
+    leaderboard.record_completions(user, completions)
+
+@receiver(tasks_completed)
+def update_achievements(sender, user: User, completions: list, balances: dict, **kwargs) -> None:
+    achievements.record_completions(user, completions, balances["total_points_earned"])
+
+@receiver(tasks_completed)
+def invalidate_completed_responses(sender, user: User, completions: list, **kwargs) -> None:
+    response_cache.bump(user.pk, rankings=True)
+
+@receiver(tasks_completed)
+def publish_tasks_completed(sender, user: User, completions: list, **kwargs) -> None:
+    tasks = TaskSerializer([task for task, _ in completions], many=True, fields=EVENT_TASK_FIELDS).data
+    for task in tasks:
+        events.publish(user.pk, {"type": "task.updated", "task": task})
+
+@receiver(post_save, sender=Task)
+def refresh_series_end(sender, instance: Task, created: bool, update_fields=None, **kwargs) -> None:
+    # A new task cannot have a cycle yet
+    if created or (update_fields is not None and "end_date" not in update_fields):
+        return
+    for cycle in CyclicTask.objects.filter(task_id=instance.pk):
+        cycle.task = instance
+        series_end = cycle.compute_series_end()
+        if series_end != cycle.series_end:
+            CyclicTask.objects.filter(pk=cycle.pk).update(series_end=series_end)
+
+@receiver(post_delete, sender=CyclicTask)
+def drop_cached_occurrences(sender, instance: CyclicTask, **kwargs) -> None:
+    recurrence.invalidate(instance)
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def bump_task_version(sender, instance: Task, **kwargs) -> None:
+    if instance.user_id:
+        UserProfile.objects.filter(user_id=instance.user_id).update(task_version=F("task_version") + 1)
+        response_cache.bump(instance.user_id)
+
+@receiver(post_save, sender=Task)
+def rescore_saved_task(sender, instance: Task, created: bool, **kwargs) -> None:
+    if not instance.user_id or not (created or hasattr(instance, "loaded_score")):
+        return  # Without the stored score there is nothing to compare against
+    score = instance.score()
+    leaderboard.rescore(instance.user_id, [(None if created else instance.loaded_score, score)])
+    instance.loaded_score = score
+
+@receiver(post_delete, sender=Task)
+def rescore_deleted_task(sender, instance: Task, **kwargs) -> None:
+    if instance.user_id:
+        leaderboard.rescore(instance.user_id, [(getattr(instance, "loaded_score", instance.score()), None)])
+
+@receiver(post_save, sender=LeaderboardEntry)
+@receiver(post_delete, sender=LeaderboardEntry)
+def invalidate_rankings(sender, instance: LeaderboardEntry, **kwargs) -> None:
+    response_cache.bump(rankings=True)
+
+@receiver(post_save, sender=UserProfile)
+def invalidate_profile_responses(sender, instance: UserProfile, **kwargs) -> None:
+    response_cache.bump(instance.user_id)
+
+@receiver(post_save, sender=Task)
+def publish_task_saved(sender, instance: Task, created: bool, **kwargs) -> None:
+    events.publish(instance.user_id, {
+        "type": "task.created" if created else "task.updated",
+        "task": TaskSerializer(instance, fields=EVENT_TASK_FIELDS).data,
+    })
+
+@receiver(post_delete, sender=Task)
+def publish_task_deleted(sender, instance: Task, **kwargs) -> None:
+    events.publish(instance.user_id, {"type": "task.deleted", "task_id": instance.pk})
+
+@receiver(post_delete, sender=Task)
+def record_task_tombstone(sender, instance: Task, **kwargs) -> None:
+    if instance.user_id:
+        TaskTombstone.objects.create(user_id=instance.user_id, task_id=instance.pk)
+
+@receiver(post_save, sender=SubTask)
+@receiver(post_save, sender=WorkSession)
+@receiver(post_save, sender=CyclicTask)
+@receiver(post_delete, sender=SubTask)
+@receiver(post_delete, sender=WorkSession)
+@receiver(post_delete, sender=CyclicTask)
+def touch_parent_task(sender, instance, **kwargs) -> None:
+    # Tasks are synced with their nested rows, so a child change makes the whole task changed
+    parent_id = instance.parent_task_id if sender is SubTask else instance.task_id
+    Task.objects.filter(pk=parent_id).update(updated_at=timezone.now())
+
+@receiver(tasks_completed)
+def publish_points_changed(sender, user: User, completions: list, balances: dict, **kwargs) -> None:
+    events.publish(user.pk, {
+        "type": "points.changed",
+        "points_awarded": sum(points for _, points in completions),
+        **balances,
+    })
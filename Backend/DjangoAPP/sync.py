@@ -0,0 +1,68 @@
+import base64
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.utils import timezone
+
+from .models import Task, TaskTombstone
+from .serializers import TaskSerializer
+
+# Rows are stamped before their transaction commits, so each token reaches back this far
+# to pick up writes that were still in flight; clients upsert by id, so repeats are harmless
+SYNC_OVERLAP: timedelta = timedelta(seconds=5)
+# Tombstones are pruned after this; older tokens get a full snapshot instead of a delta
+TOMBSTONE_RETENTION: timedelta = timedelta(days=30)
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+def encode_token(moment: datetime) -> str:
+    micros: int = int(moment.timestamp() * 1_000_000)
+    return base64.urlsafe_b64encode(f"v1:{micros}".encode()).decode()
+
+
+def decode_token(token: str) -> datetime:
+    try:
+        version, micros = base64.urlsafe_b64decode(token.encode()).decode().split(":")
+        if version != "v1":
+            raise ValueError(version)
+        return datetime.fromtimestamp(int(micros) / 1_000_000, tz=dt_timezone.utc)
+    except (TypeError, ValueError, UnicodeDecodeError) as exc:
+        raise InvalidToken(str(exc))
+
+
+def changes(user, token: str | None = None, now: datetime | None = None) -> dict:
+    """
+    Tasks (with sessions, cycle and subtasks) changed since `token` plus the ids of deleted tasks.
+    Without a usable token the response is a full snapshot and `full` tells the client to reset its cache.
+    """
+    now = now or timezone.now()
+    since: datetime | None = decode_token(token) if token else None
+    full: bool = since is None or since < now - TOMBSTONE_RETENTION
+
+    tasks = Task.objects.filter(user=user).select_related("cycle").prefetch_related("sessions", "subtasks")
+    deleted: list[int] = []
+    if not full:
+        tasks = tasks.filter(updated_at__gt=since)
+        deleted = list(
+            TaskTombstone.objects.filter(user=user, deleted_at__gt=since)
+            .values_list("task_id", flat=True).distinct()
+        )
+
+    changed: list[dict] = TaskSerializer(tasks.order_by("end_date", "id"), many=True).data
+    # A task recreated with the same id (fixtures, restores) is live, not deleted
+    live: set[int] = {task["id"] for task in changed}
+    return {
+        "sync_token": encode_token(now - SYNC_OVERLAP),
+        "full": full,
+        "tasks": changed,
+        "deleted": [task_id for task_id in deleted if task_id not in live],
+    }
+
+
+def prune(now: datetime | None = None) -> int:
+    """Delete tombstones older than the retention window; returns the number removed"""
+    cutoff: datetime = (now or timezone.now()) - TOMBSTONE_RETENTION
+    removed, _ = TaskTombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return removed
@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+from . import nplusone
+
+
+class NPlusOneTestRunner(DiscoverRunner):
+    """
+    Test runner that watches every request the suite makes for N+1 queries:
+
+        python manage.py test --testrunner DjangoAPP.testing.NPlusOneTestRunner [--nplusone-raise]
+
+    By default offending requests are summarized after the run; with --nplusone-raise they fail
+    the test that made them.
+    """
+
+    def __init__(self, nplusone_threshold: int | None = None, nplusone_raise: bool = False, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.nplusone_threshold: int = nplusone_threshold or getattr(settings, "NPLUSONE_THRESHOLD", nplusone.DEFAULT_THRESHOLD)
+        self.nplusone_raise = nplusone_raise
+
+    @classmethod
+    def add_arguments(cls, parser) -> None:
+        super().add_arguments(parser)
+        parser.add_argument("--nplusone-threshold", type=int,
+                            help=f"Repeats of one SELECT template allowed per request (default {nplusone.DEFAULT_THRESHOLD})")
+        parser.add_argument("--nplusone-raise", action="store_true", help="Fail tests whose requests run N+1 queries")
+
+    def setup_test_environment(self, **kwargs) -> None:
+        super().setup_test_environment(**kwargs)
+        # Read by NPlusOneMiddleware when each test client builds its middleware chain
+        self._saved = (getattr(settings, "NPLUSONE_MODE", None), getattr(settings, "NPLUSONE_THRESHOLD", None))
+        settings.NPLUSONE_MODE = "raise" if self.nplusone_raise else "log"
+        settings.NPLUSONE_THRESHOLD = self.nplusone_threshold
+        nplusone.collected = []
+
+    def teardown_test_environment(self, **kwargs) -> None:
+        settings.NPLUSONE_MODE, settings.NPLUSONE_THRESHOLD = self._saved
+        super().teardown_test_environment(**kwargs)
+
+    def suite_result(self, suite, result, **kwargs):
+        # The same lookup is usually hit by many tests; report each origin once
+        grouped: dict[tuple, dict] = {}
+        for detector in nplusone.collected or []:
+            for violation in detector.violations():
+                key: tuple = (violation["template"], tuple(violation["stack"]))
+                seen = grouped.setdefault(key, {"requests": [], "count": 0, **violation})
+                seen["requests"].append(detector.label)
+                seen["count"] = max(seen["count"], violation["count"])
+        nplusone.collected = None
+        if grouped:
+            self.log(f"\nN+1 queries (more than {self.nplusone_threshold} runs of one SELECT in a request):")
+            for violation in grouped.values():
+                requests: list[str] = violation["requests"]
+                self.log(f"  up to {violation['count']}x in {len(requests)} requests, e.g. {requests[0]}")
+                self.log(f"    {violation['template']}")
+                for frame in reversed(violation["stack"]):
+                    self.log(f"      at {frame}")
+        return super().suite_result(suite, result, **kwargs)
@@ -1,11 +1,15 @@
-from django.test import TestCase
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
 from django.contrib.auth.models import User
 from django.utils import timezone
 from datetime import datetime, timedelta
+from unittest import skipUnless
 from .models import Task, UserProfile, CyclicTask, SubTask
 from .serializers import TaskSerializer
 from rest_framework.test import APIClient
 from rest_framework import status
+import importlib.util
 import json
 
 class TaskModelTestCase(TestCase):
@@ -296,9 +300,9 @@ class TaskViewSetTestCase(TestCase):
         
         response = self.client.get('/api/tasks/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data['results']), 2)
         
-        for task in response.data:
+        for task in response.data['results']:
             self.assertIn('category', task)
             self.assertIn('location', task)
             self.assertIn('reminder_date', task)
@@ -408,3 +412,1671 @@ class TaskReminderTestCase(TestCase):
             status="pending"
         )
         self.assertIsNone(task.reminder_date)
+
+
+class LeaderboardTestCase(TestCase):
+    def setUp(self):
+        self.users = [User.objects.create_user(username=f'user{i}', password='testpass123') for i in range(3)]
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.users[0])
+
+    def _complete_task(self, user, priority):
+        start_date = timezone.now()
+        task = Task.objects.create(
+            user=user,
+            title="Ranked Task",
+            start_date=start_date,
+            end_date=start_date + timedelta(days=1),
+            priority=priority,
+            status="pending"
+        )
+        self.client.force_authenticate(user=user)
+        self.client.post(f'/api/tasks/{task.id}/mark_done/')
+
+    def test_mark_done_updates_leaderboard(self):
+        """Test that completing a task is reflected in the rankings"""
+        self._complete_task(self.users[1], 5)
+        self._complete_task(self.users[2], 2)
+
+        response = self.client.get('/api/profile/rankings/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['name'] for row in response.data], ['user1', 'user2', 'user0'])
+        self.assertEqual(response.data[0]['points'], 50)
+        self.assertEqual(response.data[0]['current_month'], 50)
+        self.assertEqual(response.data[0]['last3_months'], 50)
+
+    def test_rankings_query_count_is_constant(self):
+        """Test that rankings does not issue per-user queries"""
+        self.client.get('/api/profile/rankings/')
+        for i in range(3, 10):
+            User.objects.create_user(username=f'user{i}', password='testpass123')
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/profile/rankings/')
+        self.assertEqual(len(response.data), 10)
+
+    def test_rankings_pagination_and_my_rank(self):
+        """Test top-K slicing and the current user's rank lookup"""
+        self._complete_task(self.users[1], 5)
+        self._complete_task(self.users[2], 2)
+
+        response = self.client.get('/api/profile/rankings/?offset=1&limit=1')
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]['rank'], 2)
+        self.assertEqual(response.data[0]['name'], 'user2')
+
+        self.client.force_authenticate(user=self.users[2])
+        response = self.client.get('/api/profile/my_rank/')
+        self.assertEqual(response.data['rank'], 2)
+        self.assertEqual(response.data['points'], 20)
+
+    def test_rebuild_command_matches_task_history(self):
+        """Test that the rebuild command recomputes entries from tasks"""
+        from django.core.management import call_command
+        from io import StringIO
+        from .models import LeaderboardEntry
+
+        self._complete_task(self.users[1], 5)
+        LeaderboardEntry.objects.update(points=0, current_month=0, last3_months=0)
+        call_command('rebuild_leaderboard', stdout=StringIO())
+
+        entry = LeaderboardEntry.objects.get(user=self.users[1])
+        self.assertEqual(entry.points, 50)
+        self.assertEqual(entry.current_month, 50)
+
+    def _done_task(self, user, priority, end_date):
+        task = Task.objects.create(
+            user=user, title="Ranked Task", start_date=end_date - timedelta(days=1),
+            end_date=end_date, priority=priority, status="pending",
+        )
+        self.client.force_authenticate(user=user)
+        self.client.post(f'/api/tasks/{task.id}/mark_done/')
+        return task
+
+    def test_deleting_done_task_retracts_window_points(self):
+        """Test deleting a completed task takes its points out of the windows and day bucket but not the total"""
+        from .models import DailyPoints, LeaderboardEntry
+        self._done_task(self.users[1], 2, timezone.now() + timedelta(minutes=5))
+        deleted = self._done_task(self.users[1], 5, timezone.now() + timedelta(minutes=5))
+        self.client.delete(f'/api/tasks/{deleted.id}/?status=done')
+
+        entry = LeaderboardEntry.objects.get(user=self.users[1])
+        self.assertEqual((entry.points, entry.current_month, entry.last3_months), (70, 20, 20))
+        bucket = DailyPoints.objects.get(user=self.users[1])
+        self.assertEqual((bucket.points, bucket.tasks_done), (20, 1))
+
+    def test_editing_done_task_moves_window_points(self):
+        """Test re-dating or re-pointing a completed task moves its points between windows and buckets"""
+        from . import leaderboard
+        from .models import DailyPoints, LeaderboardEntry
+        task = self._done_task(self.users[1], 5, timezone.now() + timedelta(minutes=5))
+        current_month, _ = leaderboard.window_starts()
+        last_month = current_month - timedelta(days=1)
+        self.client.patch(f'/api/tasks/{task.id}/?status=done', {'end_date': last_month.isoformat(), 'points': 30}, format='json')
+
+        entry = LeaderboardEntry.objects.get(user=self.users[1])
+        self.assertEqual((entry.current_month, entry.last3_months), (0, 30))
+        buckets = dict(DailyPoints.objects.filter(user=self.users[1]).values_list('day', 'points'))
+        self.assertEqual(buckets, {timezone.localdate(): 0, timezone.localtime(last_month).date(): 30})
+
+    def test_bulk_changes_rescore_done_tasks(self):
+        """Test bulk updates and deletes of completed tasks adjust the windows like single requests"""
+        from .models import LeaderboardEntry
+        edited = self._done_task(self.users[1], 2, timezone.now() + timedelta(minutes=5))
+        deleted = self._done_task(self.users[1], 5, timezone.now() + timedelta(minutes=5))
+        self.client.post('/api/tasks/bulk/', {'operations': [
+            {'op': 'update', 'id': edited.id, 'data': {'points': 35}},
+            {'op': 'delete', 'id': deleted.id},
+        ]}, format='json')
+
+        entry = LeaderboardEntry.objects.get(user=self.users[1])
+        self.assertEqual((entry.points, entry.current_month, entry.last3_months), (70, 35, 35))
+
+    def test_bulk_created_done_task_is_counted_before_it_is_removed(self):
+        """Test a done task created in a batch adds to the windows, so deleting it later does not go negative"""
+        from .models import DailyPoints, LeaderboardEntry
+        self.client.force_authenticate(user=self.users[1])
+        end_date = (timezone.now() + timedelta(minutes=5)).isoformat()
+        response = self.client.post('/api/tasks/bulk/', {'operations': [
+            {'op': 'create', 'data': {'title': 'Done already', 'status': 'done', 'points': 40, 'end_date': end_date}},
+        ]}, format='json')
+        entry = LeaderboardEntry.objects.get(user=self.users[1])
+        self.assertEqual((entry.current_month, entry.last3_months), (40, 40))
+
+        self.client.post('/api/tasks/bulk/', {'operations': [
+            {'op': 'delete', 'id': response.data['results'][0]['id']},
+        ]}, format='json')
+        entry.refresh_from_db()
+        self.assertEqual((entry.current_month, entry.last3_months), (0, 0))
+        self.assertEqual(DailyPoints.objects.get(user=self.users[1]).points, 0)
+
+
+class DailyPointsTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _done_task(self, end_date, priority=5):
+        task = Task.objects.create(
+            user=self.user,
+            title="Bucketed Task",
+            start_date=end_date - timedelta(days=1),
+            end_date=end_date,
+            priority=priority,
+            status="pending"
+        )
+        self.client.post(f'/api/tasks/{task.id}/mark_done/')
+        return task
+
+    def test_mark_done_increments_day_bucket(self):
+        """Test that completions on the same day share one bucket"""
+        from .models import DailyPoints
+
+        end_date = timezone.now() + timedelta(days=1)
+        self._done_task(end_date, priority=5)
+        self._done_task(end_date, priority=2)
+
+        bucket = DailyPoints.objects.get(user=self.user)
+        self.assertEqual(bucket.day, end_date.date())
+        self.assertEqual(bucket.points, 70)
+        self.assertEqual(bucket.tasks_done, 2)
+
+    def test_user_stats_reads_windows_from_buckets(self):
+        """Test that user_stats window sums come from buckets"""
+        self._done_task(timezone.now() + timedelta(days=1), priority=3)
+        response = self.client.get(f'/api/profile/{self.user.id}/user_stats/')
+        self.assertEqual(response.data['current_month'], 30)
+        self.assertEqual(response.data['last3_months'], 30)
+
+    def test_points_history_weekly_series(self):
+        """Test the zero-filled weekly time series for the reports page"""
+        today = timezone.localdate()
+        self._done_task(timezone.now(), priority=4)
+
+        response = self.client.get('/api/profile/points_history/?granularity=week&days=42')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['series']), 6)
+        self.assertEqual(response.data['series'][-1]['end'], today.isoformat())
+        self.assertEqual(response.data['series'][-1]['points'], 40)
+        self.assertEqual(sum(row['points'] for row in response.data['series']), 40)
+        self.assertEqual(response.data['current_month_tasks'], 1)
+
+    def test_backfill_command_rebuilds_buckets(self):
+        """Test that the backfill command recreates buckets from tasks"""
+        from django.core.management import call_command
+        from io import StringIO
+        from .models import DailyPoints
+
+        self._done_task(timezone.now() + timedelta(days=1), priority=5)
+        DailyPoints.objects.all().delete()
+        call_command('backfill_daily_points', stdout=StringIO())
+
+        self.assertEqual(DailyPoints.objects.get(user=self.user).points, 50)
+
+
+class AchievementEngineTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _done_task(self, end_date, priority=1):
+        task = Task.objects.create(
+            user=self.user,
+            title="Achievement Task",
+            start_date=end_date - timedelta(days=1),
+            end_date=end_date,
+            priority=priority,
+            status="pending"
+        )
+        self.client.post(f'/api/tasks/{task.id}/mark_done/')
+
+    def _unlocked_ids(self):
+        response = self.client.get('/api/profile/user_achievements/')
+        return {achievement['id'] for achievement in response.data}
+
+    def test_speed_demon_unlocks_on_completion(self):
+        """Test that a single 100 point task unlocks Speed Demon and a 100 point day of smaller ones does not"""
+        self._done_task(timezone.now() + timedelta(days=2), priority=5)
+        self._done_task(timezone.now() + timedelta(days=2), priority=5)
+        self.assertNotIn(3, self._unlocked_ids())
+        self._done_task(timezone.now() + timedelta(days=2), priority=10)
+        self.assertIn(3, self._unlocked_ids())
+
+    def test_elite_member_is_lost_when_pushed_out_of_top_10(self):
+        """Test that a user entering the top 10 takes Elite Member from the one they push out"""
+        from .models import LeaderboardEntry
+        self._done_task(timezone.now() + timedelta(days=2))
+        self.assertIn(5, self._unlocked_ids())
+        rivals = [User.objects.create_user(username=f'rival{i}', password='testpass123') for i in range(10)]
+        LeaderboardEntry.objects.filter(user__in=rivals[:9]).update(points=1000)
+        self.assertIn(5, self._unlocked_ids())
+
+        end_date = timezone.now() + timedelta(days=2)
+        task = Task.objects.create(user=rivals[9], title="Rival Task", start_date=end_date - timedelta(days=1),
+                                   end_date=end_date, priority=5, status="pending")
+        self.client.force_authenticate(user=rivals[9])
+        self.client.post(f'/api/tasks/{task.id}/mark_done/')
+        self.assertIn(5, self._unlocked_ids())
+        self.client.force_authenticate(user=self.user)
+        self.assertNotIn(5, self._unlocked_ids())
+
+    def test_user_without_leaderboard_row_is_not_ranked(self):
+        """Test that a missing leaderboard row does not count as first place"""
+        from .models import LeaderboardEntry
+        from . import achievements
+        LeaderboardEntry.objects.filter(user=self.user).delete()
+        self.assertNotIn(5, achievements.evaluate_user(self.user))
+
+    def test_streak_counts_out_of_order_completions(self):
+        """Test that closing a gap in past days extends the streak"""
+        from .models import AchievementProgress
+
+        base = timezone.now() + timedelta(days=10)
+        for offset in [0, 1, 2, 4, 5, 6]:
+            self._done_task(base + timedelta(days=offset))
+        self.assertNotIn(4, self._unlocked_ids())
+
+        self._done_task(base + timedelta(days=3))
+        progress = AchievementProgress.objects.get(user=self.user)
+        self.assertEqual(progress.max_streak, 7)
+        self.assertIn(4, self._unlocked_ids())
+
+    def test_completion_writes_only_changed_counters(self):
+        """Test the locked progress row is updated with the counters that moved, not every column"""
+        from django.test.utils import CaptureQueriesContext
+        day = (timezone.now() + timedelta(days=3)).replace(hour=12)
+        self._done_task(day)
+        with CaptureQueriesContext(connection) as captured:
+            self._done_task(day)
+        updates = [query['sql'] for query in captured.captured_queries
+                   if query['sql'].startswith('UPDATE "DjangoAPP_achievementprogress"')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"tasks_done"', updates[0])
+        self.assertNotIn('"max_streak"', updates[0])
+        self.assertNotIn('"user_id"', updates[0])
+
+    def test_user_achievements_is_a_single_query(self):
+        """Test that reading unlocked achievements does not scan tasks"""
+        for day in range(3):
+            self._done_task(timezone.now() + timedelta(days=day + 1))
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/profile/user_achievements/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_reevaluate_command_applies_rules_to_history(self):
+        """Test that re-evaluation derives counters from existing tasks"""
+        from django.core.management import call_command
+        from io import StringIO
+        from .models import AchievementProgress, UserAchievement
+
+        for hour_offset in range(10):
+            end_date = (timezone.now() + timedelta(days=hour_offset + 1)).replace(hour=7)
+            Task.objects.create(user=self.user, title="Early", end_date=end_date, priority=1, status="done")
+        call_command('reevaluate_achievements', stdout=StringIO())
+
+        self.assertEqual(AchievementProgress.objects.get(user=self.user).early_tasks, 10)
+        self.assertTrue(UserAchievement.objects.filter(user=self.user, achievement_id=8).exists())
+
+
+class OverdueSweepTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.other = User.objects.create_user(username='otheruser', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _task(self, user, days, task_status="pending"):
+        return Task.objects.create(
+            user=user,
+            title="Sweep Task",
+            end_date=timezone.now() + timedelta(days=days),
+            priority=1,
+            status=task_status
+        )
+
+    def test_list_reports_overdue_without_writing(self):
+        """Test that reads compute overdue status instead of updating rows"""
+        task = self._task(self.user, -1)
+
+        response = self.client.get('/api/tasks/')
+        self.assertEqual(response.data['results'][0]['status'], 'overdue')
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'pending')
+
+    def test_sweep_flips_expired_tasks_in_batches(self):
+        """Test that the sweep updates expired active tasks of all users"""
+        from .overdue import sweep
+
+        expired = [self._task(self.user, -1), self._task(self.other, -2), self._task(self.other, -3, "in progress")]
+        upcoming = self._task(self.user, 1)
+        finished = self._task(self.user, -1, "done")
+
+        result = sweep(batch_size=2)
+        self.assertEqual(result['rows_updated'], 3)
+        self.assertEqual(result['batches'], 2)
+        for task in expired:
+            task.refresh_from_db()
+            self.assertEqual(task.status, 'overdue')
+        upcoming.refresh_from_db()
+        finished.refresh_from_db()
+        self.assertEqual(upcoming.status, 'pending')
+        self.assertEqual(finished.status, 'done')
+
+        self.assertEqual(sweep()['rows_updated'], 0)
+
+
+class TaskListQueryCountTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _create_tasks(self, count):
+        from datetime import time
+        from .models import WorkSession
+
+        start_date = timezone.now() + timedelta(days=1)
+        for i in range(count):
+            task = Task.objects.create(
+                user=self.user,
+                title=f"Task {i}",
+                start_date=start_date,
+                end_date=start_date + timedelta(days=1),
+                priority=1,
+                status="pending"
+            )
+            WorkSession.objects.create(task=task, start_time=time(9, 0), end_time=time(12, 0))
+            SubTask.objects.create(parent_task=task, title="Step", start_date=start_date, end_date=start_date, priority=1)
+            if i % 2:
+                CyclicTask.objects.create(task=task, frequency="weekly", occurrences_count=4)
+
+    def test_list_query_count_is_constant(self):
+        """Test that listing tasks does not issue per-task queries"""
+        self._create_tasks(2)
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/tasks/')
+        self.assertEqual(len(response.data['results']), 2)
+
+        self._create_tasks(20)
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/tasks/')
+        tasks = response.data['results']
+        self.assertEqual(len(tasks), 22)
+        self.assertTrue(all(task['is_split'] for task in tasks))
+        self.assertEqual(sum(task['is_cyclic'] for task in tasks), 11)
+        self.assertEqual(tasks[0]['total_hours'], 3)
+
+    def test_is_split_without_prefetch_checks_existence(self):
+        """Test an unprefetched task answers is_split with one EXISTS query instead of loading subtasks"""
+        from django.test.utils import CaptureQueriesContext
+        self._create_tasks(1)
+        task = Task.objects.get(user=self.user)
+        with CaptureQueriesContext(connection) as captured:
+            self.assertTrue(TaskSerializer(task, fields=['id', 'is_split']).data['is_split'])
+        self.assertEqual(len(captured.captured_queries), 1)
+        self.assertIn('LIMIT 1', captured.captured_queries[0]['sql'])
+
+
+class TaskPaginationTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        base = timezone.now() + timedelta(days=1)
+        same_day = base + timedelta(days=3)
+        for i in range(5):
+            Task.objects.create(user=self.user, title=f"Task {i}", end_date=base + timedelta(days=i), priority=1)
+        for i in range(2):
+            Task.objects.create(user=self.user, title=f"Tie {i}", end_date=same_day, priority=1)
+        Task.objects.create(user=self.user, title="Undated", priority=1)
+
+    def test_cursor_pagination_walks_every_task_once(self):
+        """Test that following next links returns each task exactly once in order"""
+        seen = []
+        url = '/api/tasks/?page_size=3'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['results']), 3)
+            seen.extend(task['id'] for task in response.data['results'])
+            url = response.data['next']
+
+        self.assertEqual(len(seen), 8)
+        self.assertEqual(len(set(seen)), 8)
+        self.assertEqual(Task.objects.get(id=seen[-1]).title, "Undated")
+
+    def test_plain_list_is_bounded_by_the_default_page(self):
+        """Test that a request without pagination parameters still gets one page and a next link"""
+        from unittest import mock
+        from .pagination import TaskKeysetPagination
+        with mock.patch.object(TaskKeysetPagination, 'page_size', 5):
+            response = self.client.get('/api/tasks/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIn('cursor=', response.data['next'])
+
+        response = self.client.get('/api/tasks/?page_size=100000')
+        self.assertEqual(len(response.data['results']), 8)
+        self.assertIsNone(response.data['next'])
+
+    def test_invalid_cursor_is_rejected(self):
+        """Test that a malformed cursor returns 404"""
+        response = self.client.get('/api/tasks/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_fields_parameter_trims_payload_and_queries(self):
+        """Test that calendar views can request only the fields they render"""
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/tasks/?fields=id,title,end_date,status')
+        self.assertEqual(set(response.data['results'][0].keys()), {'id', 'title', 'end_date', 'status'})
+
+        response = self.client.get('/api/tasks/?fields=id&expand=subtasks')
+        self.assertEqual(set(response.data['results'][0].keys()), {'id', 'subtasks'})
+
+        response = self.client.get('/api/tasks/?fields=id,bogus')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CalendarFeedTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _aware(self, year, month, day, hour=12):
+        return timezone.make_aware(datetime(year, month, day, hour))
+
+    def test_feed_returns_only_items_in_window(self):
+        """Test that tasks outside the window are left out"""
+        inside = Task.objects.create(user=self.user, title="Inside", start_date=self._aware(2030, 3, 9),
+                                     end_date=self._aware(2030, 3, 10), priority=1)
+        spanning = Task.objects.create(user=self.user, title="Spanning", start_date=self._aware(2030, 2, 1),
+                                       end_date=self._aware(2030, 4, 1), priority=1)
+        Task.objects.create(user=self.user, title="Before", end_date=self._aware(2030, 2, 10), priority=1)
+        Task.objects.create(user=self.user, title="After", start_date=self._aware(2030, 4, 2),
+                            end_date=self._aware(2030, 4, 3), priority=1)
+
+        response = self.client.get('/api/tasks/calendar/?from=2030-03-01&to=2030-03-31')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual({item['id'] for item in response.data['items']}, {inside.id, spanning.id})
+
+    def test_feed_expands_cyclic_occurrences_and_subtasks(self):
+        """Test server-side expansion of repetitions and subtasks within the window"""
+        task = Task.objects.create(user=self.user, title="Weekly", start_date=self._aware(2030, 1, 1),
+                                   end_date=self._aware(2030, 1, 1, 14), priority=1)
+        CyclicTask.objects.create(task=task, frequency="weekly", occurrences_count=12)
+        parent = Task.objects.create(user=self.user, title="Split", start_date=self._aware(2030, 1, 1),
+                                     end_date=self._aware(2030, 6, 1), priority=1)
+        SubTask.objects.create(parent_task=parent, title="In window", start_date=self._aware(2030, 2, 3),
+                               end_date=self._aware(2030, 2, 4))
+        SubTask.objects.create(parent_task=parent, title="Later", start_date=self._aware(2030, 5, 3),
+                               end_date=self._aware(2030, 5, 4))
+
+        response = self.client.get('/api/tasks/calendar/?from=2030-02-01&to=2030-02-28')
+        items = response.data['items']
+        occurrences = [item for item in items if item['kind'] == 'occurrence']
+        self.assertEqual([item['id'] for item in occurrences], [f"{task.id}_cyclic_{i}" for i in range(4, 8)])
+        self.assertEqual([item['title'] for item in items if item['kind'] == 'subtask'], ["In window"])
+        self.assertEqual([item['id'] for item in items if item['kind'] == 'task'], [parent.id])
+
+    def test_occurrences_report_the_effective_status(self):
+        """Test repetitions of an expired series show overdue, as the task list does"""
+        first_end = timezone.now() - timedelta(days=14)
+        task = Task.objects.create(user=self.user, title="Weekly", start_date=first_end - timedelta(hours=2),
+                                   end_date=first_end, priority=1, status="pending")
+        CyclicTask.objects.create(task=task, frequency="weekly", occurrences_count=12)
+
+        today = timezone.localdate()
+        response = self.client.get(f'/api/tasks/calendar/?from={today}&to={today + timedelta(days=21)}')
+        statuses = {item['status'] for item in response.data['items'] if item['kind'] == 'occurrence'}
+        self.assertEqual(statuses, {'overdue'})
+
+    def test_feed_rejects_invalid_window(self):
+        """Test validation of the window bounds"""
+        response = self.client.get('/api/tasks/calendar/?from=2030-03-31&to=2030-03-01')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get('/api/tasks/calendar/?from=2030-01-01')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecurrenceEngineTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_frequency_parsing(self):
+        """Test that free-text and iCalendar frequencies map onto structured rules"""
+        from .recurrence import parse, RecurrenceRule
+
+        self.assertEqual(parse("weekly", 12), RecurrenceRule("week", 1, 12))
+        self.assertEqual(parse("quarterly", 4), RecurrenceRule("month", 3, 4))
+        self.assertEqual(parse("every 3 days"), RecurrenceRule("day", 3, None))
+        self.assertEqual(parse("FREQ=MONTHLY;INTERVAL=2;COUNT=5"), RecurrenceRule("month", 2, 5))
+        self.assertEqual(parse("whenever", 2), RecurrenceRule("week", 1, 2))
+
+    def test_open_ended_series_is_generated_per_window(self):
+        """Test that a window far into an unbounded series is reached without walking it"""
+        from .recurrence import parse
+
+        base = timezone.make_aware(datetime(2030, 1, 31, 9))
+        rule = parse("monthly")
+        window = list(rule.between(base, timezone.make_aware(datetime(2130, 2, 1)), timezone.make_aware(datetime(2130, 5, 1))))
+        self.assertEqual([occurrence.day for _, occurrence in window], [28, 31, 30])
+        self.assertEqual(window[0][0], 1200)
+
+    def test_series_end_follows_task_edits(self):
+        """Test that series_end is kept in sync with the base task"""
+        base = timezone.make_aware(datetime(2030, 1, 1, 12))
+        task = Task.objects.create(user=self.user, title="Daily", end_date=base, priority=1)
+        cycle = CyclicTask.objects.create(task=task, frequency="daily", occurrences_count=3)
+        self.assertEqual(cycle.series_end, base + timedelta(days=3))
+
+        task.end_date = base + timedelta(days=10)
+        task.save()
+        cycle.refresh_from_db()
+        self.assertEqual(cycle.series_end, base + timedelta(days=13))
+
+        response = self.client.get(f'/api/tasks/{task.id}/occurrences/?from=2030-01-12&to=2030-01-31')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['index'] for row in response.data['occurrences']], [0, 1, 2])
+
+
+class DueRemindersTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        now = timezone.now()
+        self.due = Task.objects.create(user=self.user, title="Due", reminder_date=now - timedelta(hours=1),
+                                       end_date=now + timedelta(days=1), priority=1)
+        Task.objects.create(user=self.user, title="Later", reminder_date=now + timedelta(days=3),
+                            end_date=now + timedelta(days=5), priority=1)
+        Task.objects.create(user=self.user, title="Finished", reminder_date=now - timedelta(hours=1),
+                            end_date=now + timedelta(days=1), priority=1, status="done")
+        Task.objects.create(user=self.user, title="Expired", reminder_date=now - timedelta(days=2),
+                            end_date=now - timedelta(days=1), priority=1)
+
+    def test_returns_only_due_unfinished_reminders(self):
+        """Test the minimal payload of due reminders"""
+        response = self.client.get('/api/tasks/due_reminders/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([task['id'] for task in response.data], [self.due.id])
+        self.assertEqual(set(response.data[0].keys()), {'id', 'title', 'status', 'end_date', 'reminder_date', 'location'})
+
+    def test_unchanged_poll_returns_304_without_task_query(self):
+        """Test conditional GET with the per-user task version"""
+        etag = self.client.get('/api/tasks/due_reminders/')['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/tasks/due_reminders/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.due.title = "Due (renamed)"
+        self.due.save()
+        response = self.client.get('/api/tasks/due_reminders/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_follows_until_time_and_passing_end_dates(self):
+        """Test a new window on the same day, or an end date passing, does not replay a stale 304"""
+        from unittest import mock
+        from urllib.parse import quote
+        until = timezone.now().replace(hour=23, minute=0, second=0, microsecond=0)
+        etag = self.client.get(f'/api/tasks/due_reminders/?until={quote(until.isoformat())}')['ETag']
+        earlier = until - timedelta(minutes=30)
+        response = self.client.get(f'/api/tasks/due_reminders/?until={quote(earlier.isoformat())}', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        url = f'/api/tasks/due_reminders/?until={quote(until.isoformat())}'
+        etag = self.client.get(url)['ETag']
+        with mock.patch('django.utils.timezone.now', return_value=self.due.end_date + timedelta(minutes=1)):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [])
+
+
+class TaskEventStreamTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+
+    def test_events_process_requires_redis(self):
+        """Test the ASGI events process refuses to start without a broker shared with the web process"""
+        import importlib
+        import sys
+        from django.core.exceptions import ImproperlyConfigured
+        sys.modules.pop('DjangoProjectPWR.asgi', None)
+        with override_settings(EVENTS_REDIS_URL=None), self.assertRaises(ImproperlyConfigured):
+            importlib.import_module('DjangoProjectPWR.asgi')
+
+    @skipUnless(importlib.util.find_spec('redis'), 'Needs the redis package')
+    def test_unreachable_redis_does_not_fail_the_publisher(self):
+        """Test a publish to an unreachable Redis is logged instead of raised"""
+        from . import events
+        broker = events.RedisBroker('redis://127.0.0.1:1/0')
+        with self.assertLogs('DjangoAPP.events', level='WARNING'):
+            broker.publish(self.user.pk, {'type': 'task.updated'})
+
+    def test_local_broker_fans_out_from_threads(self):
+        """Test that events published from a worker thread reach the user's subscribers only"""
+        import asyncio
+        import threading
+        from .events import LocalBroker
+
+        broker = LocalBroker()
+
+        async def scenario():
+            mine = broker.subscribe(self.user.id)
+            other = broker.subscribe(self.user.id + 1)
+            thread = threading.Thread(target=broker.publish, args=(self.user.id, {"type": "task.updated"}))
+            thread.start()
+            thread.join()
+            received = await mine.get(timeout=1)
+            missed = await other.get(timeout=0.05)
+            mine.close()
+            other.close()
+            return received, missed
+
+        received, missed = asyncio.run(scenario())
+        self.assertEqual(received, {"type": "task.updated"})
+        self.assertIsNone(missed)
+
+    def test_slow_client_gets_resync_instead_of_silent_drops(self):
+        """Test an overflowing queue is replaced by one resync event followed by newer events"""
+        import asyncio
+        from .events import LocalBroker, QUEUE_SIZE
+
+        async def scenario():
+            subscription = LocalBroker().subscribe(self.user.id)
+            for index in range(QUEUE_SIZE + 2):
+                subscription.deliver({"type": "task.updated", "index": index})
+            received = [await subscription.get(timeout=0.05) for _ in range(3)]
+            subscription.close()
+            return received
+
+        received = asyncio.run(scenario())
+        self.assertEqual(received[0], {"type": "resync"})
+        self.assertEqual(received[1], {"type": "task.updated", "index": QUEUE_SIZE + 1})
+        self.assertIsNone(received[2])
+
+    def test_task_changes_are_published_after_commit(self):
+        """Test that saving and deleting tasks publishes deltas"""
+        from unittest import mock
+
+        with mock.patch('DjangoAPP.events.get_broker') as get_broker:
+            with self.captureOnCommitCallbacks(execute=True):
+                task = Task.objects.create(user=self.user, title="Pushed", priority=1)
+            task_id = task.id
+            with self.captureOnCommitCallbacks(execute=True):
+                task.delete()
+
+        published = [call.args for call in get_broker.return_value.publish.call_args_list]
+        self.assertEqual(published[0][0], self.user.id)
+        self.assertEqual(published[0][1]['type'], 'task.created')
+        self.assertEqual(published[0][1]['task']['title'], 'Pushed')
+        self.assertEqual(published[1][1], {'type': 'task.deleted', 'task_id': task_id})
+
+    def test_stream_requires_a_valid_token(self):
+        """Test that the event stream rejects anonymous clients"""
+        response = self.client.get('/api/events/?token=invalid')
+        self.assertEqual(response.status_code, 401)
+
+
+class TaskSyncTestCase(TestCase):
+    def setUp(self):
+        from . import sync
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        end = timezone.now() + timedelta(days=3)
+        self.edited = Task.objects.create(user=self.user, title="Edited", end_date=end, priority=1)
+        self.parent = Task.objects.create(user=self.user, title="Parent", end_date=end, priority=1)
+        self.untouched = Task.objects.create(user=self.user, title="Untouched", end_date=end, priority=1, status="done")
+        self.removed = Task.objects.create(user=self.user, title="Removed", end_date=end, priority=1)
+        Task.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        self.token = sync.encode_token(timezone.now() - timedelta(minutes=30))
+
+    def test_full_snapshot_without_token(self):
+        """Test the initial sync returns every task, finished ones included"""
+        response = self.client.get('/api/tasks/sync/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['full'])
+        self.assertEqual(len(response.data['tasks']), 4)
+        self.assertEqual(response.data['deleted'], [])
+
+    def test_delta_returns_changed_and_deleted_tasks(self):
+        """Test edits, child rows and deletes since the token"""
+        self.edited.title = "Edited again"
+        self.edited.save()
+        SubTask.objects.create(parent_task=self.parent, title="Step", start_date=timezone.now(),
+                               end_date=timezone.now() + timedelta(days=1))
+        removed_id = self.removed.id
+        self.removed.delete()
+
+        response = self.client.get('/api/tasks/sync/', {'since': self.token})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['full'])
+        self.assertEqual({task['id'] for task in response.data['tasks']}, {self.edited.id, self.parent.id})
+        self.assertEqual(response.data['deleted'], [removed_id])
+        parent = next(task for task in response.data['tasks'] if task['id'] == self.parent.id)
+        self.assertEqual(len(parent['subtasks']), 1)
+
+    def test_overdue_sweep_marks_tasks_changed(self):
+        """Test the bulk overdue update is visible to the delta sync"""
+        from .overdue import sweep
+        sweep(now=timezone.now() + timedelta(days=5))
+        response = self.client.get('/api/tasks/sync/', {'since': self.token})
+        self.assertEqual({task['id'] for task in response.data['tasks']},
+                         {self.edited.id, self.parent.id, self.removed.id})
+
+    def test_invalid_and_expired_tokens(self):
+        """Test malformed tokens are rejected and stale ones fall back to a snapshot"""
+        from . import sync
+        response = self.client.get('/api/tasks/sync/', {'since': 'not-a-token'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        stale = sync.encode_token(timezone.now() - sync.TOMBSTONE_RETENTION - timedelta(days=1))
+        response = self.client.get('/api/tasks/sync/', {'since': stale})
+        self.assertTrue(response.data['full'])
+        self.assertEqual(len(response.data['tasks']), 4)
+
+
+class PointsLedgerTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_mark_done_and_spend_write_ledger_rows(self):
+        """Test awards and purchases are recorded and applied to the balance"""
+        from .models import PointsTransaction
+        task = Task.objects.create(user=self.user, title="Task", priority=2,
+                                   end_date=timezone.now() + timedelta(days=1))
+        self.client.post(f'/api/tasks/{task.id}/mark_done/')
+        response = self.client.patch('/api/profile/update_points/', {'points_to_deduct': 5}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['points_spent'], 5)
+
+        ledger = list(PointsTransaction.objects.filter(user=self.user).order_by('id').values_list('kind', 'amount'))
+        self.assertEqual(ledger, [('award', 20), ('spend', -5)])
+
+    def test_spend_cannot_overdraw(self):
+        """Test a purchase above the available balance is rejected without a ledger row"""
+        from .models import PointsTransaction
+        response = self.client.patch('/api/profile/update_points/', {'points_to_deduct': 1}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(PointsTransaction.objects.exists())
+
+    def test_reconcile_repairs_drift(self):
+        """Test the reconciliation job restores balances from the ledger"""
+        from . import points
+        points.award(self.user, [(None, 30)])
+        UserProfile.objects.filter(user=self.user).update(current_points=999)
+
+        drifted = points.reconcile(fix=True)
+        self.assertEqual([row['user_id'] for row in drifted], [self.user.id])
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual((profile.current_points, profile.total_points_earned), (30, 30))
+        self.assertEqual(points.reconcile(), [])
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class PointsConcurrencyTestCase(TransactionTestCase):
+    def test_parallel_awards_and_spends_keep_balances_consistent(self):
+        """Test no award is lost and the balance never goes negative under parallel load"""
+        import threading
+        from django.db import connection
+        from . import points
+
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        points.award(user, [(None, 100)])
+        barrier = threading.Barrier(20)
+        rejected = []
+        errors = []
+
+        def worker(index):
+            barrier.wait()
+            try:
+                if index % 2:
+                    points.award(user, [(None, 10)])
+                else:
+                    points.spend(user, 30)
+            except points.InsufficientPoints:
+                rejected.append(index)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        profile = UserProfile.objects.get(user=user)
+        self.assertEqual(profile.total_points_earned, 200)
+        self.assertEqual(profile.points_spent, 30 * (10 - len(rejected)))
+        self.assertGreaterEqual(profile.current_points - profile.points_spent, 0)
+        self.assertEqual(points.reconcile([user.id]), [])
+
+
+class MarkDoneIdempotencyTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.task = Task.objects.create(user=self.user, title="Task", priority=3,
+                                        end_date=timezone.now() + timedelta(days=1))
+
+    def test_repeated_mark_done_awards_once(self):
+        """Test a double click only awards points for the first completion"""
+        first = self.client.post(f'/api/tasks/{self.task.id}/mark_done/')
+        second = self.client.post(f'/api/tasks/{self.task.id}/mark_done/')
+        self.assertEqual(first.data['points_awarded'], 30)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data['points_awarded'], 0)
+        self.assertEqual(UserProfile.objects.get(user=self.user).total_points_earned, 30)
+
+    def test_idempotency_key_replays_first_response(self):
+        """Test a retry with the same key is answered without database work"""
+        headers = {'HTTP_IDEMPOTENCY_KEY': 'retry-1'}
+        first = self.client.post(f'/api/tasks/{self.task.id}/mark_done/', **headers)
+        with self.assertNumQueries(0):
+            retry = self.client.post(f'/api/tasks/{self.task.id}/mark_done/', **headers)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry.data['points_awarded'], 30)
+
+    def test_completion_touches_the_profile_once(self):
+        """Test mark_done updates and reads the profile once and never reloads the user"""
+        from django.test.utils import CaptureQueriesContext
+        version = UserProfile.objects.get(user=self.user).task_version
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.post(f'/api/tasks/{self.task.id}/mark_done/')
+        statements = [query['sql'] for query in captured.captured_queries]
+        self.assertEqual(len([sql for sql in statements if '"DjangoAPP_userprofile"' in sql]), 2)
+        self.assertFalse([sql for sql in statements if 'FROM "auth_user"' in sql])
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual(response.data['user_total_points'], profile.current_points)
+        self.assertEqual(profile.task_version, version + 1)
+
+    def test_abandoned_task_is_not_completed(self):
+        """Test abandoned tasks keep their status and award nothing"""
+        self.task.status = 'abandoned'
+        self.task.save()
+        response = self.client.post(f'/api/tasks/{self.task.id}/mark_done/')
+        self.assertEqual(response.data['points_awarded'], 0)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, 'abandoned')
+
+
+class BulkTaskOperationsTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        end = timezone.now() + timedelta(days=2)
+        self.to_update = Task.objects.create(user=self.user, title="Update me", end_date=end, priority=1)
+        self.to_complete = Task.objects.create(user=self.user, title="Complete me", end_date=end, priority=2)
+        self.to_delete = Task.objects.create(user=self.user, title="Delete me", end_date=end, priority=1)
+        other = User.objects.create_user(username='other', password='testpass123')
+        self.foreign = Task.objects.create(user=other, title="Not mine", end_date=end, priority=1)
+
+    def test_mixed_batch_returns_per_item_results(self):
+        """Test every kind of operation and per-item errors in one request"""
+        end = (timezone.now() + timedelta(days=3)).isoformat()
+        response = self.client.post('/api/tasks/bulk/', {'operations': [
+            {'op': 'create', 'data': {'title': 'New', 'end_date': end, 'priority': 2}},
+            {'op': 'create', 'data': {'priority': 2}},
+            {'op': 'update', 'id': self.to_update.id, 'data': {'priority': 4}},
+            {'op': 'complete', 'id': self.to_complete.id},
+            {'op': 'delete', 'id': self.to_delete.id},
+            {'op': 'delete', 'id': self.foreign.id},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = [item['result'] for item in response.data['results']]
+        self.assertEqual(results, ['created', 'error', 'updated', 'completed', 'deleted', 'error'])
+        self.assertIn('title', response.data['results'][1]['errors'])
+
+        self.assertTrue(Task.objects.filter(user=self.user, title='New').exists())
+        self.to_update.refresh_from_db()
+        self.assertEqual(self.to_update.priority, 4)
+        self.assertFalse(Task.objects.filter(id=self.to_delete.id).exists())
+        self.assertTrue(Task.objects.filter(id=self.foreign.id).exists())
+        self.assertEqual(response.data['points_awarded'], 20)
+        self.assertEqual(UserProfile.objects.get(user=self.user).total_points_earned, 20)
+
+    def test_completing_twice_awards_once(self):
+        """Test a repeated completion in a later batch is reported unchanged"""
+        batch = {'operations': [{'op': 'complete', 'id': self.to_complete.id}]}
+        self.client.post('/api/tasks/bulk/', batch, format='json')
+        response = self.client.post('/api/tasks/bulk/', batch, format='json')
+        self.assertEqual(response.data['results'][0]['result'], 'unchanged')
+        self.assertEqual(UserProfile.objects.get(user=self.user).total_points_earned, 20)
+
+    def test_deletes_run_in_bulk_with_tombstones(self):
+        """Test deletes remove nested rows and leave tombstones with one statement per table"""
+        from .models import TaskTombstone, WorkSession
+        end = timezone.now() + timedelta(days=1)
+        tasks = [Task.objects.create(user=self.user, title=f"Gone {i}", end_date=end, priority=1) for i in range(20)]
+        for task in tasks[:5]:
+            SubTask.objects.create(parent_task=task, title="Step", start_date=end, end_date=end)
+            WorkSession.objects.create(task=task)
+            CyclicTask.objects.create(task=task, frequency="weekly")
+        version = UserProfile.objects.get(user=self.user).task_version
+        operations = [{'op': 'delete', 'id': task.id} for task in tasks]
+        with self.assertNumQueries(12):
+            response = self.client.post('/api/tasks/bulk/', {'operations': operations}, format='json')
+        self.assertEqual({item['result'] for item in response.data['results']}, {'deleted'})
+        self.assertFalse(Task.objects.filter(title__startswith="Gone").exists())
+        self.assertFalse(SubTask.objects.exists() or WorkSession.objects.exists() or CyclicTask.objects.exists())
+        self.assertEqual(set(TaskTombstone.objects.filter(user=self.user).values_list('task_id', flat=True)),
+                         {task.id for task in tasks})
+        self.assertEqual(UserProfile.objects.get(user=self.user).task_version, version + 1)
+
+    def test_rejects_malformed_batches(self):
+        """Test the batch shape and size limits"""
+        from .bulk import MAX_OPERATIONS
+        response = self.client.post('/api/tasks/bulk/', {'operations': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        operations = [{'op': 'delete', 'id': index} for index in range(MAX_OPERATIONS + 1)]
+        response = self.client.post('/api/tasks/bulk/', {'operations': operations}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CreateSplitTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _plan(self, count, **overrides):
+        start = timezone.now()
+        subtasks = []
+        for index in range(count):
+            subtask = {'title': f'Step {index}', 'start_date': (start + timedelta(days=index)).isoformat(),
+                       'end_date': (start + timedelta(days=index + 1)).isoformat(), 'priority': 3}
+            subtask.update(overrides)
+            subtasks.append(subtask)
+        return {'title': 'Project', 'priority': 5, 'subtasks': subtasks}
+
+    def test_query_count_does_not_grow_with_subtasks(self):
+        """Test subtasks are inserted in one statement and the response needs no re-query"""
+        with self.assertNumQueries(5):
+            self.client.post('/api/tasks/create_split/', self._plan(2), format='json')
+        with self.assertNumQueries(5):
+            response = self.client.post('/api/tasks/create_split/', self._plan(120), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data['subtasks']), 120)
+        self.assertTrue(response.data['parent_task']['is_split'])
+        self.assertEqual(SubTask.objects.filter(parent_task_id=response.data['parent_task']['id']).count(), 120)
+
+    def test_parent_spans_subtasks(self):
+        """Test the parent dates come from the earliest start and latest end"""
+        plan = self._plan(3)
+        response = self.client.post('/api/tasks/create_split/', plan, format='json')
+        task = Task.objects.get(id=response.data['parent_task']['id'])
+        self.assertEqual(task.start_date.isoformat(), plan['subtasks'][0]['start_date'])
+        self.assertEqual(task.end_date.isoformat(), plan['subtasks'][-1]['end_date'])
+
+    def test_rejects_invalid_subtasks(self):
+        """Test priority range and date order are validated before anything is written"""
+        response = self.client.post('/api/tasks/create_split/', self._plan(2, priority=11), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        plan = self._plan(1)
+        plan['subtasks'][0]['end_date'] = (timezone.now() - timedelta(days=1)).isoformat()
+        response = self.client.post('/api/tasks/create_split/', plan, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Task.objects.exists())
+
+
+class TaskExportTestCase(TestCase):
+    def setUp(self):
+        from .models import WorkSession
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        now = timezone.now()
+        self.task = Task.objects.create(user=self.user, title="Report, final", end_date=now - timedelta(days=2),
+                                        priority=2, status="done")
+        SubTask.objects.create(parent_task=self.task, title="Draft", start_date=now - timedelta(days=4),
+                               end_date=now - timedelta(days=3))
+        WorkSession.objects.create(task=self.task)
+        cyclic = Task.objects.create(user=self.user, title="Weekly", end_date=now + timedelta(days=1), priority=1)
+        CyclicTask.objects.create(task=cyclic, frequency="weekly", occurrences_count=4)
+        Task.objects.create(user=self.user, title="Old", end_date=now - timedelta(days=60), priority=1)
+
+    def _body(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson_export_includes_relations(self):
+        """Test one JSON object per task with nested rows, in end date order"""
+        response = self.client.get('/api/tasks/export/', {'as': 'ndjson'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        records = [json.loads(line) for line in self._body(response).splitlines()]
+        self.assertEqual([record['title'] for record in records], ["Old", "Report, final", "Weekly"])
+        self.assertEqual(records[1]['subtasks'][0]['title'], "Draft")
+        self.assertEqual(len(records[1]['sessions']), 1)
+        self.assertEqual(records[2]['frequency'], "weekly")
+
+    def test_csv_export_with_date_filter(self):
+        """Test the CSV download honours the date window and quotes values"""
+        import csv
+        window_start = (timezone.now() - timedelta(days=10)).date().isoformat()
+        response = self.client.get('/api/tasks/export/', {'from': window_start})
+        self.assertIn('attachment;', response['Content-Disposition'])
+        rows = list(csv.DictReader(self._body(response).splitlines()))
+        self.assertEqual([row['title'] for row in rows], ["Report, final", "Weekly"])
+        self.assertEqual(json.loads(rows[0]['subtasks'])[0]['title'], "Draft")
+
+    def test_total_hours_match_the_task_model(self):
+        """Test exported hours use Task.total_hours, which counts an unscheduled task as one hour"""
+        import csv
+        response = self.client.get('/api/tasks/export/')
+        rows = {row['title']: row for row in csv.DictReader(self._body(response).splitlines())}
+        for task in Task.objects.filter(user=self.user):
+            self.assertEqual(int(rows[task.title]['total_hours']), task.total_hours)
+        self.assertEqual(rows["Weekly"]['total_hours'], '1')
+
+    def test_rejects_unknown_format(self):
+        """Test an unsupported export format"""
+        response = self.client.get('/api/tasks/export/', {'as': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TaskImportTestCase(TestCase):
+    ICS = "\r\n".join([
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "BEGIN:VEVENT",
+        "SUMMARY:Team sync\\, weekly",
+        "DTSTART:20250106T090000Z",
+        "DTEND:20250106T100000Z",
+        "RRULE:FREQ=WEEKLY;INTERVAL=2;COUNT=5",
+        "DESCRIPTION:Agenda in the shared",
+        "  doc",
+        "BEGIN:VALARM",
+        "TRIGGER:-PT15M",
+        "DESCRIPTION:Alarm text",
+        "END:VALARM",
+        "END:VEVENT",
+        "BEGIN:VEVENT",
+        "SUMMARY:Holiday",
+        "DTSTART;VALUE=DATE:20250110",
+        "DTEND;VALUE=DATE:20250111",
+        "END:VEVENT",
+        "BEGIN:VEVENT",
+        "SUMMARY:Broken",
+        "END:VEVENT",
+        "END:VCALENDAR",
+    ]) + "\r\n"
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _upload(self, name, content, **params):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        upload = SimpleUploadedFile(name, content.encode())
+        query = '&'.join(f'{key}={value}' for key, value in params.items())
+        return self.client.post(f'/api/tasks/import/?{query}', {'file': upload}, format='multipart')
+
+    def test_ics_import_maps_rrule_alarm_and_all_day_events(self):
+        """Test events, recurrence, reminders and per-event errors from an ICS file"""
+        response = self._upload('calendar.ics', self.ICS)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response.data['created'], response.data['cyclic'], response.data['failed']), (2, 1, 1))
+        self.assertEqual(response.data['errors'][0]['line'], 20)
+
+        sync = Task.objects.get(user=self.user, title="Team sync, weekly")
+        self.assertEqual(sync.description, "Agenda in the shared doc")
+        self.assertEqual(sync.reminder_date, sync.start_date - timedelta(minutes=15))
+        self.assertEqual((sync.cycle.frequency, sync.cycle.occurrences_count), ("biweekly", 4))
+        self.assertEqual(sync.cycle.series_end, sync.end_date + timedelta(weeks=8))
+
+        holiday = Task.objects.get(user=self.user, title="Holiday")
+        self.assertEqual(holiday.end_date.date(), holiday.start_date.date())
+
+    def test_csv_round_trip_with_row_errors(self):
+        """Test a CSV written by the export imports back, reporting bad rows by line"""
+        end = timezone.now() + timedelta(days=1)
+        task = Task.objects.create(user=self.user, title="Exported", end_date=end, priority=4, category="work")
+        CyclicTask.objects.create(task=task, frequency="monthly", occurrences_count=3)
+        exported = b''.join(self.client.get('/api/tasks/export/').streaming_content).decode()
+        exported += ',,,,,notanumber,,,,,,,,,,,\n'
+
+        response = self._upload('tasks.csv', exported)
+        self.assertEqual((response.data['created'], response.data['cyclic'], response.data['failed']), (1, 1, 1))
+        self.assertEqual(response.data['errors'][0]['line'], 3)
+        imported = Task.objects.filter(user=self.user, title="Exported").exclude(id=task.id).get()
+        self.assertEqual((imported.priority, imported.category, imported.end_date), (4, "work", end))
+        self.assertEqual((imported.cycle.frequency, imported.cycle.occurrences_count), ("monthly", 3))
+
+    def test_out_of_range_repetitions_are_row_errors(self):
+        """Test huge CSV and ICS repetition counts are rejected per row instead of failing the import"""
+        end = (timezone.now() + timedelta(days=1)).isoformat()
+        response = self._upload('tasks.csv', f'title,end_date,frequency,occurrences_count\nOk,{end},weekly,3\n'
+                                             f'Huge,{end},daily,99999999999\n')
+        self.assertEqual((response.data['created'], response.data['cyclic'], response.data['failed']), (1, 1, 1))
+        self.assertEqual(response.data['errors'][0]['line'], 3)
+
+        ics = self.ICS.replace('COUNT=5', 'COUNT=99999999999')
+        response = self._upload('calendar.ics', ics)
+        self.assertEqual((response.data['created'], response.data['failed']), (1, 2))
+
+    def test_csv_status_and_points_are_not_imported(self):
+        """Test imported rows start pending with points derived from priority, whatever the file says"""
+        response = self._upload('tasks.csv', 'title,status,priority,points\nFarmed,done,3,999999\n')
+        self.assertEqual(response.data['created'], 1)
+        task = Task.objects.get(user=self.user, title="Farmed")
+        self.assertEqual((task.status, task.points), ("pending", 30))
+
+    def test_unknown_format_is_rejected(self):
+        """Test a file whose format cannot be determined"""
+        response = self._upload('tasks.txt', 'title\nA\n')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self._upload('tasks.txt', 'title\nA\n', **{'as': 'csv'})
+        self.assertEqual(response.data['created'], 1)
+
+
+class IndexTestCase(TestCase):
+    def test_declared_indexes_exist(self):
+        """Test every index declared on the app's models was created by the migrations, on any backend"""
+        from django.apps import apps
+        for model in apps.get_app_config('DjangoAPP').get_models():
+            with connection.cursor() as cursor:
+                existing = connection.introspection.get_constraints(cursor, model._meta.db_table)
+            for index in model._meta.indexes:
+                self.assertIn(index.name, existing, model.__name__)
+                self.assertTrue(existing[index.name]['index'], index.name)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Query plans are checked against PostgreSQL')
+class QueryPlanTestCase(TestCase):
+    """With sequential scans priced out, every hot query must still find an index"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        now = timezone.now()
+        for index, task_status in enumerate(['pending', 'in progress', 'done', 'abandoned', 'overdue']):
+            Task.objects.create(user=self.user, title=f"Task {index}", status=task_status, priority=1,
+                                end_date=now + timedelta(days=index - 2), reminder_date=now)
+
+    def assertIndexScan(self, queryset):
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        plan = queryset.explain()
+        self.assertNotIn('Seq Scan', plan, plan)
+
+    def test_task_queries_use_indexes(self):
+        """Test the task list, sweep, reminder and sync lookups"""
+        from .models import LeaderboardEntry
+        from .overdue import ACTIVE_STATUSES
+        now = timezone.now()
+        tasks = Task.objects.filter(user=self.user)
+        self.assertIndexScan(tasks.filter(status__in=['pending', 'in progress', 'overdue']).order_by('end_date'))
+        self.assertIndexScan(tasks.filter(status__in=['done', 'abandoned']).order_by('end_date'))
+        self.assertIndexScan(Task.objects.filter(status__in=ACTIVE_STATUSES, end_date__lt=now).order_by('end_date', 'id'))
+        self.assertIndexScan(
+            tasks.filter(reminder_date__isnull=False, reminder_date__lte=now).exclude(status__in=['done', 'abandoned'])
+        )
+        self.assertIndexScan(tasks.filter(updated_at__gt=now - timedelta(minutes=5)))
+        self.assertIndexScan(tasks.filter(start_date__lte=now, end_date__gte=now - timedelta(days=7)))
+        self.assertIndexScan(LeaderboardEntry.objects.order_by('-points', 'user_id')[:20])
+
+
+class RankServiceTestCase(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from .models import LeaderboardEntry
+        from . import leaderboard
+        cache.delete(leaderboard.RANK_BUCKETS_KEY)
+        self.users = []
+        for index in range(23):
+            user = User.objects.create_user(username=f'user{index}', password='testpass123')
+            LeaderboardEntry.objects.filter(user=user).update(points=(index * 7) % 10 * 10)
+            self.users.append(user)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.users[5])
+
+    def test_bucketed_rank_matches_full_ordering(self):
+        """Test ranks counted from cached bucket boundaries equal the positions in the full ordering"""
+        from unittest import mock
+        from .models import LeaderboardEntry
+        from . import leaderboard
+        ordered = list(LeaderboardEntry.objects.order_by('-points', 'user_id'))
+        with mock.patch.object(leaderboard, 'RANK_BUCKET_SIZE', 4):
+            self.assertEqual(len(leaderboard.rank_buckets()), 6)
+            for position, entry in enumerate(ordered, start=1):
+                self.assertEqual(leaderboard.rank_of(entry), position)
+
+    def test_elite_member_uses_bucketed_rank(self):
+        """Test the achievement engine ranks through rank_of, stale bucket snapshot included"""
+        from unittest import mock
+        from django.core.cache import cache
+        from .models import LeaderboardEntry
+        from . import achievements, leaderboard
+        ordered = list(LeaderboardEntry.objects.order_by('-points', 'user_id'))
+        user = ordered[11].user  # Exactly 12th, outside the top 10
+        with mock.patch.object(leaderboard, 'RANK_BUCKET_SIZE', 4):
+            buckets = leaderboard.rank_buckets()
+            # A snapshot from before four users moved ahead of the third bucket
+            points, user_id, position = buckets[2]
+            buckets[2] = (points, user_id, position - 4)
+            cache.set(leaderboard.RANK_BUCKETS_KEY, buckets, leaderboard.RANK_BUCKETS_TIMEOUT)
+            self.assertEqual(leaderboard.rank_of(ordered[11]), 8)
+            self.assertIn(5, achievements.evaluate_user(user))
+
+    def test_my_rank_includes_neighbors(self):
+        """Test the users directly above and below in rank order"""
+        from .models import LeaderboardEntry
+        ordered = [entry.user_id for entry in LeaderboardEntry.objects.order_by('-points', 'user_id')]
+        response = self.client.get('/api/profile/my_rank/', {'neighbors': 2})
+        rank = response.data['rank']
+        self.assertEqual(ordered[rank - 1], self.users[5].id)
+        self.assertEqual([item['id'] for item in response.data['above']], ordered[rank - 3:rank - 1])
+        self.assertEqual([item['rank'] for item in response.data['above']], [rank - 2, rank - 1])
+        self.assertEqual([item['id'] for item in response.data['below']], ordered[rank:rank + 2])
+        self.assertEqual([item['rank'] for item in response.data['below']], [rank + 1, rank + 2])
+
+
+class BenchmarkTestCase(TestCase):
+    def test_seed_and_measure_small_scale(self):
+        """Test the benchmark seeds the requested scale and reports every endpoint"""
+        from .models import CyclicTask
+        from . import benchmark
+        user = benchmark.seed(200, tasks_per_user=50)
+        self.assertEqual(User.objects.filter(username__startswith=benchmark.USERNAME_PREFIX).count(), 4)
+        self.assertEqual(Task.objects.count(), 200)
+        self.assertEqual(CyclicTask.objects.count(), 200 // benchmark.CYCLE_EVERY)
+
+        report = benchmark.run(user, repeat=1, cold=True)
+        self.assertEqual(set(report), {
+            'tasks', 'mark_done', 'rankings', 'user_achievements', 'user_stats', 'create_split', 'create_cyclic',
+        })
+        for measured in report.values():
+            self.assertEqual(measured['runs'], 1)
+            self.assertGreater(measured['queries'], 0)
+            self.assertGreater(measured['peak_memory_kib'], 0)
+            self.assertLessEqual(measured['latency_ms']['min'], measured['latency_ms']['max'])
+
+    def test_scale_names(self):
+        """Test named and numeric scales"""
+        from . import benchmark
+        self.assertEqual(benchmark.scale_of('10k'), 10_000)
+        self.assertEqual(benchmark.scale_of('2500'), 2500)
+        with self.assertRaises(ValueError):
+            benchmark.scale_of('huge')
+
+
+class ResponseCacheTestCase(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.user = User.objects.create_user(username='cached', password='testpass123')
+        self.other = User.objects.create_user(username='other', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _complete_task(self, user, priority):
+        start_date = timezone.now()
+        task = Task.objects.create(
+            user=user, title="Cached Task", start_date=start_date,
+            end_date=start_date + timedelta(days=1), priority=priority, status="pending"
+        )
+        self.client.force_authenticate(user=user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/api/tasks/{task.id}/mark_done/')
+        self.client.force_authenticate(user=self.user)
+        return response
+
+    def test_repeated_reads_are_served_from_cache(self):
+        """Test the second read of each cached endpoint is a hit without recomputing"""
+        urls = {
+            '/api/profile/me/': 0,
+            '/api/profile/user_achievements/': 0,
+            '/api/profile/rankings/': 0,
+            f'/api/profile/{self.user.id}/user_stats/': 1,  # The user lookup by id
+        }
+        for url, queries in urls.items():
+            first = self.client.get(url)
+            self.assertEqual(first['X-Cache'], 'MISS')
+            with self.assertNumQueries(queries):
+                second = self.client.get(url)
+            self.assertEqual(second['X-Cache'], 'HIT')
+            self.assertEqual(second.data, first.data)
+
+    def test_completion_invalidates_profile_stats_and_rankings(self):
+        """Test mark_done bumps the user's entries and the rankings"""
+        self.client.get('/api/profile/me/')
+        self.client.get('/api/profile/rankings/')
+        self.client.get(f'/api/profile/{self.other.id}/user_stats/')
+
+        self._complete_task(self.user, 5)
+
+        response = self.client.get('/api/profile/me/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['current_points'], 50)
+        response = self.client.get('/api/profile/rankings/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data[0]['name'], 'cached')
+        # Another user's rank moved, so their cached stats are stale too
+        response = self.client.get(f'/api/profile/{self.other.id}/user_stats/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['rank'], 2)
+
+    def test_spending_invalidates_only_the_spender(self):
+        """Test update_points bumps the spender's version and leaves other users cached"""
+        self._complete_task(self.user, 5)
+        self.client.get('/api/profile/me/')
+        self.client.get(f'/api/profile/{self.other.id}/user_stats/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch('/api/profile/update_points/', {'points_to_deduct': 20}, format='json')
+
+        response = self.client.get('/api/profile/me/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['points_spent'], 20)
+        self.assertEqual(self.client.get(f'/api/profile/{self.other.id}/user_stats/')['X-Cache'], 'HIT')
+
+    def test_entries_follow_the_configured_timeout(self):
+        """Test RESPONSE_CACHE_TIMEOUT bounds entry lifetime, as it does for per-process caches"""
+        with override_settings(RESPONSE_CACHE_TIMEOUT=0):
+            self.client.get('/api/profile/me/')
+            self.assertEqual(self.client.get('/api/profile/me/')['X-Cache'], 'MISS')
+
+    def test_hit_and_miss_counters(self):
+        """Test the shared counters and the cache_stats command"""
+        import json
+        from io import StringIO
+        from django.core.management import call_command
+        from . import response_cache
+        response_cache.reset_stats()
+        self.client.get('/api/profile/me/')
+        self.client.get('/api/profile/me/')
+        self.client.get('/api/profile/me/')
+        self.assertEqual(response_cache.stats(), {'hits': 2, 'misses': 1, 'hit_ratio': 0.6667})
+
+        out = StringIO()
+        call_command('cache_stats', '--reset', stdout=out)
+        self.assertEqual(json.loads(out.getvalue().splitlines()[0])['hits'], 2)
+        self.assertEqual(response_cache.stats()['hits'], 0)
+
+
+@override_settings(AUTH_CLAIMS_ONLY=True)
+class ClaimsAuthenticationTestCase(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from . import authentication
+        cache.clear()
+        authentication.users.clear()
+        self.user = User.objects.create_user(username='claims', password='testpass123')
+        self.client = APIClient()
+        response = self.client.post('/api/token/', {'username': 'claims', 'password': 'testpass123'}, format='json')
+        self.access = response.data['access']
+        self.refresh = response.data['refresh']
+
+    def test_login_token_carries_identity_claims(self):
+        """Test the access token has the username, profile id and join time"""
+        from rest_framework_simplejwt.tokens import AccessToken
+        token = AccessToken(self.access)
+        self.assertEqual(token['username'], 'claims')
+        self.assertEqual(token['profile_id'], self.user.profile.pk)
+        self.assertEqual(token['date_joined'], self.user.date_joined.isoformat())
+
+    def test_authentication_needs_no_user_query(self):
+        """Test a claims token authenticates from the token alone and the profile loads once"""
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+        with self.assertNumQueries(1):  # The profile, nothing for the user
+            response = self.client.get('/api/profile/me/')
+        self.assertEqual(response.data['username'], 'claims')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/profile/me/')
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+    def test_claims_user_owns_created_tasks(self):
+        """Test a user built from claims can be assigned to new rows"""
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+        response = self.client.post('/api/tasks/', {'title': 'From claims', 'priority': 2}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Task.objects.get(pk=response.data['id']).user, self.user)
+
+    def test_refreshed_token_keeps_claims(self):
+        """Test access tokens minted from a refresh token carry the same claims"""
+        from rest_framework_simplejwt.tokens import AccessToken
+        response = self.client.post('/api/token/refresh/', {'refresh': self.refresh}, format='json')
+        self.assertEqual(AccessToken(response.data['access'])['username'], 'claims')
+
+    def test_token_without_claims_loads_user_once(self):
+        """Test older tokens fall back to the database and are then served from the LRU"""
+        from rest_framework_simplejwt.tokens import AccessToken
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        with self.assertNumQueries(1):
+            self.client.get('/api/profile/achievements/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/profile/achievements/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_deactivated_user_is_refused(self):
+        """Test a claims token stops working once the account is deactivated, and again after reactivation"""
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+        self.assertEqual(self.client.get('/api/profile/achievements/').status_code, status.HTTP_200_OK)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/profile/achievements/').status_code, status.HTTP_401_UNAUTHORIZED)
+        self.user.is_active = True
+        self.user.save()
+        self.assertEqual(self.client.get('/api/profile/achievements/').status_code, status.HTTP_200_OK)
+
+    def test_deleted_user_is_refused(self):
+        """Test a claims token of a deleted account is rejected instead of failing on writes"""
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+        self.client.get('/api/profile/achievements/')
+        self.user.delete()
+        response = self.client.post('/api/tasks/', {'title': 'Orphan', 'priority': 1}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(AUTH_CLAIMS_ONLY=False)
+    def test_per_process_cache_reads_the_user_row(self):
+        """Test that without a shared cache a deactivation is seen through the user row, not the marker"""
+        from django.core.cache import cache
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+        self.assertEqual(self.client.get('/api/profile/achievements/').status_code, status.HTTP_200_OK)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)  # As another worker would, without a marker here
+        cache.clear()
+        self.assertEqual(self.client.get('/api/profile/achievements/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_reused_id_is_not_refused(self):
+        """Test the revocation marker only matches the deleted account's join time"""
+        from datetime import timedelta
+        from . import authentication
+        self.user.date_joined -= timedelta(days=1)
+        authentication.revoke(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+        self.assertEqual(self.client.get('/api/profile/achievements/').status_code, status.HTTP_200_OK)
+
+
+class RequestMetricsTestCase(TestCase):
+    def setUp(self):
+        from . import metrics
+        metrics.registry.reset()
+        self.user = User.objects.create_user(username='measured', password='testpass123')
+        Task.objects.create(user=self.user, title='Measured task', priority=2)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_server_timing_header_counts_queries(self):
+        """Test the Server-Timing header reports the request's SQL count and timings"""
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get('/api/tasks/')
+        timing = response['Server-Timing']
+        self.assertIn(f'desc="{len(captured.captured_queries)} queries"', timing)
+        self.assertIn('serialize;dur=', timing)
+        self.assertIn('total;dur=', timing)
+
+    @override_settings(METRICS_TOKEN='scrape-secret')
+    def test_metrics_endpoint_aggregates_per_view_and_action(self):
+        """Test /metrics renders histograms labelled with the viewset and action"""
+        from . import metrics
+        self.client.get('/api/tasks/')
+        self.client.get('/api/tasks/')
+        self.client.get('/api/profile/me/')
+
+        body = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret').content.decode()
+        self.assertIn('taskero_request_duration_seconds_count{view="TaskViewSet",action="list"} 2', body)
+        self.assertIn('taskero_request_sql_queries_count{view="ProfileViewSet",action="me"} 1', body)
+        self.assertIn('taskero_request_duration_seconds_bucket{view="TaskViewSet",action="list",le="+Inf"} 2', body)
+        self.assertIn('# TYPE taskero_response_size_bytes histogram', body)
+        self.assertIn('taskero_response_cache_misses_total', body)
+        counts, total = metrics.registry.serializer.series[('TaskViewSet', 'list')]
+        self.assertGreater(total[0], 0)
+
+    @override_settings(METRICS_TOKEN='scrape-secret')
+    def test_metrics_token(self):
+        """Test the endpoint requires the configured bearer token"""
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_TOKEN=None)
+    def test_metrics_hidden_without_token(self):
+        """Test the endpoint is not served until a scrape token is configured"""
+        self.client.get('/api/tasks/')
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+    @override_settings(REQUEST_METRICS_ENABLED=False)
+    def test_disabled_by_setting(self):
+        """Test turning the setting off removes the middleware and the endpoint"""
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        response = client.get('/api/tasks/')
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(client.get('/metrics').status_code, 404)
+
+
+class NPlusOneDetectorTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='detected', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_normalize_collapses_literals_and_in_lists(self):
+        """Test lookups that differ only in parameters share one template"""
+        from .nplusone import normalize
+        self.assertEqual(
+            normalize("SELECT *  FROM t WHERE id IN (%s, %s, %s) AND name = 'x' LIMIT 21"),
+            normalize("SELECT * FROM t WHERE id IN (%s) AND name = 'y' LIMIT 1"),
+        )
+
+    def test_repeated_lookup_is_attributed_to_its_line(self):
+        """Test a lookup in a loop is reported with the line that issued it"""
+        from . import nplusone
+        tasks = [Task.objects.create(user=self.user, title=f'Task {i}') for i in range(5)]
+        with nplusone.detect(threshold=3) as detector:
+            for task in tasks:
+                Task.objects.get(pk=task.pk)
+        violations = detector.violations()
+        self.assertEqual(len(violations), 1)
+        self.assertEqual(violations[0]['count'], 5)
+        self.assertIn('in test_repeated_lookup_is_attributed_to_its_line', violations[0]['stack'][-1])
+
+    def test_task_list_has_no_n_plus_one(self):
+        """Test listing tasks with sessions, subtasks and cycles runs each lookup once"""
+        from datetime import time
+        from .models import WorkSession
+        from . import nplusone
+        start = timezone.now()
+        for i in range(6):
+            task = Task.objects.create(user=self.user, title=f'Task {i}', start_date=start, end_date=start + timedelta(days=1))
+            WorkSession.objects.create(task=task, start_time=time(9), end_time=time(10))
+            SubTask.objects.create(parent_task=task, title='Step', start_date=start, end_date=start)
+            CyclicTask.objects.create(task=task, frequency='weekly')
+        with nplusone.detect(threshold=1) as detector:
+            response = self.client.get('/api/tasks/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(detector.violations(), [])
+
+    @override_settings(NPLUSONE_MODE='raise', NPLUSONE_THRESHOLD=0)
+    def test_middleware_raises_with_view_attribution(self):
+        """Test raise mode fails the request and names the view"""
+        from .nplusone import NPlusOneError
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        task = Task.objects.create(user=self.user, title='Any lookup repeats past a zero threshold', priority=1)
+        with self.assertRaises(NPlusOneError) as raised:
+            client.post(f'/api/tasks/{task.id}/mark_done/')
+        self.assertIn(f'POST /api/tasks/{task.id}/mark_done/', str(raised.exception))
+        self.assertIn('in mark_done', str(raised.exception))
+
+
+@skipUnless('replica' in settings.DATABASES, "Set REPLICA_DB_HOST to configure the replica alias")
+class ReplicaRoutingTestCase(TransactionTestCase):
+    # The runner collects the aliases of skipped classes too
+    databases = {'default', 'replica'} if 'replica' in settings.DATABASES else {'default'}
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.user = User.objects.create_user(username='reader', password='testpass123')
+        self.other = User.objects.create_user(username='writer', password='testpass123')
+        start_date = timezone.now() - timedelta(days=1)
+        self.task = Task.objects.create(user=self.user, title="Replicated", start_date=start_date,
+                                        end_date=start_date + timedelta(hours=2), priority=2, status="pending")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _queries(self, method, path, **kwargs):
+        """Statements the request ran on (default, replica)"""
+        from django.db import connections
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connections['default']) as primary, CaptureQueriesContext(connections['replica']) as replica:
+            response = getattr(self.client, method)(path, **kwargs)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertLess(response.status_code, 400)
+        return len(primary), len(replica)
+
+    def test_designated_actions_read_from_replica(self):
+        """Test rankings, stats, achievements and exports read from the replica and other actions do not"""
+        for path in ('/api/profile/rankings/', f'/api/profile/{self.other.id}/user_stats/',
+                     '/api/profile/user_achievements/', '/api/tasks/export/'):
+            self.assertGreater(self._queries('get', path)[1], 0, path)
+        self.assertEqual(self._queries('get', '/api/tasks/')[1], 0)
+
+    def test_own_write_pins_reads_to_primary(self):
+        """Test a user's reads stay on the primary after their own write while other users keep the replica"""
+        self._queries('post', f'/api/tasks/{self.task.id}/mark_done/')
+        self.assertEqual(self._queries('get', '/api/profile/user_achievements/')[1], 0)
+        self.assertEqual(self._queries('get', '/api/tasks/export/')[1], 0)
+        self.client.force_authenticate(user=self.other)
+        self.assertGreater(self._queries('get', '/api/profile/user_achievements/')[1], 0)
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        """Test reads return to the primary while the replica is further behind than REPLICA_MAX_LAG"""
+        from unittest.mock import patch
+        from . import replica
+        with patch.object(replica, 'lag', return_value=60.0):
+            primary, replicated = self._queries('get', '/api/profile/rankings/')
+        self.assertGreater(primary, 0)
+        self.assertEqual(replicated, 0)
+
+    def test_writes_and_transactions_use_primary(self):
+        """Test the router sends writes, and reads inside a transaction, to the primary"""
+        from django.db import transaction
+        from . import replica
+        router = replica.ReplicaRouter()
+        token = replica.begin(self.user)
+        try:
+            self.assertEqual(router.db_for_read(Task), 'replica')
+            with transaction.atomic():
+                self.assertIsNone(router.db_for_read(Task))
+            self.assertEqual(router.db_for_write(Task), 'default')
+            self.assertIsNone(router.db_for_read(Task))  # The request has written
+        finally:
+            replica.end(token)
+        self.assertIsNone(router.db_for_read(Task))
+        self.assertFalse(router.allow_migrate('replica', 'DjangoAPP'))
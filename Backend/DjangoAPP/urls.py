@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import TaskViewSet, RegisterViewSet, ProfileViewSet
+from .views import TaskViewSet, RegisterViewSet, ProfileViewSet, task_event_stream
 
 router = DefaultRouter()
 router.register(r'tasks', TaskViewSet)
@@ -9,4 +9,5 @@ router.register(r'profile', ProfileViewSet, basename='profile')
 urlpatterns = [
     path('', include(router.urls)),
     path("register/", RegisterViewSet.as_view(), name="register"),
+    path("events/", task_event_stream, name="task-events"),
 ]
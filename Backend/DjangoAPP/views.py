@@ -3,67 +3,303 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from django.contrib.auth.models import User
-from .models import Task, UserProfile, CyclicTask, SubTask
-from .serializers import TaskSerializer, UserSerializer, RegisterSerializer, UserProfileSerializer, SubTaskSerializer
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from .models import Task, UserProfile, CyclicTask
+from .serializers import TaskSerializer, UserSerializer, RegisterSerializer, UserProfileSerializer, SubTaskSerializer, SplitTaskSerializer
+from .pagination import TaskKeysetPagination
+from . import achievements, authentication, bulk, calendar_feed, completion, daily_points, events, export, importer, leaderboard, points, recurrence, replica, response_cache, sync
 
+CALENDAR_MAX_DAYS: int = 400
+EVENT_STREAM_HEARTBEAT: float = 15.0
+EVENT_STREAM_RETRY_MS: int = 5000
+MARK_DONE_IDEMPOTENCY_TTL: int = 60 * 60 * 24
+MAX_RANK_NEIGHBORS: int = 10
+ACHIEVEMENTS_CATALOG_MAX_AGE: int = 60 * 60 * 24
 
-class TaskViewSet(viewsets.ModelViewSet):
+
+class TaskViewSet(replica.ReplicaReadsMixin, viewsets.ModelViewSet):
     queryset = Task.objects.all()
     serializer_class = TaskSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = TaskKeysetPagination
+    replica_actions = ('export_tasks',)
 
     def get_queryset(self):
-        from django.utils import timezone
-        
+        # Expired tasks are reported as overdue by TaskSerializer; the sweep_overdue job persists it
         user_request = Task.objects.filter(user=self.request.user)
 
-        now = timezone.now()
-        overdue_tasks = user_request.filter(
-            end_date__lt=now,
-            status__in=["pending", "in progress"]
-        )
-        overdue_tasks.update(status="overdue")
-
         status_filter = self.request.query_params.get("status")
         if status_filter == "done":
             user_request = user_request.filter(status__in=["done", "abandoned"])
         else:
             user_request = user_request.filter(status__in=["pending", "in progress", "overdue"])
 
+        if self.action in ("list", "retrieve"):
+            # Load the nested relations the response needs in two extra queries, not per task
+            selected = self._selected_fields()
+            if selected is None or selected & {"cycle", "is_cyclic"}:
+                user_request = user_request.select_related("cycle")
+            if selected is None or selected & {"sessions", "total_hours"}:
+                user_request = user_request.prefetch_related("sessions")
+            if selected is None or selected & {"subtasks", "is_split"}:
+                user_request = user_request.prefetch_related("subtasks")
+
         return user_request.order_by("end_date")
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action in ("list", "retrieve"):
+            kwargs.setdefault("fields", self._query_list("fields"))
+            kwargs.setdefault("expand", self._query_list("expand"))
+        return super().get_serializer(*args, **kwargs)
+
+    def _query_list(self, name: str) -> list[str] | None:
+        value = self.request.query_params.get(name)
+        if value is None:
+            return None
+        return [field.strip() for field in value.split(",") if field.strip()]
+
+    def _selected_fields(self) -> set[str] | None:
+        """Fields requested with ?fields= / ?expand=, or None for the full representation"""
+        return TaskSerializer.select_fields(
+            TaskSerializer().fields.keys(), self._query_list("fields"), self._query_list("expand")
+        )
     
     def perform_create(self, serializer) -> None:
         serializer.save(user=self.request.user)
 
     @action(detail=True, methods=['post'])
     def mark_done(self, request, pk=None) -> Response:
+        """
+        Complete a task and award its points once. Repeating the call is a no-op; with an
+        Idempotency-Key header a retry replays the first response without touching the database.
+        """
+        from django.core.cache import cache
+        from django.shortcuts import get_object_or_404
         from django.utils import timezone
-        
+
+        key: str | None = request.headers.get('Idempotency-Key')
+        cache_key: str = f"mark_done:{request.user.pk}:{pk}:{key}"
+        if key:
+            replay = cache.get(cache_key)
+            if replay is not None:
+                return Response(replay, status=status.HTTP_200_OK)
+
+        # Finished tasks are looked up too, so a retry after success is answered rather than a 404
+        task = get_object_or_404(Task, pk=pk, user=request.user)
+        now = timezone.now()
+        completed = completion.complete(request.user, task, now)
+        if completed is not None:
+            awarded, balances = completed
+        else:
+            awarded, balances = 0, {"current_points": authentication.profile_for(request).current_points}
+
+        payload: dict = {
+            "message": "Task marked as done" if completed is not None else "Task already finished",
+            "task_points": task.points,
+            "points_awarded": awarded,
+            "is_overdue": bool(task.end_date and task.end_date < now),
+            "user_total_points": balances["current_points"],
+        }
+        if key:
+            cache.set(cache_key, payload, MARK_DONE_IDEMPOTENCY_TTL)
+        return Response(payload, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_operations(self, request) -> Response:
+        """
+        Apply many task operations in one transaction.
+        Expected payload:
+        {
+            "operations": [
+                {"op": "create", "data": {"title": "...", "end_date": "...", "priority": 3}},
+                {"op": "update", "id": 12, "data": {"priority": 5}},
+                {"op": "complete", "id": 13},
+                {"op": "delete", "id": 14}
+            ]
+        }
+        Returns one result per operation, in request order, plus the points awarded in total.
+        """
+        try:
+            payload = bulk.apply(request.user, request.data.get('operations'))
+        except bulk.InvalidBatch as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(payload, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'])
+    def due_reminders(self, request) -> Response:
+        """
+        Get unfinished tasks whose reminder is due, for the reminder poller.
+        Query param: until (ISO datetime, defaults to the end of today). Honours If-None-Match.
+        """
+        from datetime import datetime, time
+        from django.db.models import Q, Subquery
+        from django.utils import timezone
+        from django.utils.dateparse import parse_datetime
+
+        until = parse_datetime(request.query_params['until']) if 'until' in request.query_params else None
+        if until is None:
+            until = timezone.make_aware(datetime.combine(timezone.localdate(), time.max))
+        elif timezone.is_naive(until):
+            until = timezone.make_aware(until)
+
+        now = timezone.now()
+        reminders = Task.objects.filter(
+            Q(end_date__isnull=True) | Q(end_date__gte=now),
+            user=request.user,
+            reminder_date__isnull=False,
+            reminder_date__lte=until,
+        ).exclude(status__in=["done", "abandoned"])
+
+        # The set changes with the user's tasks, the window, and once its earliest end date passes
+        next_end = reminders.filter(end_date__isnull=False).order_by('end_date').values('end_date')[:1]
+        version, next_end = UserProfile.objects.filter(user=request.user).annotate(
+            next_end=Subquery(next_end)
+        ).values_list('task_version', 'next_end').first() or (0, None)
+        etag: str = f'"{version}-{until.isoformat()}-{next_end.isoformat() if next_end else ""}"'
+        if request.headers.get('If-None-Match') == etag:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        reminders = reminders.order_by('reminder_date').values(
+            'id', 'title', 'status', 'end_date', 'reminder_date', 'location'
+        )
+        return Response(list(reminders), status=status.HTTP_200_OK, headers={'ETag': etag})
+
+    @action(detail=False, methods=['get'])
+    def sync(self, request) -> Response:
+        """
+        Get tasks of any status created or changed since a sync token, and the ids of deleted tasks.
+        Query param: since (the sync_token of the previous response; omit it for a full snapshot).
+        """
+        try:
+            payload = sync.changes(request.user, request.query_params.get('since'))
+        except sync.InvalidToken:
+            return Response({"error": "Invalid sync token"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(payload, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'])
+    def calendar(self, request) -> Response:
+        """
+        Get calendar items overlapping a date window, with cyclic occurrences and subtasks expanded.
+        Query params: from, to (ISO dates or datetimes), optional status ("active" or "done").
+        """
+        window_start = self._parse_window_bound(request.query_params.get('from'), end_of_day=False)
+        window_end = self._parse_window_bound(request.query_params.get('to'), end_of_day=True)
+        if window_start is None or window_end is None or window_start > window_end:
+            return Response({"error": "from and to must be valid dates with from <= to"}, status=status.HTTP_400_BAD_REQUEST)
+        if (window_end - window_start).days > CALENDAR_MAX_DAYS:
+            return Response({"error": f"The window is limited to {CALENDAR_MAX_DAYS} days"}, status=status.HTTP_400_BAD_REQUEST)
+
+        status_group = request.query_params.get('status')
+        if status_group is not None and status_group not in calendar_feed.STATUS_GROUPS:
+            return Response({"error": "status must be 'active' or 'done'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "from": window_start,
+            "to": window_end,
+            "items": calendar_feed.build(request.user, window_start, window_end, status_group),
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export_tasks(self, request) -> HttpResponse:
+        """
+        Stream the user's tasks with their sessions, subtasks and cycle as a file download.
+        Query params: as ("csv" or "ndjson", default csv), optional from / to (ISO dates, on end date)
+        and status ("active" or "done"). `format` is left alone because DRF reserves it.
+        """
+        from django.utils import timezone
+
+        export_format: str = request.query_params.get('as', 'csv')
+        if export_format not in export.FORMATS:
+            return Response({"error": "as must be 'csv' or 'ndjson'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        bounds = {}
+        for name, end_of_day in (('from', False), ('to', True)):
+            value = request.query_params.get(name)
+            bounds[name] = self._parse_window_bound(value, end_of_day=end_of_day)
+            if value and bounds[name] is None:
+                return Response({"error": f"{name} must be a valid date"}, status=status.HTTP_400_BAD_REQUEST)
+
+        status_group = request.query_params.get('status')
+        if status_group is not None and status_group not in calendar_feed.STATUS_GROUPS:
+            return Response({"error": "status must be 'active' or 'done'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # The body is streamed after the view returns, so the alias is chosen here rather than by the router
+        tasks = export.queryset(request.user, bounds['from'], bounds['to'], status_group).using(replica.read_alias(request.user))
+        response = StreamingHttpResponse(export.lines(tasks, export_format), content_type=export.FORMATS[export_format])
+        filename: str = f"tasks-{timezone.localdate():%Y%m%d}.{export_format}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_tasks(self, request) -> Response:
+        """
+        Create tasks from an uploaded CSV (the export's columns) or iCalendar file, RRULEs becoming cyclic tasks.
+        Multipart field: file. Optional query param: as ("csv" or "ics", otherwise taken from the file name).
+        """
+        import io
+
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"error": "Upload the file in a 'file' field"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            import_format = importer.format_for(upload.name, request.query_params.get('as'))
+        except importer.InvalidImport as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Large uploads are spooled to disk by Django; reading them line by line keeps memory flat
+        lines = io.TextIOWrapper(upload.file, encoding='utf-8-sig', errors='replace', newline='')
+        summary = importer.run(request.user, importer.rows_for(lines, import_format))
+        return Response(summary, status=status.HTTP_201_CREATED if summary["created"] else status.HTTP_200_OK)
+
+    @action(detail=True, methods=['get'])
+    def occurrences(self, request, pk=None) -> Response:
+        """
+        Get the repetitions of a cyclic task inside a window.
+        Query params: from, to (ISO dates or datetimes).
+        """
         task = self.get_object()
-        is_abandoned: bool = task.status == "abandoned"    
-        task.calculate_points()
-        is_overdue: bool = task.end_date and task.end_date < timezone.now()
-    
-        points_to_add: int = 0
-        if not is_abandoned:
-            points_to_add = task.points
-            if is_overdue:
-                points_to_add = task.points // 2
-            task.status = "done"
-        task.save()
-
-        profile, created = UserProfile.objects.get_or_create(user=task.user)
-        profile.current_points += points_to_add
-        profile.total_points_earned += points_to_add
-        profile.save()
+        if not hasattr(task, 'cycle'):
+            return Response({"error": "Task is not cyclic"}, status=status.HTTP_400_BAD_REQUEST)
 
+        window_start = self._parse_window_bound(request.query_params.get('from'), end_of_day=False)
+        window_end = self._parse_window_bound(request.query_params.get('to'), end_of_day=True)
+        if window_start is None or window_end is None or window_start > window_end:
+            return Response({"error": "from and to must be valid dates with from <= to"}, status=status.HTTP_400_BAD_REQUEST)
+        if (window_end - window_start).days > CALENDAR_MAX_DAYS:
+            return Response({"error": f"The window is limited to {CALENDAR_MAX_DAYS} days"}, status=status.HTTP_400_BAD_REQUEST)
+
+        rule = recurrence.rule_for(task.cycle)
         return Response({
-            "message": "Task marked as done",
-            "task_points": task.points,
-            "points_awarded": points_to_add,
-            "is_overdue": is_overdue,
-            "user_total_points": profile.current_points,
-        }, status=200)
+            "task_id": task.id,
+            "rule": rule._asdict(),
+            "series_end": task.cycle.series_end,
+            "occurrences": [
+                {"index": index, "date": occurrence}
+                for index, occurrence in recurrence.occurrences(task.cycle, window_start, window_end)
+            ],
+        }, status=status.HTTP_200_OK)
+
+    def _parse_window_bound(self, value, end_of_day: bool):
+        from datetime import datetime, time
+        from django.utils import timezone
+        from django.utils.dateparse import parse_date, parse_datetime
+
+        if not value:
+            return None
+        try:
+            parsed = parse_datetime(value)
+            if parsed is None:
+                day = parse_date(value)
+                if day is None:
+                    return None
+                parsed = datetime.combine(day, time.max if end_of_day else time.min)
+        except ValueError:
+            return None
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
 
     @action(detail=False, methods=['post'])
     def create_cyclic(self, request):
@@ -121,37 +357,14 @@ class TaskViewSet(viewsets.ModelViewSet):
             ]
         }
         """        
-        task_data = request.data.copy()
-        subtasks_data = task_data.pop('subtasks', [])
-        
-        if subtasks_data:
-            dates = [sub.get('start_date') for sub in subtasks_data if sub.get('start_date')]
-            end_dates = [sub.get('end_date') for sub in subtasks_data if sub.get('end_date')]
-            if dates:
-                task_data['start_date'] = min(dates)
-            if end_dates:
-                task_data['end_date'] = max(end_dates)
-        
-        serializer = self.get_serializer(data=task_data)
+        serializer = SplitTaskSerializer(data=request.data, context=self.get_serializer_context())
         serializer.is_valid(raise_exception=True)
         parent_task = serializer.save(user=request.user)
-        
-        created_subtasks: list = []
-        for subtask_data in subtasks_data:
-            subtask = SubTask.objects.create(
-                parent_task=parent_task,
-                title=subtask_data.get('title', 'Untitled'),
-                start_date=subtask_data.get('start_date'),
-                end_date=subtask_data.get('end_date'),
-                priority=subtask_data.get('priority', 1),
-                status='pending'
-            )
-            created_subtasks.append(SubTaskSerializer(subtask).data)
-        
+
         return Response({
             "message": "Split task created",
             "parent_task": TaskSerializer(parent_task).data,
-            "subtasks": created_subtasks
+            "subtasks": SubTaskSerializer(parent_task.subtasks.all(), many=True).data
         }, status=status.HTTP_201_CREATED)
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -171,14 +384,16 @@ class RegisterViewSet(generics.CreateAPIView):
         self.perform_create(serializer)
         return Response({"message": "User registered successfully!"}, status=status.HTTP_201_CREATED)
 
-class ProfileViewSet(viewsets.ViewSet):
+class ProfileViewSet(replica.ReplicaReadsMixin, viewsets.ViewSet):
     permission_classes = [permissions.IsAuthenticated]
+    replica_actions = ('rankings', 'my_rank', 'user_stats', 'user_achievements', 'points_history')
     
     @action(detail=False, methods=['get'])
     def me(self, request) -> Response:
-        profile, created = UserProfile.objects.get_or_create(user=request.user)
-        serializer = UserProfileSerializer(profile)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        def build():
+            return UserProfileSerializer(authentication.profile_for(request)).data
+
+        return self._cached_response(*response_cache.cached('me', build, user=request.user))
     
     @action(detail=False, methods=['patch'])
     def update_points(self, request) -> Response:
@@ -186,291 +401,254 @@ class ProfileViewSet(viewsets.ViewSet):
         if points_to_deduct < 0:
             return Response({"error": "Points to deduct must be positive"}, status=status.HTTP_400_BAD_REQUEST)
         
-        profile, created = UserProfile.objects.get_or_create(user=request.user)
-        available_points: int = profile.current_points - profile.points_spent
-        if available_points < points_to_deduct:
+        try:
+            profile = points.spend(request.user, points_to_deduct)
+        except points.InsufficientPoints:
             return Response({"error": "Not enough points"}, status=status.HTTP_400_BAD_REQUEST)
-        
-        profile.points_spent += points_to_deduct
-        profile.save()
+        events.publish(request.user.id, {
+            "type": "points.changed",
+            "points_awarded": 0,
+            "current_points": profile.current_points,
+            "total_points_earned": profile.total_points_earned,
+            "points_spent": profile.points_spent,
+        })
         serializer = UserProfileSerializer(profile)
         return Response(serializer.data, status=status.HTTP_200_OK)
     
     @action(detail=False, methods=['get'])
     def rankings(self, request) -> Response:
-        """Get global leaderboard with user rankings"""
-        from django.utils import timezone
-        from datetime import timedelta
-        
-        profiles = UserProfile.objects.select_related('user').all().order_by('-total_points_earned')
-        
-        now = timezone.now()
-        current_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        three_months_ago = (current_month - timedelta(days=90)).replace(day=1)
-        
-        rankings = []
-        for rank, profile in enumerate(profiles, start=1):
-            this_month_tasks = Task.objects.filter(
-                user=profile.user,
-                status='done',
-                end_date__gte=current_month
-            )
-            current_month_points = sum(task.points for task in this_month_tasks)
-            
-            last_3_months_tasks = Task.objects.filter(
-                user=profile.user,
-                status='done',
-                end_date__gte=three_months_ago
-            )
-            last_3_months_points = sum(task.points for task in last_3_months_tasks)
-            
-            rankings.append({
-                'id': profile.user.id,
-                'rank': rank,
-                'name': profile.user.username,
-                'points': profile.total_points_earned,
-                'current_month': current_month_points,
-                'last3_months': last_3_months_points,
-                'avatar': self._get_avatar(profile.user.id)
-            })
-        
-        return Response(rankings, status=status.HTTP_200_OK)
+        """Get global leaderboard with user rankings, optionally paginated with ?offset=&limit="""
+        try:
+            offset: int = max(int(request.query_params.get('offset', 0)), 0)
+            limit = request.query_params.get('limit')
+            limit = max(int(limit), 0) if limit is not None else None
+        except ValueError:
+            return Response({"error": "offset and limit must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+
+        current_month, _ = leaderboard.window_starts()
+
+        def build():
+            rankings = []
+            for rank, entry in enumerate(leaderboard.ranked_entries(offset, limit), start=offset + 1):
+                rankings.append({
+                    'id': entry.user.id,
+                    'rank': rank,
+                    'name': entry.user.username,
+                    'points': entry.points,
+                    'current_month': entry.current_month,
+                    'last3_months': entry.last3_months,
+                    'avatar': self._get_avatar(entry.user.id)
+                })
+            return rankings
+
+        return self._cached_response(*response_cache.cached(
+            'rankings', build, rankings=True, params=(current_month.date(), offset, limit)
+        ))
+    
+    @action(detail=False, methods=['get'])
+    def my_rank(self, request) -> Response:
+        """Get the current user's leaderboard position and the users around it (?neighbors=, default 2, max 10)"""
+        try:
+            count: int = min(max(int(request.query_params.get('neighbors', 2)), 0), MAX_RANK_NEIGHBORS)
+        except ValueError:
+            return Response({"error": "neighbors must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        entry = leaderboard.entry_for(request.user)
+        rank: int = leaderboard.rank_of(entry)
+        above, below = leaderboard.neighbors(entry, count) if count else ([], [])
+        return Response({
+            'id': request.user.id,
+            'rank': rank,
+            'name': request.user.username,
+            'points': entry.points,
+            'current_month': entry.current_month,
+            'last3_months': entry.last3_months,
+            'avatar': self._get_avatar(request.user.id),
+            'above': [self._neighbor(other, rank - len(above) + offset) for offset, other in enumerate(above)],
+            'below': [self._neighbor(other, rank + 1 + offset) for offset, other in enumerate(below)],
+        }, status=status.HTTP_200_OK)
+
+    def _neighbor(self, entry, rank: int) -> dict:
+        return {
+            'id': entry.user_id,
+            'rank': rank,
+            'name': entry.user.username,
+            'points': entry.points,
+            'avatar': self._get_avatar(entry.user_id),
+        }
     
     @action(detail=False, methods=['get'])
     def achievements(self, request) -> Response:
         """Get all available achievements"""
-        all_achievements = [
-            {'id': 1, 'title': 'Rising Star', 'description': 'Reach 500 points', 'icon': '⭐', 'points': 50},
-            {'id': 2, 'title': 'Champion', 'description': 'Reach 2000 points', 'icon': '🏆', 'points': 200},
-            {'id': 3, 'title': 'Speed Demon', 'description': 'Gain 100 points in one day', 'icon': '⚡', 'points': 100},
-            {'id': 4, 'title': 'Consistency King', 'description': 'Maintain 7-day streak', 'icon': '🔥', 'points': 150},
-            {'id': 5, 'title': 'Elite Member', 'description': 'Rank in top 10', 'icon': '💎', 'points': 300},
-            {'id': 6, 'title': 'Legendary', 'description': 'Reach 3000 points', 'icon': '👑', 'points': 500},
-            {'id': 7, 'title': 'Task Master', 'description': 'Complete 100 tasks', 'icon': '✅', 'points': 250},
-            {'id': 8, 'title': 'Early Bird', 'description': 'Complete 10 tasks before 9 AM', 'icon': '🌅', 'points': 75},
-            {'id': 9, 'title': 'Night Owl', 'description': 'Complete 10 tasks after 10 PM', 'icon': '🦉', 'points': 75},
-            {'id': 10, 'title': 'Weekend Warrior', 'description': 'Complete 20 tasks on weekends', 'icon': '🏋️', 'points': 120},
-        ]
-        return Response(all_achievements, status=status.HTTP_200_OK)
+        response = Response(achievements.CATALOG, status=status.HTTP_200_OK)
+        # The catalog only changes with a deploy
+        response['Cache-Control'] = f'private, max-age={ACHIEVEMENTS_CATALOG_MAX_AGE}'
+        return response
     
     @action(detail=False, methods=['get'])
     def user_achievements(self, request) -> Response:
         """Get achievements for the current user"""
-        from django.utils import timezone
-        from datetime import timedelta
-        from collections import defaultdict
-        
-        user = request.user
-        profile, _ = UserProfile.objects.get_or_create(user=user)
-        
-        all_tasks = Task.objects.filter(user=user, status='done')
-        total_tasks = all_tasks.count()
-        total_points = profile.total_points_earned
-        
-        earned_achievements = []
-        
-        # Rising Star - 500 points
-        if total_points >= 500:
-            earned_achievements.append({'id': 1, 'title': 'Rising Star', 'description': 'Reach 500 points', 'icon': '⭐', 'points': 50})
-        
-        # Champion - 2000 points
-        if total_points >= 2000:
-            earned_achievements.append({'id': 2, 'title': 'Champion', 'description': 'Reach 2000 points', 'icon': '🏆', 'points': 200})
-        
-        # Legendary - 3000 points
-        if total_points >= 3000:
-            earned_achievements.append({'id': 6, 'title': 'Legendary', 'description': 'Reach 3000 points', 'icon': '👑', 'points': 500})
-        
-        # Task Master - 100 tasks
-        if total_tasks >= 100:
-            earned_achievements.append({'id': 7, 'title': 'Task Master', 'description': 'Complete 100 tasks', 'icon': '✅', 'points': 250})
-        
-        # Speed Demon - 100 points in one day
-        now = timezone.now()
-        for task in all_tasks:
-            if task.points >= 100:
-                day_tasks = Task.objects.filter(
-                    user=user,
-                    status='done',
-                    end_date__date=task.end_date.date()
-                )
-                day_points = sum(t.points for t in day_tasks)
-                if day_points >= 100:
-                    earned_achievements.append({'id': 3, 'title': 'Speed Demon', 'description': 'Gain 100 points in one day', 'icon': '⚡', 'points': 100})
-                    break
-        
-        # Consistency King - 7-day streak
-        task_dates = sorted(set(task.end_date.date() for task in all_tasks if task.end_date))
-        if len(task_dates) >= 7:
-            current_streak = 0
-            max_streak = 0
-            prev_date = None
-            for date in task_dates:
-                if prev_date and (date - prev_date).days == 1:
-                    current_streak += 1
-                    max_streak = max(max_streak, current_streak)
-                else:
-                    current_streak = 1
-                prev_date = date
-            if max_streak >= 7:
-                earned_achievements.append({'id': 4, 'title': 'Consistency King', 'description': 'Maintain 7-day streak', 'icon': '🔥', 'points': 150})
-        
-        # Elite Member - Top 10 ranking
-        user_rank = UserProfile.objects.filter(total_points_earned__gt=profile.total_points_earned).count() + 1
-        if user_rank <= 10:
-            earned_achievements.append({'id': 5, 'title': 'Elite Member', 'description': 'Rank in top 10', 'icon': '💎', 'points': 300})
-        
-        # Early Bird - 10 tasks before 9 AM
-        early_tasks = [task for task in all_tasks if task.end_date and task.end_date.hour < 9]
-        if len(early_tasks) >= 10:
-            earned_achievements.append({'id': 8, 'title': 'Early Bird', 'description': 'Complete 10 tasks before 9 AM', 'icon': '🌅', 'points': 75})
-        
-        # Night Owl - 10 tasks after 10 PM
-        night_tasks = [task for task in all_tasks if task.end_date and task.end_date.hour >= 22]
-        if len(night_tasks) >= 10:
-            earned_achievements.append({'id': 9, 'title': 'Night Owl', 'description': 'Complete 10 tasks after 10 PM', 'icon': '🦉', 'points': 75})
-        
-        # Weekend Warrior - 20 tasks on weekends
-        weekend_tasks = [task for task in all_tasks if task.end_date and task.end_date.weekday() >= 5]
-        if len(weekend_tasks) >= 20:
-            earned_achievements.append({'id': 10, 'title': 'Weekend Warrior', 'description': 'Complete 20 tasks on weekends', 'icon': '🏋️', 'points': 120})
-        
-        seen = set()
-        unique_achievements = []
-        for ach in earned_achievements:
-            if ach['id'] not in seen:
-                seen.add(ach['id'])
-                unique_achievements.append(ach)
-        
-        return Response(unique_achievements, status=status.HTTP_200_OK)
+        # Elite Member follows the rank, so the entry also follows the rankings version
+        return self._cached_response(*response_cache.cached(
+            'user_achievements', lambda: achievements.unlocked_for(request.user), user=request.user, rankings=True
+        ))
     
     @action(detail=True, methods=['get'])
     def user_stats(self, request, pk=None) -> Response:
         """Get statistics for a specific user by user ID"""
-        from django.utils import timezone
-        from datetime import timedelta
-        
         try:
             user = User.objects.get(id=pk)
         except User.DoesNotExist:
             return Response({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
         
-        profile, _ = UserProfile.objects.get_or_create(user=user)
-        
-        now = timezone.now()
-        current_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        three_months_ago = (current_month - timedelta(days=90)).replace(day=1)
-        
-        this_month_tasks = Task.objects.filter(
-            user=user,
-            status='done',
-            end_date__gte=current_month
-        )
-        current_month_points = sum(task.points for task in this_month_tasks)
+        current_month, three_months_ago = leaderboard.window_starts()
+
+        def build():
+            profile, _ = UserProfile.objects.get_or_create(user=user)
+            windows = daily_points.window_sums(user, {
+                'current_month': current_month.date(),
+                'last3_months': three_months_ago.date(),
+            })
+
+            return {
+                'user_id': user.id,
+                'username': user.username,
+                'total_points': profile.total_points_earned,
+                'rank': leaderboard.rank_of(leaderboard.entry_for(user)),
+                'current_month': windows['current_month'],
+                'last3_months': windows['last3_months'],
+                'achievements': achievements.unlocked_for(user)
+            }
+
+        # The rank moves with other users' points, so the entry also follows the rankings version
+        return self._cached_response(*response_cache.cached(
+            'user_stats', build, user=user, rankings=True, params=(current_month.date(),)
+        ))
+    
+    @action(detail=False, methods=['get'])
+    def points_history(self, request) -> Response:
+        """
+        Get the current user's points windows and time series for the reports page.
+        Query params: days (default 42), granularity ("day" or "week"), or explicit from/to dates.
+        """
+        from django.utils import timezone
+        from django.utils.dateparse import parse_date
+        from datetime import date, timedelta
         
-        last_3_months_tasks = Task.objects.filter(
-            user=user,
-            status='done',
-            end_date__gte=three_months_ago
-        )
-        last_3_months_points = sum(task.points for task in last_3_months_tasks)
+        granularity: str = request.query_params.get('granularity', 'day')
+        if granularity not in ('day', 'week'):
+            return Response({"error": "granularity must be 'day' or 'week'"}, status=status.HTTP_400_BAD_REQUEST)
         
-        all_tasks = Task.objects.filter(user=user, status='done')
-        earned_achievements = self._calculate_user_achievements(user, profile, all_tasks)
+        try:
+            end = parse_date(request.query_params['to']) if 'to' in request.query_params else timezone.localdate()
+            if 'from' in request.query_params:
+                start = parse_date(request.query_params['from'])
+            else:
+                start = end - timedelta(days=max(int(request.query_params.get('days', 42)), 1) - 1)
+        except ValueError:
+            start = end = None
+        if start is None or end is None or start > end:
+            return Response({"error": "Invalid date range"}, status=status.HTTP_400_BAD_REQUEST)
+        if (end - start).days > 366 * 2:
+            return Response({"error": "Date range is limited to two years"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        current_month, three_months_ago = leaderboard.window_starts()
+        windows = daily_points.window_sums(request.user, {
+            'current_month': current_month.date(),
+            'last3_months': three_months_ago.date(),
+            'all_time': date.min,
+        })
+        profile = authentication.profile_for(request)
         
         return Response({
-            'user_id': user.id,
-            'username': user.username,
             'total_points': profile.total_points_earned,
-            'current_month': current_month_points,
-            'last3_months': last_3_months_points,
-            'achievements': earned_achievements
+            'total_tasks': windows['all_time_tasks'],
+            'current_month': windows['current_month'],
+            'current_month_tasks': windows['current_month_tasks'],
+            'last3_months': windows['last3_months'],
+            'last3_months_tasks': windows['last3_months_tasks'],
+            'granularity': granularity,
+            'series': daily_points.series(request.user, start, end, granularity),
         }, status=status.HTTP_200_OK)
     
-    def _calculate_user_achievements(self, user, profile, all_tasks):
-        """Helper method to calculate user achievements"""
-        from django.utils import timezone
-        from collections import defaultdict
-        
-        earned_achievements = []
-        total_tasks = all_tasks.count()
-        total_points = profile.total_points_earned
-        
-        # Rising Star - 500 points
-        if total_points >= 500:
-            earned_achievements.append({'id': 1, 'title': 'Rising Star', 'description': 'Reach 500 points', 'icon': '⭐', 'points': 50})
-        
-        # Champion - 2000 points
-        if total_points >= 2000:
-            earned_achievements.append({'id': 2, 'title': 'Champion', 'description': 'Reach 2000 points', 'icon': '🏆', 'points': 200})
-        
-        # Legendary - 3000 points
-        if total_points >= 3000:
-            earned_achievements.append({'id': 6, 'title': 'Legendary', 'description': 'Reach 3000 points', 'icon': '👑', 'points': 500})
-        
-        # Task Master - 100 tasks
-        if total_tasks >= 100:
-            earned_achievements.append({'id': 7, 'title': 'Task Master', 'description': 'Complete 100 tasks', 'icon': '✅', 'points': 250})
-        
-        # Speed Demon - 100 points in one day
-        for task in all_tasks:
-            if task.points >= 100:
-                day_tasks = Task.objects.filter(
-                    user=user,
-                    status='done',
-                    end_date__date=task.end_date.date()
-                )
-                day_points = sum(t.points for t in day_tasks)
-                if day_points >= 100:
-                    earned_achievements.append({'id': 3, 'title': 'Speed Demon', 'description': 'Gain 100 points in one day', 'icon': '⚡', 'points': 100})
-                    break
-        
-        # Consistency King - 7-day streak
-        task_dates = sorted(set(task.end_date.date() for task in all_tasks if task.end_date))
-        if len(task_dates) >= 7:
-            current_streak = 0
-            max_streak = 0
-            prev_date = None
-            for date in task_dates:
-                if prev_date and (date - prev_date).days == 1:
-                    current_streak += 1
-                    max_streak = max(max_streak, current_streak)
-                else:
-                    current_streak = 1
-                prev_date = date
-            if max_streak >= 7:
-                earned_achievements.append({'id': 4, 'title': 'Consistency King', 'description': 'Maintain 7-day streak', 'icon': '🔥', 'points': 150})
-        
-        # Elite Member - Top 10 ranking
-        user_rank = UserProfile.objects.filter(total_points_earned__gt=profile.total_points_earned).count() + 1
-        if user_rank <= 10:
-            earned_achievements.append({'id': 5, 'title': 'Elite Member', 'description': 'Rank in top 10', 'icon': '💎', 'points': 300})
-        
-        # Early Bird - 10 tasks before 9 AM
-        early_tasks = [task for task in all_tasks if task.end_date and task.end_date.hour < 9]
-        if len(early_tasks) >= 10:
-            earned_achievements.append({'id': 8, 'title': 'Early Bird', 'description': 'Complete 10 tasks before 9 AM', 'icon': '🌅', 'points': 75})
-        
-        # Night Owl - 10 tasks after 10 PM
-        night_tasks = [task for task in all_tasks if task.end_date and task.end_date.hour >= 22]
-        if len(night_tasks) >= 10:
-            earned_achievements.append({'id': 9, 'title': 'Night Owl', 'description': 'Complete 10 tasks after 10 PM', 'icon': '🦉', 'points': 75})
-        
-        # Weekend Warrior - 20 tasks on weekends
-        weekend_tasks = [task for task in all_tasks if task.end_date and task.end_date.weekday() >= 5]
-        if len(weekend_tasks) >= 20:
-            earned_achievements.append({'id': 10, 'title': 'Weekend Warrior', 'description': 'Complete 20 tasks on weekends', 'icon': '🏋️', 'points': 120})
-        
-        seen = set()
-        unique_achievements = []
-        for ach in earned_achievements:
-            if ach['id'] not in seen:
-                seen.add(ach['id'])
-                unique_achievements.append(ach)
-        
-        return unique_achievements
-    
+    def _cached_response(self, data, hit: bool) -> Response:
+        response = Response(data, status=status.HTTP_200_OK)
+        response['X-Cache'] = 'HIT' if hit else 'MISS'
+        return response
+
     def _get_avatar(self, user_id: int) -> str:
         """Generate a simple avatar based on user ID"""
         avatars = ['👨‍💻', '👩‍💼', '👨‍🎨', '👩‍🚀', '👨‍🏫', '👩‍⚕️', '👨‍🍳', '👩‍🎭', '👨‍🔬', '👩‍🎤']
-        return avatars[user_id % len(avatars)]
\ No newline at end of file
+        return avatars[user_id % len(avatars)]
+
+
+async def task_event_stream(request) -> HttpResponse:
+    """
+    Server-sent events with the user's task changes, points changes and reminders as they fall due.
+    Needs an ASGI server. EventSource cannot set headers, so the access token may come as ?token=.
+    """
+    import json
+    from django.utils import timezone
+    from rest_framework_simplejwt.exceptions import TokenError
+    from rest_framework_simplejwt.settings import api_settings as jwt_settings
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    raw_token = request.GET.get('token')
+    auth_header: str = request.headers.get('Authorization', '')
+    if not raw_token and auth_header.startswith('Bearer '):
+        raw_token = auth_header[len('Bearer '):]
+    try:
+        user_id = int(AccessToken(raw_token)[jwt_settings.USER_ID_CLAIM])
+    except (TokenError, KeyError, TypeError, ValueError):
+        return JsonResponse({"detail": "Authentication credentials were not provided or are invalid."}, status=401)
+
+    async def next_reminder(after):
+        return await Task.objects.filter(
+            user_id=user_id, reminder_date__isnull=False, reminder_date__gt=after
+        ).exclude(status__in=["done", "abandoned"]).order_by('reminder_date').values(
+            'id', 'title', 'end_date', 'reminder_date', 'location'
+        ).afirst()
+
+    def encode(event: dict) -> str:
+        return f"event: {event['type']}\ndata: {json.dumps(event, cls=DjangoJSONEncoder)}\n\n"
+
+    async def stream():
+        subscription = events.get_broker().subscribe(user_id)
+        try:
+            yield f"retry: {EVENT_STREAM_RETRY_MS}\n\n"
+            upcoming = await next_reminder(timezone.now())
+            while True:
+                timeout: float = EVENT_STREAM_HEARTBEAT
+                if upcoming is not None:
+                    timeout = min(timeout, max((upcoming['reminder_date'] - timezone.now()).total_seconds(), 0))
+                event = await subscription.get(timeout)
+                if event is not None:
+                    yield encode(event)
+                    if event['type'] != 'points.changed':  # Task deltas, bulk changes and resyncs
+                        upcoming = await next_reminder(timezone.now())
+                elif upcoming is not None and upcoming['reminder_date'] <= timezone.now():
+                    yield encode({"type": "reminder.due", "task": upcoming})
+                    upcoming = await next_reminder(upcoming['reminder_date'])
+                else:
+                    yield ": keep-alive\n\n"
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def metrics_view(request) -> HttpResponse:
+    """Request histograms in the Prometheus text format, served only with METRICS_TOKEN as a bearer token"""
+    from django.conf import settings
+    from django.utils.crypto import constant_time_compare
+    from . import metrics
+
+    expected: str | None = settings.METRICS_TOKEN
+    if not settings.REQUEST_METRICS_ENABLED or not expected:
+        return HttpResponse(status=404)  # Not published until a scrape token is configured
+    if not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {expected}'):
+        return HttpResponse(status=401)
+    return HttpResponse(metrics.registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
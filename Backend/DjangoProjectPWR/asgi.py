@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
+from django.core.exceptions import ImproperlyConfigured
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'DjangoProjectPWR.settings')
 
 application = get_asgi_application()
+
+# This is the events process; events are published by the WSGI web process and only reach it through Redis
+if not settings.EVENTS_REDIS_URL:
+    raise ImproperlyConfigured("The events process needs EVENTS_REDIS_URL")
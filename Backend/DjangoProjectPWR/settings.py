@@ -10,9 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from datetime import timedelta
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -47,6 +50,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "DjangoAPP.middleware.RequestMetricsMiddleware",
+    "DjangoAPP.middleware.NPlusOneMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -57,6 +62,8 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 CORS_ALLOW_ALL_ORIGINS = True
+CORS_ALLOW_HEADERS = (*default_headers, "if-none-match", "idempotency-key")
+CORS_EXPOSE_HEADERS = ["ETag", "Server-Timing"]
 ROOT_URLCONF = 'DjangoProjectPWR.urls'
 
 TEMPLATES = [
@@ -77,6 +84,50 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'DjangoProjectPWR.wsgi.application'
 
+# /api/events/ streams server-sent events and is served by the ASGI `events` process in the
+# Procfile; route that path to it and everything else to the WSGI `web` process. Events are
+# published by the web process, so they only reach the streams through EVENTS_REDIS_URL, without
+# which the events process refuses to start.
+EVENTS_REDIS_URL = os.environ.get('EVENTS_REDIS_URL')
+
+# Per-view SQL, serializer, size and latency histograms served on /metrics (per worker process).
+# Server-Timing headers expose the same numbers to browsers. /metrics answers 404 until
+# METRICS_TOKEN is set, then requires it as a bearer token.
+REQUEST_METRICS_ENABLED = os.environ.get('REQUEST_METRICS_ENABLED', '1') == '1'
+REQUEST_METRICS_SERVER_TIMING = os.environ.get('REQUEST_METRICS_SERVER_TIMING', '1') == '1'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Development aid: "log" or "raise" when one request repeats a SELECT more than NPLUSONE_THRESHOLD
+# times. Unset in production. DjangoAPP.testing.NPlusOneTestRunner turns it on for the test suite.
+NPLUSONE_MODE = os.environ.get('NPLUSONE_MODE')
+NPLUSONE_THRESHOLD = int(os.environ.get('NPLUSONE_THRESHOLD', 3))
+
+# Response, rank and idempotency caches. Per-process memory unless a Redis URL is set,
+# in which case every worker shares the entries, their versions and the hit/miss counters.
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+# A bump only reaches the versions of the worker that made it when the cache is per process, so
+# cached responses there live seconds rather than a day. Idempotency replays and replica pins are
+# also per worker without Redis; completions stay exactly-once through their conditional UPDATE.
+# Account revocations are per worker too, so without Redis every request reads the user row.
+RESPONSE_CACHE_TIMEOUT = 60 * 60 * 24 if CACHE_REDIS_URL else int(os.environ.get('RESPONSE_CACHE_LOCAL_TIMEOUT', 5))
+# Authenticate access tokens from their claims without reading the user row. Needs the shared
+# cache, which carries deactivated and deleted accounts' revocation markers to every worker.
+AUTH_CLAIMS_ONLY = bool(CACHE_REDIS_URL)
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -92,6 +143,21 @@ DATABASES = {
     }
 }
 
+# Streaming replica for the rankings, stats, achievements and export reads, only when REPLICA_DB_HOST
+# is set; everything uses the primary otherwise. Tests mirror it onto the default database.
+REPLICA_DB_HOST = os.environ.get('REPLICA_DB_HOST')
+if REPLICA_DB_HOST:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': REPLICA_DB_HOST,
+        'PORT': os.environ.get('REPLICA_DB_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['DjangoAPP.replica.ReplicaRouter']
+# Seconds of replication delay tolerated before reads return to the primary; also how long a
+# user's reads stay on the primary after their own write (across workers only with CACHE_REDIS_URL)
+REPLICA_MAX_LAG = float(os.environ.get('REPLICA_MAX_LAG', 5))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -136,7 +202,9 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-      'rest_framework_simplejwt.authentication.JWTAuthentication',
+      # Trusts the identity claims of tokens from ClaimsTokenObtainPairSerializer, so
+      # authenticating needs no user query; older tokens fall back to loading the user
+      'DjangoAPP.authentication.ClaimsJWTAuthentication',
   )
 }
 
@@ -145,5 +213,6 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
     "ROTATE_REFRESH_TOKENS": True,
     "BLACKLIST_AFTER_ROTATION": True,
-    "AUTH_HEADER_TYPES": ("Bearer",) 
+    "AUTH_HEADER_TYPES": ("Bearer",),
+    "TOKEN_OBTAIN_SERIALIZER": "DjangoAPP.authentication.ClaimsTokenObtainPairSerializer",
 }
\ No newline at end of file
@@ -1,13 +1,14 @@
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useRef } from "react";
 import PropTypes from "prop-types";
 import axios from "axios";
 import { api } from "../config/api";
 
-const TASKS_URL = api("/tasks/");
+const DUE_REMINDERS_URL = api("/tasks/due_reminders/");
 
 export default function ReminderNotification() {
     const [reminders, setReminders] = useState([]);
     const [showNotification, setShowNotification] = useState(false);
+    const etagRef = useRef(null);
 
     const authHeader = () => ({
         headers: {
@@ -22,21 +23,22 @@ export default function ReminderNotification() {
 
         const checkReminders = async () => {
             try {
-                const res = await axios.get(TASKS_URL, authHeader());
-                const now = new Date();
-                const activeReminders = res.data.filter((task) => {
-                    if (!task.reminder_date) return false;
-                    const reminderDate = new Date(task.reminder_date);
-                    // Check if reminder date is today or in the past
-                    const reminderDateOnly = new Date(reminderDate.getFullYear(), reminderDate.getMonth(), reminderDate.getDate());
-                    const todayOnly = new Date(now.getFullYear(), now.getMonth(), now.getDate());
-                    
-                    // Show reminder if it's today or past, and task is not done/abandoned
-                    return reminderDateOnly <= todayOnly && 
-                           task.status !== "done" && 
-                           task.status !== "abandoned" &&
-                           (!task.end_date || new Date(task.end_date) >= now);
+                // Reminders due today or earlier, in the browser's timezone
+                const endOfToday = new Date();
+                endOfToday.setHours(23, 59, 59, 999);
+                const { headers } = authHeader();
+                if (etagRef.current) {
+                    headers["If-None-Match"] = etagRef.current;
+                }
+                const res = await axios.get(DUE_REMINDERS_URL, {
+                    headers,
+                    params: { until: endOfToday.toISOString() },
+                    validateStatus: (status) => status === 200 || status === 304,
                 });
+                // 304: nothing changed since the last poll
+                if (res.status === 304) return;
+                etagRef.current = res.headers.etag || null;
+                const activeReminders = res.data;
 
                 if (activeReminders.length > 0) {
                     setReminders(activeReminders);
@@ -1,5 +1,9 @@
 import { useState, useEffect } from "react";
+import axios from "axios";
 import useTasks from "./useTasks";
+import { api } from "../config/api";
+
+const POINTS_HISTORY_ENDPOINT = "/profile/points_history/?granularity=week&days=42";
 
 export default function useReports() {
     const { events, doneEvents, fetchEvents } = useTasks();
@@ -10,29 +14,26 @@ export default function useReports() {
         calculateStats();
     }, [events, doneEvents]);
 
+    const authHeader = () => ({
+        headers: {
+            Authorization: `Bearer ${localStorage.getItem("access")}`,
+        },
+    });
+
     const calculateStats = async () => {
         setLoading(true);
         try {
             const allTasks = [...events, ...doneEvents];
+            const { data: history } = await axios.get(api(POINTS_HISTORY_ENDPOINT), authHeader());
             
             const now = new Date();
             const currentMonth = new Date(now.getFullYear(), now.getMonth(), 1);
-            const threeMonthsAgo = new Date(now.getFullYear(), now.getMonth() - 3, 1);
             
             const thisMonthTasks = allTasks.filter(task => {
                 const taskDate = new Date(task.end);
                 return taskDate >= currentMonth && task.status === "done";
             });
             
-            const last3MonthsTasks = allTasks.filter(task => {
-                const taskDate = new Date(task.end);
-                return taskDate >= threeMonthsAgo && task.status === "done";
-            });
-            
-            const thisMonthPoints = thisMonthTasks.reduce((sum, task) => sum + (task.points || 0), 0);
-            const last3MonthsPoints = last3MonthsTasks.reduce((sum, task) => sum + (task.points || 0), 0);
-            const totalPoints = allTasks.filter(t => t.status === "done").reduce((sum, task) => sum + (task.points || 0), 0);
-            
             const tasksByPriority = {};
             allTasks.forEach(task => {
                 const priority = task.priority || 0;
@@ -77,39 +78,25 @@ export default function useReports() {
                 });
             }
             
-            const pointsData = [];
-            for (let i = 5; i >= 0; i--) {
-                const weekStart = new Date();
-                weekStart.setDate(weekStart.getDate() - (i * 7));
-                const weekEnd = new Date(weekStart);
-                weekEnd.setDate(weekEnd.getDate() + 6);
-                
-                const weekTasks = allTasks.filter(task => {
-                    const taskDate = new Date(task.end);
-                    return taskDate >= weekStart && taskDate <= weekEnd && task.status === "done";
-                });
-                
-                const weekPoints = weekTasks.reduce((sum, task) => sum + (task.points || 0), 0);
-                pointsData.push({
-                    name: `Week ${6 - i}`,
-                    points: weekPoints
-                });
-            }
+            const pointsData = history.series.map((week, index) => ({
+                name: `Week ${index + 1}`,
+                points: week.points
+            }));
             
             // Achievements (mock for now - would come from API)
             const achievements = [
-                { name: "Gold", value: Math.floor(thisMonthTasks.length / 10), color: "#fbbf24" },
-                { name: "Silver", value: Math.floor(thisMonthTasks.length / 5), color: "#c7d2fe" },
-                { name: "Bronze", value: thisMonthTasks.length, color: "#d97706" },
+                { name: "Gold", value: Math.floor(history.current_month_tasks / 10), color: "#fbbf24" },
+                { name: "Silver", value: Math.floor(history.current_month_tasks / 5), color: "#c7d2fe" },
+                { name: "Bronze", value: history.current_month_tasks, color: "#d97706" },
             ];
             
             setStats({
-                totalTasksCompleted: allTasks.filter(t => t.status === "done").length,
-                thisMonthTasks: thisMonthTasks.length,
-                last3MonthsTasks: last3MonthsTasks.length,
-                totalPoints,
-                thisMonthPoints,
-                last3MonthsPoints,
+                totalTasksCompleted: history.total_tasks,
+                thisMonthTasks: history.current_month_tasks,
+                last3MonthsTasks: history.last3_months_tasks,
+                totalPoints: history.total_points,
+                thisMonthPoints: history.current_month,
+                last3MonthsPoints: history.last3_months,
                 tasksByPriority,
                 tasksByStatus,
                 avgDuration,
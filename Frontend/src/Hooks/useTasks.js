@@ -1,13 +1,17 @@
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 import axios from "axios";
 import { api } from "../config/api";
 
 const TASKS_ENDPOINT = "/tasks/";
 const TASKS_URL = api(TASKS_ENDPOINT);
+const SYNC_URL = api(`${TASKS_ENDPOINT}sync/`);
 
 export default function useTasks() {
     const [events, setEvents] = useState([]);
     const [doneEvents, setDoneEvents] = useState([]);
+    // Raw tasks by id, kept current with delta syncs instead of refetching both lists
+    const taskCache = useRef(new Map());
+    const syncToken = useRef(null);
 
     const authHeader = () => ({
         headers: {
@@ -153,18 +157,24 @@ export default function useTasks() {
 
     const fetchEvents = async () => {
         try {
-            const res = await axios.get(TASKS_URL, authHeader());
-            const all = formatTasks(res.data);
+            const params = syncToken.current ? { since: syncToken.current } : {};
+            const res = await axios.get(SYNC_URL, { ...authHeader(), params });
+            if (res.data.full) taskCache.current.clear();
+            res.data.tasks.forEach(task => taskCache.current.set(task.id, task));
+            res.data.deleted.forEach(id => taskCache.current.delete(id));
+            syncToken.current = res.data.sync_token;
+
+            const tasks = [...taskCache.current.values()].sort(
+                (a, b) => new Date(a.end_date) - new Date(b.end_date)
+            );
+            const all = formatTasks(tasks);
             setEvents(all.filter(t => 
                 t.status !== "done" && 
                 t.status !== "abandoned" && 
                 !t.is_cyclic_occurrence && 
                 !t.is_subtask
             ));
-            
-            const doneRes = await axios.get(`${TASKS_URL}?status=done`, authHeader());
-            const doneAll = formatTasks(doneRes.data);
-            setDoneEvents(doneAll.filter(t => 
+            setDoneEvents(all.filter(t => 
                 (t.status === "done" || t.status === "abandoned") &&
                 !t.is_cyclic_occurrence &&
                 !t.is_subtask